@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+按置信度自适应重试的 Tesseract 识别（请求中 adaptive 参数开启）
+
+第一次按请求的 psm 和预处理参数识别；平均置信度低于阈值时，换用其他页面分割
+模式（psm）和预处理预设并发重试，保留平均置信度最高的结果，客户端不必自己换
+参数重新提交。
+
+- 重试的组合按顺序排列：先用原预处理参数换 psm，再用原 psm 换预处理预设
+- 计算量上限：所有尝试的识别耗时之和不超过 max_seconds，尝试次数（含第一次）
+  不超过 max_attempts。按第一次的耗时估算可以重试的次数，尚未开始的重试在
+  耗时用尽或已有结果达到阈值时跳过
+- 重试在进程内共用的线程池中执行（OCR_ADAPTIVE_WORKERS 个线程），多个请求
+  同时重试时总并发也有上限；引擎句柄仍由引擎池分配
+
+请求参数 adaptive 为 true 时使用默认设置，也可以是对象：
+    {"threshold": 70, "max_attempts": 3, "max_seconds": 20, "psm": [6, 4], "preprocess": ["scan"]}
+
+环境变量：
+- OCR_ADAPTIVE_THRESHOLD：平均置信度阈值（0-100），默认 60
+- OCR_ADAPTIVE_MAX_ATTEMPTS：最多尝试次数（含第一次），默认 4
+- OCR_ADAPTIVE_MAX_SECONDS：所有尝试的识别耗时之和上限（秒），默认 30
+- OCR_ADAPTIVE_WORKERS：重试线程数，默认 min(4, CPU 核数)
+"""
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from ocr_preprocess import PRESETS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = float(os.environ.get('OCR_ADAPTIVE_THRESHOLD', 60))
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get('OCR_ADAPTIVE_MAX_ATTEMPTS', 4))
+DEFAULT_MAX_SECONDS = float(os.environ.get('OCR_ADAPTIVE_MAX_SECONDS', 30))
+WORKERS = int(os.environ.get('OCR_ADAPTIVE_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+
+# 3 自动分页，6 单一文本块，4 单列可变大小的文本，11 稀疏文本
+DEFAULT_PSM = (3, 6, 4, 11)
+DEFAULT_PREPROCESS = ('scan', 'photo')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def parse_options(value):
+    """
+    解析请求中的 adaptive 参数
+    :param value: 布尔值、'true'/'false'、对象或 None
+    :return: 选项字典，未开启时返回 None
+    :raises ValueError: 参数无效
+    """
+    if value is None or value is False:
+        return None
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in FALSE_VALUES:
+            return None
+        if lowered not in TRUE_VALUES:
+            raise ValueError("adaptive必须为布尔值或对象")
+        value = True
+
+    options = {
+        'threshold': DEFAULT_THRESHOLD,
+        'max_attempts': DEFAULT_MAX_ATTEMPTS,
+        'max_seconds': DEFAULT_MAX_SECONDS,
+        'psm': list(DEFAULT_PSM),
+        'preprocess': list(DEFAULT_PREPROCESS)
+    }
+    if value is True:
+        return options
+    if not isinstance(value, dict):
+        raise ValueError("adaptive必须为布尔值或对象")
+
+    for key, item in value.items():
+        if key not in options:
+            raise ValueError(f"未知的adaptive参数: {key}")
+        options[key] = item
+    if not isinstance(options['threshold'], (int, float)) or not 0 <= options['threshold'] <= 100:
+        raise ValueError("threshold必须为0-100之间的数")
+    if not isinstance(options['max_attempts'], int) or options['max_attempts'] < 1:
+        raise ValueError("max_attempts必须为正整数")
+    if not isinstance(options['max_seconds'], (int, float)) or options['max_seconds'] <= 0:
+        raise ValueError("max_seconds必须为正数")
+    if not isinstance(options['psm'], list) or \
+            not all(str(psm).isdigit() and 0 <= int(psm) <= 13 for psm in options['psm']):
+        raise ValueError("psm必须为0-13之间的整数数组")
+    options['psm'] = [int(psm) for psm in options['psm']]
+    if not isinstance(options['preprocess'], list) or not all(name in PRESETS for name in options['preprocess']):
+        raise ValueError(f"preprocess必须为预设名数组，可选: {', '.join(PRESETS)}")
+    return options
+
+
+def cache_param(options) -> str:
+    """缓存键中的 adaptive 参数"""
+    if options is None:
+        return 'off'
+    return json.dumps(options, sort_keys=True)
+
+
+def candidates(psm: int, options: dict) -> list:
+    """
+    重试的参数组合，preprocess 为 None 表示沿用请求的预处理参数
+    :return: [{'psm': int, 'preprocess': 预设名或 None}]
+    """
+    alternatives = [{'psm': other, 'preprocess': None} for other in options['psm'] if other != psm]
+    alternatives += [{'psm': psm, 'preprocess': name} for name in options['preprocess']]
+    return alternatives
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # 识别进程池中的 worker 各自创建自己的线程池
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='ocr-adaptive')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run(attempt, psm: int, options: dict):
+    """
+    先按请求参数识别，置信度不足时重试其他组合
+    :param attempt: attempt(candidate) -> 识别结果（含 confidence）
+    :return: (置信度最高的结果, 重试报告)
+    """
+    threshold = options['threshold']
+    budget = options['max_seconds']
+    original = {'psm': psm, 'preprocess': None}
+
+    started = time.monotonic()
+    best = attempt(original)
+    first_seconds = time.monotonic() - started
+    attempts = [dict(original, confidence=best['confidence'], seconds=round(first_seconds, 3))]
+    report = {'threshold': threshold, 'triggered': False, 'attempts': attempts, 'selected': 0}
+    if best['confidence'] >= threshold:
+        report['compute_seconds'] = round(first_seconds, 3)
+        return best, report
+
+    # 按第一次的耗时估算剩余的计算量还够重试几次
+    alternatives = candidates(psm, options)[:options['max_attempts'] - 1]
+    if first_seconds > 0:
+        alternatives = alternatives[:max(0, int((budget - first_seconds) / first_seconds))]
+    report['triggered'] = True
+    if not alternatives:
+        report['compute_seconds'] = round(first_seconds, 3)
+        return best, report
+
+    lock = threading.Lock()
+    state = {'spent': first_seconds, 'good_enough': False}
+
+    def run_candidate(candidate):
+        with lock:
+            if state['good_enough'] or state['spent'] >= budget:
+                return None
+        begin = time.monotonic()
+        result = attempt(candidate)
+        seconds = time.monotonic() - begin
+        with lock:
+            state['spent'] += seconds
+            if result['confidence'] >= threshold:
+                state['good_enough'] = True
+        return result, seconds
+
+    executor = _get_executor()
+    futures = [executor.submit(run_candidate, candidate) for candidate in alternatives]
+    wait(futures)
+
+    for candidate, future in zip(alternatives, futures):
+        try:
+            outcome = future.result()
+        except Exception as e:
+            logger.warning(f"自适应重试失败 {candidate}: {str(e)}")
+            attempts.append(dict(candidate, error=str(e)))
+            continue
+        if outcome is None:
+            attempts.append(dict(candidate, skipped=True))
+            continue
+        result, seconds = outcome
+        attempts.append(dict(candidate, confidence=result['confidence'], seconds=round(seconds, 3)))
+        if result['confidence'] > best['confidence']:
+            best = result
+            report['selected'] = len(attempts) - 1
+
+    report['compute_seconds'] = round(state['spent'], 3)
+    return best, report
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 服务共用的客户端认证（Tesseract、MinerU 服务和网关）
+
+- ClientStore：客户端记录保存在 CLIENT_STORE_FILE 中，密钥以 PBKDF2 哈希保存
+- 访问令牌格式为 base64(client_id).uuid.expires_at.signature，由 JWT_SECRET_KEY
+  做 HMAC 签名，无需查询存储即可校验。各服务使用同一个 JWT_SECRET_KEY 和
+  CLIENT_STORE_FILE 时，一个服务签发的令牌在其他服务上同样有效，网关可以把
+  调用方的令牌直接转发给后端
+- requires_auth 校验令牌和客户端状态，并按客户端记录限流（见 ocr_ratelimit）
+
+使用方式：
+
+    auth = ServiceAuth(app, 'tesseract', json_response)
+
+    @app.route(...)
+    @auth.requires_auth
+    def handler(): ...
+"""
+import os
+import json
+import time
+import hmac
+import uuid
+import base64
+import hashlib
+import logging
+import secrets
+from datetime import datetime
+from functools import wraps
+
+from flask import request, g
+
+from ocr_ratelimit import ClientRateLimiter
+from ocr_tokens import TokenStore, CredentialCache
+
+logger = logging.getLogger(__name__)
+
+
+# 客户端存储类
+class ClientStore:
+    def __init__(self, clients_file: str, credential_cache: CredentialCache = None):
+        self.clients_file = clients_file
+        self.credential_cache = credential_cache
+        self.clients = self.load_clients()
+
+        if not self.clients:
+            self.init_default_client()
+
+    def load_clients(self) -> dict:
+        """从文件加载客户端数据"""
+        try:
+            if os.path.exists(self.clients_file):
+                with open(self.clients_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"加载客户端文件失败: {str(e)}")
+        return {}
+
+    def save_clients(self):
+        """保存客户端数据到文件"""
+        try:
+            with open(self.clients_file, 'w') as f:
+                json.dump(self.clients, f, indent=2)
+        except Exception as e:
+            logger.error(f"保存客户端文件失败: {str(e)}")
+
+    def init_default_client(self):
+        """初始化默认客户端"""
+        client_id = "default_client"
+        client_secret = secrets.token_urlsafe(32)
+
+        self.clients[client_id] = {
+            'client_secret_hash': self.hash_secret(client_secret),
+            'name': '默认客户端',
+            'description': '系统默认客户端',
+            'created_at': datetime.now().isoformat(),
+            'is_active': True,
+            'rate_limit': 100,
+            'max_concurrent': 4,
+            'scopes': ['ocr:read', 'ocr:batch'],
+            'metadata': {
+                'owner': 'system',
+                'contact': 'admin@example.com'
+            }
+        }
+        self.save_clients()
+
+        logger.info(f"已创建默认客户端 - ID: {client_id}")
+        logger.info(f"默认客户端密钥: {client_secret}")
+        logger.warning("请在生产环境中修改默认客户端密钥！")
+
+    def hash_secret(self, secret: str) -> str:
+        """哈希加密密钥"""
+        salt = os.urandom(16)
+        return hashlib.pbkdf2_hmac(
+            'sha256',
+            secret.encode('utf-8'),
+            salt,
+            100000
+        ).hex() + '.' + salt.hex()
+
+    def verify_secret(self, secret: str, stored_hash: str) -> bool:
+        """验证密钥"""
+        try:
+            hash_part, salt_hex = stored_hash.split('.')
+            salt = bytes.fromhex(salt_hex)
+
+            new_hash = hashlib.pbkdf2_hmac(
+                'sha256',
+                secret.encode('utf-8'),
+                salt,
+                100000
+            ).hex()
+
+            return secrets.compare_digest(new_hash, hash_part)
+        except:
+            return False
+
+    def validate_client(self, client_id: str, client_secret: str) -> bool:
+        """验证客户端凭证"""
+        if client_id not in self.clients:
+            return False
+
+        client = self.clients[client_id]
+
+        if not client.get('is_active', True):
+            return False
+
+        stored_hash = client.get('client_secret_hash')
+        if not stored_hash:
+            return False
+
+        cache = self.credential_cache
+        if cache is not None and cache.check(client_id, client_secret, stored_hash):
+            return True
+
+        if not self.verify_secret(client_secret, stored_hash):
+            return False
+
+        if cache is not None:
+            cache.add(client_id, client_secret, stored_hash)
+        return True
+
+    def get_client_info(self, client_id: str):
+        """获取客户端信息"""
+        if client_id not in self.clients:
+            return None
+
+        client = self.clients[client_id].copy()
+        client.pop('client_secret_hash', None)
+        return client
+
+
+class ServiceAuth:
+    """一个服务的认证组件：客户端存储、令牌、凭证缓存和限流"""
+
+    def __init__(self, app, namespace: str, json_response):
+        """
+        :param app: Flask 应用，读取 AUTH_ENABLED、TOKEN_EXPIRATION_HOURS、JWT_SECRET_KEY、
+                    CLIENT_STORE_FILE、PUBLIC_ENDPOINTS 配置
+        :param namespace: 限流计数的命名空间（服务名）
+        :param json_response: 服务的 JSON 响应函数
+        """
+        self.app = app
+        self.json_response = json_response
+        # 令牌存储（每个Web worker进程各一份，有上限，过期记录自动清理；令牌本身由HMAC签名校验，多进程间通用）
+        self.token_store = TokenStore()
+        # 校验通过的客户端凭证短期缓存，避免每次获取令牌都重新计算PBKDF2
+        self.credential_cache = CredentialCache()
+        self.client_store = ClientStore(app.config['CLIENT_STORE_FILE'], self.credential_cache)
+        # 按客户端限流：rate_limit（每分钟请求数）和 max_concurrent 取自客户端记录
+        self.rate_limiter = ClientRateLimiter(namespace)
+        self.rate_limiter.init_app(app)
+
+    def _sign(self, message: str) -> str:
+        return hmac.new(
+            self.app.config['JWT_SECRET_KEY'].encode(),
+            message.encode(),
+            hashlib.sha256
+        ).hexdigest()
+
+    # 令牌管理函数
+    def create_token(self, client_id: str) -> str:
+        """创建访问令牌"""
+        token_id = str(uuid.uuid4())
+        expires_at = int(time.time()) + self.app.config['TOKEN_EXPIRATION_HOURS'] * 3600
+
+        signature = self._sign(f"{client_id}:{token_id}:{expires_at}")
+
+        client_id_encoded = base64.urlsafe_b64encode(client_id.encode()).decode().rstrip('=')
+        token = f"{client_id_encoded}.{token_id}.{expires_at}.{signature}"
+
+        self.token_store.set(token, {
+            'client_id': client_id,
+            'token_id': token_id,
+            'expires_at': expires_at,
+            'created_at': int(time.time())
+        })
+
+        return token
+
+    def validate_token(self, token: str) -> dict:
+        """验证访问令牌"""
+        try:
+            parts = token.split('.')
+            if len(parts) != 4:
+                return None
+
+            client_id_encoded, token_id, expires_at_str, signature = parts
+            client_id = base64.urlsafe_b64decode(client_id_encoded + '=' * (4 - len(client_id_encoded) % 4)).decode()
+
+            expected_signature = self._sign(f"{client_id}:{token_id}:{expires_at_str}")
+            if not hmac.compare_digest(signature, expected_signature):
+                return None
+
+            expires_at = int(expires_at_str)
+            if time.time() > expires_at:
+                return None
+
+            stored_info = self.token_store.get(token)
+            if stored_info is not None:
+                if stored_info['client_id'] != client_id or stored_info['token_id'] != token_id:
+                    return None
+
+            return {
+                'client_id': client_id,
+                'token_id': token_id,
+                'expires_at': expires_at
+            }
+
+        except Exception as e:
+            logger.error(f"令牌验证失败: {str(e)}")
+            return None
+
+    # 认证装饰器
+    def requires_auth(self, f):
+        """认证装饰器"""
+        json_response = self.json_response
+        config = self.app.config
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not config['AUTH_ENABLED']:
+                return f(*args, **kwargs)
+
+            if request.path in config['PUBLIC_ENDPOINTS']:
+                return f(*args, **kwargs)
+
+            auth_header = request.headers.get('Authorization')
+
+            if not auth_header:
+                return json_response(
+                    success=False,
+                    error="需要认证信息",
+                    message="请提供Authorization头",
+                    status_code=401
+                )
+
+            if not auth_header.startswith('Bearer '):
+                return json_response(
+                    success=False,
+                    error="令牌格式不正确",
+                    message="应为Bearer token格式",
+                    status_code=401
+                )
+
+            token = auth_header[7:]
+            token_info = self.validate_token(token)
+
+            if not token_info:
+                return json_response(
+                    success=False,
+                    error="无效或过期的令牌",
+                    message="请重新获取访问令牌",
+                    status_code=401
+                )
+
+            client_id = token_info['client_id']
+
+            if client_id not in self.client_store.clients:
+                return json_response(
+                    success=False,
+                    error="客户端不存在",
+                    message="客户端ID无效",
+                    status_code=401
+                )
+
+            client = self.client_store.clients[client_id]
+            if not client.get('is_active', True):
+                return json_response(
+                    success=False,
+                    error="客户端已被停用",
+                    message="请联系管理员",
+                    status_code=403
+                )
+
+            # 令牌桶限制请求速率，租约限制并发数；并发名额在请求结束时释放
+            decision = self.rate_limiter.acquire(client_id, client)
+            if not decision.allowed:
+                response = json_response(
+                    success=False,
+                    error="请求过于频繁",
+                    message="超过并发请求数上限" if decision.reason == 'concurrency' else "超过请求速率上限",
+                    status_code=429,
+                    client_id=client_id
+                )
+                response.headers.update(decision.headers())
+                return response
+            g.rate_limit = decision
+
+            request.client_id = client_id
+            return f(*args, **kwargs)
+
+        return decorated
+
+    def token_response(self):
+        """
+        /api/v1/auth/token 的处理逻辑：凭证可以放在 Basic Auth、JSON 请求体或表单中
+        """
+        json_response = self.json_response
+        config = self.app.config
+        try:
+            client_id = None
+            client_secret = None
+
+            # 首先尝试Basic Auth
+            auth_header = request.headers.get('Authorization')
+            if auth_header and auth_header.startswith('Basic '):
+                try:
+                    decoded = base64.b64decode(auth_header[6:]).decode('utf-8')
+                    client_id, client_secret = decoded.split(':', 1)
+                except:
+                    pass
+
+            # 尝试从JSON体获取
+            if not client_id or not client_secret:
+                if request.is_json:
+                    data = request.get_json()
+                    client_id = data.get('client_id')
+                    client_secret = data.get('client_secret')
+
+            # 尝试表单数据
+            if not client_id or not client_secret:
+                client_id = request.form.get('client_id')
+                client_secret = request.form.get('client_secret')
+
+            if not client_id or not client_secret:
+                return json_response(
+                    success=False,
+                    error="缺少客户端凭证",
+                    message="请提供client_id和client_secret",
+                    status_code=400
+                )
+
+            # 验证客户端凭证
+            if not self.client_store.validate_client(client_id, client_secret):
+                return json_response(
+                    success=False,
+                    error="无效的客户端凭证",
+                    message="请检查client_id和client_secret",
+                    status_code=401
+                )
+
+            # 创建访问令牌
+            token = self.create_token(client_id)
+            expires_at = time.time() + config['TOKEN_EXPIRATION_HOURS'] * 3600
+
+            return json_response(
+                success=True,
+                message="令牌生成成功",
+                data={
+                    'access_token': token,
+                    'token_type': 'Bearer',
+                    'expires_in': config['TOKEN_EXPIRATION_HOURS'] * 3600,
+                    'expires_at': datetime.fromtimestamp(expires_at).isoformat() + 'Z',
+                    'client_id': client_id
+                }
+            )
+
+        except Exception as e:
+            logger.error(f"令牌生成失败: {str(e)}")
+            return json_response(
+                success=False,
+                error="服务器内部错误",
+                message=str(e) if self.app.debug else "请稍后重试",
+                status_code=500
+            )
+
+    def stats(self) -> dict:
+        return {
+            'auth_enabled': self.app.config['AUTH_ENABLED'],
+            'total_clients': len(self.client_store.clients),
+            'active_tokens': len(self.token_store),
+            'token_store': self.token_store.stats(),
+            'credential_cache': self.credential_cache.stats(),
+            'rate_limit': self.rate_limiter.stats()
+        }
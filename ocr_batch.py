@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+批量OCR的并发执行
+
+批量请求中的每一项在 I/O 线程池中并发执行：下载等 I/O 操作直接在线程中
+完成，CPU 密集的识别交给调用方提供的有界进程池（或其他执行器）。所有项
+共享同一个截止时间，超时或失败的项单独记为失败，其余项照常返回，结果顺序
+与输入顺序一致。
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItemTimeout(Exception):
+    """批量处理中的单项超时"""
+
+
+def wait_result(future, deadline: float):
+    """
+    在截止时间前等待执行器返回结果，超时则取消该任务
+    :param future: 提交到进程池/线程池后得到的 Future
+    :param deadline: time.monotonic() 时间
+    """
+    remaining = deadline - time.monotonic()
+    try:
+        if remaining <= 0:
+            raise FuturesTimeout()
+        return future.result(timeout=remaining)
+    except FuturesTimeout:
+        future.cancel()
+        raise BatchItemTimeout("处理超时")
+
+
+def remaining_seconds(deadline: float, cap: float = None) -> float:
+    """距离截止时间的剩余秒数，可用作下载超时"""
+    remaining = max(0.1, deadline - time.monotonic())
+    return min(remaining, cap) if cap else remaining
+
+
+class BatchExecutor:
+    """并发执行批量请求中的各项，保持输入顺序"""
+
+    def __init__(self, io_workers: int = None):
+        if io_workers is None:
+            io_workers = int(os.environ.get('OCR_BATCH_IO_WORKERS', 32))
+        self.io_workers = max(1, io_workers)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.io_workers,
+                    thread_name_prefix='ocr-batch'
+                )
+            return self._pool
+
+    def run(self, items, handler, timeout: float) -> list:
+        """
+        并发处理所有项
+        :param items: 输入项列表
+        :param handler: handler(item, deadline) -> 结果，在 I/O 线程中执行
+        :param timeout: 每一项的超时时间（秒），所有项同时开始
+        :return: 与 items 顺序一致的 (success, result 或错误信息) 列表
+        """
+        deadline = time.monotonic() + timeout
+        futures = [self.pool.submit(handler, item, deadline) for item in items]
+
+        results = []
+        for future in futures:
+            try:
+                # handler 自己会按截止时间放弃，这里额外留出少量余量
+                remaining = max(0, deadline - time.monotonic()) + 1
+                results.append((True, future.result(timeout=remaining)))
+            except (FuturesTimeout, BatchItemTimeout):
+                future.cancel()
+                results.append((False, "处理超时"))
+            except Exception as e:
+                results.append((False, str(e)))
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,538 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 服务的性能基准测试
+
+    python ocr_benchmark.py --service http://localhost:5000 --engine tesseract \\
+        --endpoint url --concurrency 8 --requests 200 --pid <服务主进程号>
+
+1. 按随机种子生成固定的测试语料（渲染的文本图片和小 PDF，附标准答案），
+   保存在 --corpus-dir 中，同样的参数重复运行时直接复用
+2. 在本机启动一个 HTTP 文件服务提供语料，OCR 服务通过 file_url 下载
+3. 以指定并发调用 /api/v1/ocr/url 或 /api/v1/ocr/batch，统计延迟的
+   p50/p95/p99、每秒处理的文件数和页数、与标准答案比较的字符准确率
+4. 指定 --pid 时采样服务进程树（gunicorn 主进程及其 worker、识别子进程）的
+   CPU 时间和内存（RSS），仅支持 Linux
+
+OCR 服务按文件内容缓存识别结果。默认（--cache cold）文件服务每次下载都在文件
+中插入一段不同的注释（PNG 的 tEXt 块、PDF 末尾的注释），内容摘要每次不同，
+测到的是实际识别的开销；--cache warm 时原样提供文件，测缓存命中的开销。
+
+OCR 服务在容器中运行时，用 --public-host 指定服务访问本机文件服务的地址
+（如 host.docker.internal）。
+
+环境变量：
+- OCR_BENCH_CLIENT_ID / OCR_BENCH_CLIENT_SECRET：获取令牌的客户端凭证，
+  也可以用 --token 直接指定令牌；都不提供时不带认证头（服务关闭认证时）
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import logging
+import argparse
+import tempfile
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr_preprocess import char_accuracy
+
+logger = logging.getLogger(__name__)
+
+# 语料使用的词表：常见英文单词加数字和标点，Tesseract 的 eng 和 MinerU 的 en 都能识别
+VOCABULARY = (
+    'the of and to in is was for that with as on by at from this which be are or '
+    'an have not were had but all their has been one more there can other when some '
+    'system data model time process result value number table method analysis design '
+    'performance memory service request response engine document image page text '
+    'language report quality average network server client cache queue worker batch'
+).split()
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial.ttf',
+    'C:\\Windows\\Fonts\\arial.ttf',
+)
+PAGE_WIDTH = 1240
+MARGIN = 60
+FONT_SIZE = 28
+LINE_SPACING = 1.6
+
+
+# ============ 语料生成 ============
+def _font(size: int):
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow 10.1 之前的默认字体只有一种尺寸
+        return ImageFont.load_default()
+
+
+def _random_lines(rng: random.Random, count: int, font, width: int) -> list:
+    """生成 count 行随机文本，每行不超过 width 像素"""
+    lines = []
+    for _ in range(count):
+        words = []
+        while True:
+            word = rng.choice(VOCABULARY)
+            roll = rng.random()
+            if roll < 0.08:
+                word = str(rng.randint(1, 9999))
+            elif roll < 0.15:
+                word = word.capitalize()
+            candidate = ' '.join(words + [word])
+            if words and font.getlength(candidate) > width:
+                break
+            words.append(word)
+        text = ' '.join(words)
+        lines.append(text + ('.' if rng.random() < 0.3 else ''))
+    return lines
+
+
+def render_page(lines: list, font) -> Image.Image:
+    """把文本行渲染为白底黑字的单栏页面"""
+    line_height = int(FONT_SIZE * LINE_SPACING)
+    height = MARGIN * 2 + line_height * len(lines)
+    image = Image.new('L', (PAGE_WIDTH, height), color=255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((MARGIN, MARGIN + index * line_height), line, fill=0, font=font)
+    return image
+
+
+def generate_corpus(directory: str, images: int, pdfs: int, seed: int) -> list:
+    """
+    生成测试语料和 manifest.json，同样的参数已生成过时直接读取
+    :return: [{'name', 'kind', 'pages', 'text'}]
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    settings = {'images': images, 'pdfs': pdfs, 'seed': seed, 'font_size': FONT_SIZE}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('settings') == settings and all(
+                os.path.exists(os.path.join(directory, item['name'])) for item in manifest['items']):
+            return manifest['items']
+
+    rng = random.Random(seed)
+    font = _font(FONT_SIZE)
+    text_width = PAGE_WIDTH - MARGIN * 2
+    items = []
+    for index in range(images):
+        lines = _random_lines(rng, rng.randint(3, 12), font, text_width)
+        name = f'image_{index:04d}.png'
+        render_page(lines, font).save(os.path.join(directory, name), format='PNG')
+        items.append({'name': name, 'kind': 'image', 'pages': 1, 'text': '\n'.join(lines)})
+    for index in range(pdfs):
+        page_lines = [_random_lines(rng, rng.randint(15, 25), font, text_width) for _ in range(rng.randint(1, 3))]
+        pages = [render_page(lines, font).convert('RGB') for lines in page_lines]
+        name = f'document_{index:04d}.pdf'
+        pages[0].save(os.path.join(directory, name), format='PDF', save_all=True,
+                      append_images=pages[1:], resolution=150)
+        items.append({
+            'name': name,
+            'kind': 'pdf',
+            'pages': len(pages),
+            'text': '\n\n'.join('\n'.join(lines) for lines in page_lines)
+        })
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'settings': settings, 'items': items}, f, ensure_ascii=False, indent=2)
+    logger.info(f"已生成测试语料: 图片 {images} 个, PDF {pdfs} 个 -> {directory}")
+    return items
+
+
+def with_nonce(content: bytes, name: str, nonce: str) -> bytes:
+    """在文件中插入不影响识别的注释，使内容摘要不同"""
+    if name.endswith('.png'):
+        # 签名（8字节）和 IHDR 块（25字节）之后插入 tEXt 块
+        data = b'Comment\x00' + nonce.encode('ascii')
+        chunk = struct.pack('>I', len(data)) + b'tEXt' + data + \
+            struct.pack('>I', zlib.crc32(b'tEXt' + data) & 0xffffffff)
+        return content[:33] + chunk + content[33:]
+    if name.endswith('.pdf'):
+        return content + b'\n%' + nonce.encode('ascii') + b'\n'
+    return content
+
+
+# ============ 本地文件服务 ============
+class CorpusServer:
+    """在后台线程中提供语料文件；cold 模式下每次下载的内容摘要不同"""
+
+    def __init__(self, directory: str, host: str = '127.0.0.1', port: int = 0,
+                 public_host: str = None, cold: bool = True):
+        self.directory = directory
+        self.cold = cold
+        self.downloads = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                name = os.path.basename(parsed.path)
+                path = os.path.join(server.directory, name)
+                if not name or not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+                with open(path, 'rb') as f:
+                    content = f.read()
+                nonce = parse_qs(parsed.query).get('n')
+                if nonce:
+                    content = with_nonce(content, name, nonce[0])
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png' if name.endswith('.png') else 'application/pdf')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                with server._lock:
+                    server.downloads += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.public_host = public_host or host
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='corpus-server', daemon=True)
+
+    def url_for(self, name: str) -> str:
+        url = f'http://{self.public_host}:{self.port}/{name}'
+        if not self.cold:
+            return url
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        return f'{url}?n=bench{os.getpid()}-{counter}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ============ 服务进程资源采样 ============
+def _process_table() -> dict:
+    """pid -> (ppid, utime+stime 时钟数, 已回收子进程的 cutime+cstime 时钟数)"""
+    table = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能含空格，从最后一个右括号之后解析
+        fields = stat[stat.rfind(')') + 2:].split()
+        table[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[13]) + int(fields[14]))
+    return table
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+class ProcessSampler:
+    """定期采样进程树的 CPU 时间和 RSS"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.peak_rss = 0
+        self.rss_samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='process-sampler', daemon=True)
+        self._start_cpu = None
+        self._end_cpu = None
+
+    def _tree(self, table: dict) -> list:
+        pids = [self.pid]
+        children = {}
+        for pid, (ppid, _, _) in table.items():
+            children.setdefault(ppid, []).append(pid)
+        index = 0
+        while index < len(pids):
+            pids.extend(children.get(pids[index], []))
+            index += 1
+        return [pid for pid in pids if pid in table]
+
+    def cpu_seconds(self) -> float:
+        table = _process_table()
+        if self.pid not in table:
+            raise ProcessLookupError(f"进程不存在: {self.pid}")
+        # 存活进程的 CPU 时间加上根进程已回收的子进程（退出的识别进程）的 CPU 时间
+        total = sum(table[pid][1] for pid in self._tree(table)) + table[self.pid][2]
+        return total / self.ticks
+
+    def _sample_rss(self):
+        rss = sum(_rss_bytes(pid) for pid in self._tree(_process_table()))
+        self.rss_samples.append(rss)
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample_rss()
+
+    def __enter__(self):
+        self._start_cpu = self.cpu_seconds()
+        self._sample_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._end_cpu = self.cpu_seconds()
+        self._sample_rss()
+
+    def report(self, wall_seconds: float) -> dict:
+        cpu = self._end_cpu - self._start_cpu
+        return {
+            'pid': self.pid,
+            'cpu_seconds': round(cpu, 2),
+            'cpu_utilization': round(cpu / wall_seconds, 2) if wall_seconds else None,
+            'rss_peak_mb': round(self.peak_rss / 1024 ** 2, 1),
+            'rss_mean_mb': round(sum(self.rss_samples) / len(self.rss_samples) / 1024 ** 2, 1)
+        }
+
+
+# ============ 请求与统计 ============
+def percentile(values: list, p: float) -> float:
+    """线性插值的百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def get_token(service: str, client_id: str, client_secret: str) -> str:
+    response = requests.post(
+        f'{service}/api/v1/auth/token',
+        json={'client_id': client_id, 'client_secret': client_secret},
+        timeout=30
+    )
+    response.raise_for_status()
+    return response.json()['data']['access_token']
+
+
+class BenchmarkClient:
+    def __init__(self, service: str, token: str, params: dict, timeout: float):
+        self.service = service
+        self.params = params
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=256)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+
+    def _post(self, path: str, body: dict) -> dict:
+        response = self.session.post(f'{self.service}{path}', json=dict(self.params, **body), timeout=self.timeout)
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {'success': False, 'error': response.text[:200]}
+        if response.status_code != 200 or not payload.get('success'):
+            raise RuntimeError(f"HTTP {response.status_code}: {payload.get('error')} {payload.get('message', '')}".strip())
+        return payload['data']
+
+    def ocr_url(self, url: str) -> list:
+        """:return: [(识别文本或 None, 错误, 是否缓存命中)]"""
+        data = self._post('/api/v1/ocr/url', {'file_url': url})
+        return [(data['ocr_result']['text'], None, bool(data.get('cached')))]
+
+    def ocr_batch(self, urls: list) -> list:
+        data = self._post('/api/v1/ocr/batch', {'urls': urls})
+        return [
+            (result.get('text'), None, False) if result.get('success') else (None, result.get('error'), False)
+            for result in data['results']
+        ]
+
+
+def run_benchmark(args, corpus: list, server: CorpusServer, client: BenchmarkClient, sampler) -> dict:
+    batch_size = args.batch_size if args.endpoint == 'batch' else 1
+    # 按顺序循环取语料，同样的参数每次运行的请求序列相同
+    tasks = [
+        [corpus[(index * batch_size + offset) % len(corpus)] for offset in range(batch_size)]
+        for index in range(args.warmup + args.requests)
+    ]
+    warmup, tasks = tasks[:args.warmup], tasks[args.warmup:]
+
+    def execute(items):
+        urls = [server.url_for(item['name']) for item in items]
+        started = time.perf_counter()
+        try:
+            if args.endpoint == 'batch':
+                outcomes = client.ocr_batch(urls)
+            else:
+                outcomes = client.ocr_url(urls[0])
+        except Exception as e:
+            outcomes = [(None, str(e), False)] * len(items)
+        return time.perf_counter() - started, list(zip(items, outcomes))
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        if warmup:
+            list(executor.map(execute, warmup))
+            logger.info(f"预热完成: {len(warmup)} 个请求")
+        with sampler if sampler is not None else nullcontext():
+            started = time.perf_counter()
+            results = list(executor.map(execute, tasks))
+            wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in results]
+    documents = pages = cached = 0
+    errors = {}
+    accuracy = {}
+    for _, outcomes in results:
+        for item, (text, error, hit) in outcomes:
+            if text is None:
+                errors[error] = errors.get(error, 0) + 1
+                continue
+            documents += 1
+            pages += item['pages']
+            cached += hit
+            accuracy.setdefault(item['kind'], []).append(char_accuracy(text, item['text']))
+
+    all_accuracy = [value for values in accuracy.values() for value in values]
+    report = {
+        'service': args.service,
+        'engine': args.engine,
+        'endpoint': args.endpoint,
+        'concurrency': args.concurrency,
+        'requests': len(tasks),
+        'batch_size': batch_size,
+        'cache': args.cache,
+        'wall_seconds': round(wall, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1)
+        },
+        'requests_per_second': round(len(tasks) / wall, 2),
+        'documents_per_second': round(documents / wall, 2),
+        'pages_per_second': round(pages / wall, 2),
+        'documents': documents,
+        'cache_hits': cached,
+        'failed': sum(errors.values()),
+        'errors': errors,
+        'accuracy': {
+            'mean': round(sum(all_accuracy) / len(all_accuracy), 4) if all_accuracy else None,
+            'min': round(min(all_accuracy), 4) if all_accuracy else None,
+            'by_kind': {kind: round(sum(values) / len(values), 4) for kind, values in accuracy.items()}
+        },
+        'resources': sampler.report(wall) if sampler is not None else None
+    }
+    return report
+
+
+def print_report(report: dict):
+    latency = report['latency_ms']
+    print(f"{report['engine']} {report['endpoint']} 并发 {report['concurrency']}, "
+          f"{report['requests']} 个请求 x {report['batch_size']} 个文件, 缓存 {report['cache']}")
+    print(f"  耗时        {report['wall_seconds']} s")
+    print(f"  延迟(ms)    p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  "
+          f"平均 {latency['mean']}  最大 {latency['max']}")
+    print(f"  吞吐        {report['documents_per_second']} 文件/s, {report['pages_per_second']} 页/s, "
+          f"{report['requests_per_second']} 请求/s")
+    accuracy = report['accuracy']
+    by_kind = ', '.join(f"{kind} {value}" for kind, value in accuracy['by_kind'].items())
+    print(f"  字符准确率  平均 {accuracy['mean']}  最低 {accuracy['min']}  ({by_kind})")
+    print(f"  成功/失败   {report['documents']}/{report['failed']}, 缓存命中 {report['cache_hits']}")
+    for error, count in report['errors'].items():
+        print(f"    {count} x {error}")
+    resources = report['resources']
+    if resources:
+        print(f"  服务进程    CPU {resources['cpu_seconds']} s (利用率 {resources['cpu_utilization']} 核), "
+              f"RSS 峰值 {resources['rss_peak_mb']} MB, 平均 {resources['rss_mean_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='OCR服务性能基准测试')
+    parser.add_argument('--service', default='http://localhost:5000', help='OCR服务地址')
+    parser.add_argument('--engine', choices=('tesseract', 'mineru'), default='tesseract')
+    parser.add_argument('--endpoint', choices=('url', 'batch'), default='url')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help='计时的请求数')
+    parser.add_argument('--warmup', type=int, default=2, help='不计时的预热请求数')
+    parser.add_argument('--batch-size', type=int, default=5, help='batch 接口每个请求的文件数')
+    parser.add_argument('--language', help='识别语言，默认 Tesseract 为 eng，MinerU 为 en')
+    parser.add_argument('--kinds', help='使用的语料类型 image,pdf；Tesseract 的 batch 接口只支持图片，默认 image')
+    parser.add_argument('--cache', choices=('cold', 'warm'), default='cold')
+    parser.add_argument('--corpus-dir', default=os.path.join(tempfile.gettempdir(), 'ocr_benchmark_corpus'))
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--pdfs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=20240601)
+    parser.add_argument('--serve-host', default='127.0.0.1', help='文件服务监听地址')
+    parser.add_argument('--serve-port', type=int, default=0)
+    parser.add_argument('--public-host', help='OCR服务访问文件服务时使用的地址，默认同 --serve-host')
+    parser.add_argument('--pid', type=int, help='OCR服务主进程号，采样CPU和内存')
+    parser.add_argument('--token', help='访问令牌')
+    parser.add_argument('--timeout', type=float, default=600, help='单个请求的超时（秒）')
+    parser.add_argument('--output', help='把报告保存为JSON文件')
+    args = parser.parse_args(argv)
+    args.service = args.service.rstrip('/')
+
+    corpus = generate_corpus(args.corpus_dir, args.images, args.pdfs, args.seed)
+    default_kinds = 'image' if args.engine == 'tesseract' and args.endpoint == 'batch' else 'image,pdf'
+    kinds = set((args.kinds or default_kinds).split(','))
+    corpus = [item for item in corpus if item['kind'] in kinds]
+    if not corpus:
+        parser.error(f"没有 {','.join(sorted(kinds))} 类型的语料")
+
+    token = args.token
+    client_id = os.environ.get('OCR_BENCH_CLIENT_ID')
+    client_secret = os.environ.get('OCR_BENCH_CLIENT_SECRET')
+    if not token and client_id and client_secret:
+        token = get_token(args.service, client_id, client_secret)
+
+    params = {'language': args.language or ('en' if args.engine == 'mineru' else 'eng')}
+    if args.engine == 'mineru':
+        params['format'] = 'text'
+    client = BenchmarkClient(args.service, token, params, args.timeout)
+    sampler = ProcessSampler(args.pid) if args.pid else None
+
+    with CorpusServer(args.corpus_dir, args.serve_host, args.serve_port,
+                      args.public_host, cold=args.cache == 'cold') as server:
+        logger.info(f"语料文件服务: http://{server.public_host}:{server.port}/ ({len(corpus)} 个文件)")
+        report = run_benchmark(args, corpus, server, client, sampler)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0 if report['documents'] else 1
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
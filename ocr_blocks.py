@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+MinerU 输出（*_content_list.json）的解析
+
+content_list 是按阅读顺序排列的内容块数组，每个块带 type、page_idx（从 0
+开始的页索引）和 bbox。输出文件读取时只做一次 JSON 解析，识别结果中保存解析
+后的原始内容块（content），再按需要转换为：
+
+- 类型化的内容块（typed_blocks）：text / title / table / formula / image 五类，
+  统一带 page（从 1 开始）和 bbox；列表、代码、页眉页脚等其他块归为 text，
+  原类型记在 subtype 中
+- 纯文本（blocks_text）：按块拼接，表格转换为以制表符分隔的行，公式保留 LaTeX
+
+图片块中的 img_path 指向 MinerU 的临时输出目录，处理完成后即被删除，不返回。
+"""
+import re
+import json
+import html
+import logging
+
+logger = logging.getLogger(__name__)
+
+BLOCK_TYPES = ('text', 'title', 'table', 'formula', 'image')
+
+_CELL_END = re.compile(r'</t[dh]\s*>', re.IGNORECASE)
+_ROW_END = re.compile(r'</tr\s*>|<br\s*/?>', re.IGNORECASE)
+_TAG = re.compile(r'<[^>]+>')
+
+
+def read_content_list(path) -> list:
+    """
+    读取一个 content_list 文件，空文件返回 []
+    无法解析为 JSON 数组时把整个文件当作第 1 页的一个文本块
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = f.read()
+    if not raw.strip():
+        return []
+    try:
+        content = json.loads(raw)
+    except ValueError:
+        logger.warning(f"MinerU输出不是有效的JSON，按纯文本处理: {path}")
+        return [{'type': 'text', 'text': raw.strip(), 'page_idx': 0}]
+    if not isinstance(content, list):
+        content = [content]
+    return [block for block in content if isinstance(block, dict)]
+
+
+def offset_pages(content: list, start: int) -> list:
+    """分段处理的结果中 page_idx 换算为原文档页索引（返回新的块，不修改原结果）"""
+    if not start:
+        return content
+    return [dict(block, page_idx=block.get('page_idx', 0) + start) for block in content]
+
+
+def _join(value) -> str:
+    if isinstance(value, list):
+        return '\n'.join(str(item).strip() for item in value if str(item).strip())
+    return str(value or '').strip()
+
+
+def table_text(table_html: str) -> str:
+    """HTML 表格转换为纯文本：单元格以制表符分隔，每行一行"""
+    text = _CELL_END.sub('\t', table_html or '')
+    text = _ROW_END.sub('\n', text)
+    text = html.unescape(_TAG.sub('', text))
+    return '\n'.join(line.rstrip('\t').strip() for line in text.splitlines() if line.strip())
+
+
+def typed_block(block: dict) -> dict:
+    """把一个 MinerU 内容块转换为类型化的块"""
+    kind = block.get('type', 'text')
+    typed = {
+        'type': 'text',
+        'page': block.get('page_idx', 0) + 1,
+        'bbox': block.get('bbox'),
+    }
+    if kind == 'text' and block.get('text_level'):
+        typed.update(type='title', level=block['text_level'], text=_join(block.get('text')))
+    elif kind in ('equation', 'interline_equation', 'formula'):
+        typed.update(type='formula', latex=_join(block.get('text') or block.get('latex')),
+                     format=block.get('text_format', 'latex'))
+        typed['text'] = typed['latex']
+    elif kind == 'table':
+        caption = _join(block.get('table_caption'))
+        body = block.get('table_body') or ''
+        typed.update(type='table', html=body, caption=caption,
+                     footnote=_join(block.get('table_footnote')))
+        typed['text'] = '\n'.join(part for part in (caption, table_text(body)) if part)
+    elif kind == 'image':
+        caption = _join(block.get('image_caption') or block.get('img_caption'))
+        typed.update(type='image', caption=caption,
+                     footnote=_join(block.get('image_footnote') or block.get('img_footnote')))
+        typed['text'] = caption
+    else:
+        if kind != 'text':
+            typed['subtype'] = kind
+        text = block.get('text')
+        if text is None and 'list_items' in block:
+            text = block['list_items']
+        if text is None and 'code_body' in block:
+            text = block['code_body']
+        typed['text'] = _join(text)
+    return typed
+
+
+def typed_blocks(content: list) -> list:
+    return [typed_block(block) for block in content]
+
+
+def blocks_text(blocks: list) -> str:
+    """类型化的块拼接为纯文本，块之间空一行"""
+    return '\n\n'.join(block['text'] for block in blocks if block.get('text'))
+
+
+def group_by_page(content: list, start: int = 0) -> dict:
+    """原始内容块按页分组，键为页索引（从 0 开始，加上分段的起始页索引 start）"""
+    pages = {}
+    for block in offset_pages(content, start):
+        pages.setdefault(block.get('page_idx', 0), []).append(block)
+    return pages
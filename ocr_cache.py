@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 结果缓存（两个 OCR 服务共用）
+
+缓存键由文件内容的 SHA-256 摘要、引擎名、引擎版本和识别参数（语言、
+psm/oem 等）组成，因此同一份图片/PDF 在参数相同时只识别一次，引擎升级后
+旧结果自动失效。
+
+结果以 JSON 存放在本地 SQLite 文件中（多进程/多线程安全），按最近访问时间
+做 LRU 淘汰，总大小不超过上限。
+
+环境变量：
+- OCR_CACHE_ENABLED：是否启用，默认 true
+- OCR_CACHE_DIR：缓存目录，默认 /tmp/ocr_cache
+- OCR_CACHE_MAX_BYTES：缓存总大小上限，默认 1GB
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class OCRResultCache:
+    """基于内容摘要的磁盘 LRU 缓存"""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, enabled: bool = None):
+        if enabled is None:
+            enabled = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+        self.enabled = enabled
+        self.cache_dir = cache_dir or os.environ.get('OCR_CACHE_DIR', '/tmp/ocr_cache')
+        self.max_bytes = max_bytes or int(os.environ.get('OCR_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+        self.db_path = os.path.join(self.cache_dir, 'ocr_cache.sqlite3')
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        with self._init_lock:
+            if not self._initialized:
+                os.makedirs(self.cache_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS entries ('
+                    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                    'size INTEGER NOT NULL, last_access REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)')
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(digest: str, engine: str, version: str, **params) -> str:
+        """
+        生成缓存键
+        :param digest: 文件内容摘要，见 content_digest
+        :param engine: 引擎名，如 tesseract、mineru
+        :param version: 引擎版本
+        :param params: 影响识别结果的参数，如 lang、psm、oem
+        """
+        payload = json.dumps(
+            {'digest': digest, 'engine': engine, 'version': version,
+             'params': {k: str(v) for k, v in params.items()}},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        """读取缓存，未命中返回 None"""
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connect()
+            row = conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.hits += 1
+            return json.loads(row[0])
+        except Exception as e:
+            logger.warning(f"读取OCR缓存失败: {str(e)}")
+            return None
+
+    def set(self, key: str, value) -> None:
+        """写入缓存，超出大小上限时淘汰最久未访问的条目"""
+        if not self.enabled:
+            return
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+            if len(data) > self.max_bytes:
+                return
+            conn = self._connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time.time())
+            )
+            self._evict(conn)
+        except Exception as e:
+            logger.warning(f"写入OCR缓存失败: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的90%，避免每次写入都触发淘汰
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+            if total <= target:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            removed += 1
+        logger.info(f"OCR缓存淘汰 {removed} 条，当前大小 {total} 字节")
+
+    def stats(self) -> dict:
+        stats = {
+            'enabled': self.enabled,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+        if self.enabled:
+            try:
+                count, size = self._connect().execute(
+                    'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+                ).fetchone()
+                stats.update({'entries': count, 'size_bytes': size})
+            except Exception as e:
+                logger.warning(f"读取OCR缓存统计失败: {str(e)}")
+        return stats
+
+
+ocr_cache = OCRResultCache()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 引擎能力信息（版本、可用性、语言列表）的缓存（两个 OCR 服务共用）
+
+查询引擎版本和语言列表都要启动子进程（tesseract --version、
+tesseract --list-langs、mineru --version），不适合放在每个请求里。
+服务启动时探测一次，结果保存在内存中：
+
+- get() 只读内存，健康检查、语言列表等接口每次调用都是 O(1)
+- refresh() 重新探测，由刷新接口显式调用；探测失败（probe 抛出异常）时保留
+  上一次的结果，失败原因记在 last_probe_error 中
+- 设置 OCR_CAPABILITIES_TTL 后，结果过期时 get() 仍立即返回旧结果，
+  同时在后台线程中刷新，请求不会等待子进程
+
+多进程部署时结果在主进程中探测后由各 worker 继承；刷新接口只刷新处理该请求
+的 worker，需要所有 worker 同步时配合 OCR_CAPABILITIES_TTL 使用。
+
+环境变量：
+- OCR_CAPABILITIES_TTL：结果的有效期（秒），默认 0（只在显式刷新时更新）
+"""
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EngineCapabilities:
+    def __init__(self, name: str, probe, ttl: float = None):
+        """
+        :param probe: probe() -> dict，探测引擎信息（可以启动子进程）；探测失败时
+                      应抛出异常而不是返回 available=False，否则会覆盖上一次的结果
+        """
+        self.name = name
+        self.probe = probe
+        if ttl is None:
+            ttl = float(os.environ.get('OCR_CAPABILITIES_TTL', 0))
+        self.ttl = ttl
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._background_pid = None
+
+    def refresh(self) -> dict:
+        """重新探测，同一时间只有一次探测在进行"""
+        with self._refresh_lock:
+            started = time.time()
+            try:
+                info = self.probe()
+            except Exception as e:
+                logger.warning(f"{self.name} 能力探测失败，保留上一次结果: {str(e)}")
+                if self._snapshot is not None:
+                    # 版本和可用性不变（版本是结果缓存键的一部分），只记下这次失败
+                    self._snapshot = dict(self._snapshot, last_probe_error=str(e), last_probe_failed_at=int(started))
+                    return self._snapshot
+                info = {'available': False, 'version': 'unknown', 'error': str(e)}
+            self._snapshot = dict(
+                info,
+                refreshed_at=int(started),
+                probe_seconds=round(time.time() - started, 3)
+            )
+            logger.info(f"{self.name} 能力信息已更新: 版本 {info.get('version', 'unknown')}")
+            return self._snapshot
+
+    def get(self) -> dict:
+        """返回缓存的结果；尚未探测过时同步探测一次"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if self.ttl and time.time() - snapshot['refreshed_at'] > self.ttl:
+            self._refresh_in_background()
+        return snapshot
+
+    def _refresh_in_background(self):
+        # 记录发起刷新的进程，fork 出的子进程不会被父进程的刷新状态卡住
+        if self._background_pid == os.getpid():
+            return
+        self._background_pid = os.getpid()
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                self._background_pid = None
+
+        threading.Thread(target=run, name=f'{self.name}-capabilities', daemon=True).start()
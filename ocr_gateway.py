@@ -0,0 +1,985 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 网关：统一入口，按成本在 Tesseract 和 MinerU 服务之间分配请求
+
+    python ocr_serve.py gateway
+
+- 认证与两个 OCR 服务共用 ocr_auth：网关和后端使用相同的 JWT_SECRET_KEY 和
+  CLIENT_STORE_FILE，调用方的令牌原样转发给后端
+- 网关读取文件内容后按 ocr_routing 的规则选择引擎（简单图片和单栏 PDF 交给
+  Tesseract，多栏、公式、表格较多的 PDF 交给 MinerU），也可以用 engine 参数
+  指定。同一份文件的路由结果按内容摘要保存在 ocr_cache 中
+- 每个引擎有独立的并发上限和等待队列：一个引擎满载时只有发往它的请求排队或
+  返回 503，不占用另一个引擎的名额
+- 文件以原始请求体转发给后端的 /api/v1/ocr/upload，后端的响应（包括 NDJSON
+  流式响应）原样流式返回，响应头 X-OCR-Engine、X-OCR-Route 给出路由结果
+
+批量和异步任务接口不经过网关，直接调用对应的服务。
+
+环境变量：
+- OCR_GATEWAY_TESSERACT_URL：Tesseract 服务地址，默认 http://localhost:5000
+- OCR_GATEWAY_MINERU_URL：MinerU 服务地址，默认 http://localhost:5001
+- OCR_GATEWAY_TESSERACT_CAPACITY：同时转发给 Tesseract 的请求数上限，默认 8
+- OCR_GATEWAY_MINERU_CAPACITY：同时转发给 MinerU 的请求数上限，默认 2
+- OCR_GATEWAY_QUEUE_SIZE：每个引擎的等待队列长度，默认与并发上限相同
+- OCR_GATEWAY_QUEUE_TIMEOUT：在队列中等待的最长时间（秒），默认 30
+- OCR_GATEWAY_BACKEND_TIMEOUT：等待后端响应的超时（秒），默认 600
+多进程部署时并发上限和队列长度按 Web worker 数分摊。
+"""
+import os
+import json
+import math
+import time
+import secrets
+import logging
+import threading
+from urllib.parse import urlparse
+from datetime import datetime
+
+import requests
+from flask import Flask, request, Response, stream_with_context
+from flasgger import Swagger
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import ocr_routing
+from ocr_auth import ServiceAuth
+from ocr_cache import ocr_cache
+from ocr_http import fetch, read_uploads, form_parameters, sniff_file_type, http_session, DownloadTooLarge
+from ocr_lifecycle import ServiceLifecycle
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+app.config['JSON_AS_ASCII'] = False
+
+# ============ Flasgger 配置 ============
+swagger_config = {
+    "headers": [],
+    "specs": [
+        {
+            "endpoint": 'ocr_gateway_spec',
+            "route": '/api/v1/apispec.json',
+        }
+    ],
+    "static_url_path": "/flasgger_static",
+    "swagger_ui": True,
+    "specs_route": "/docs/",
+    "title": "OCR 网关 API 文档",
+    "version": "1.0.0",
+    "description": """
+    OCR统一入口，按文件内容自动选择Tesseract或MinerU
+    ### 路由规则
+    - 单栏图片、简单PDF：Tesseract（快、成本低）
+    - 多栏排版、公式或表格较多的PDF：MinerU（版面分析）
+    - 可用 engine 参数指定引擎
+    ### 使用流程
+    1. 使用 client_id/client_secret 在 `/api/v1/auth/token` 获取令牌
+    2. 在请求头中添加 `Authorization: Bearer <your_token>`
+    3. 调用OCR相关接口
+    """
+}
+
+swagger = Swagger(app, config=swagger_config, template=swagger_config)
+
+# 响应格式化函数
+def format_response(success=True, message=None, data=None, error=None, **kwargs):
+    """格式化API响应"""
+    response = {
+        'success': success,
+        'timestamp': datetime.now().isoformat()
+    }
+
+    if message:
+        response['message'] = message
+    if data is not None:
+        response['data'] = data
+    if error:
+        response['error'] = error
+
+    for key, value in kwargs.items():
+        if value is not None:
+            response[key] = value
+
+    return response
+
+def json_response(success=True, message=None, data=None, error=None, status_code=200, **kwargs):
+    """返回JSON响应"""
+    response_data = format_response(success, message, data, error, **kwargs)
+    response_json = json.dumps(
+        response_data,
+        ensure_ascii=False,
+        indent=2 if app.debug else None
+    )
+    return Response(
+        response_json,
+        status=status_code,
+        mimetype='application/json; charset=utf-8'
+    )
+
+# 配置
+class Config:
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    TIMEOUT = 10
+
+    # 后端服务
+    TESSERACT_URL = os.environ.get('OCR_GATEWAY_TESSERACT_URL', 'http://localhost:5000').rstrip('/')
+    MINERU_URL = os.environ.get('OCR_GATEWAY_MINERU_URL', 'http://localhost:5001').rstrip('/')
+    BACKEND_TIMEOUT = int(os.environ.get('OCR_GATEWAY_BACKEND_TIMEOUT', 600))
+
+    # 每个引擎的并发上限和等待队列
+    TESSERACT_CAPACITY = int(os.environ.get('OCR_GATEWAY_TESSERACT_CAPACITY', 8))
+    MINERU_CAPACITY = int(os.environ.get('OCR_GATEWAY_MINERU_CAPACITY', 2))
+    QUEUE_SIZE = os.environ.get('OCR_GATEWAY_QUEUE_SIZE')
+    QUEUE_TIMEOUT = float(os.environ.get('OCR_GATEWAY_QUEUE_TIMEOUT', 30))
+
+    # 认证配置
+    AUTH_ENABLED = os.environ.get('AUTH_ENABLED', 'True').lower() == 'true'
+    TOKEN_EXPIRATION_HOURS = int(os.environ.get('TOKEN_EXPIRATION_HOURS', 24))
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', secrets.token_hex(32))
+
+    # 客户端配置
+    CLIENT_STORE_FILE = os.environ.get('CLIENT_STORE_FILE', 'clients.json')
+
+    # 公开端点
+    PUBLIC_ENDPOINTS = [
+        '/api/v1/health',
+        '/api/v1/health/live',
+        '/api/v1/health/ready',
+        '/api/v1/auth/token',
+        '/'
+    ]
+
+app.config.from_object(Config)
+
+
+class EngineQueueFull(Exception):
+    """引擎的并发名额和等待队列都已占满，或排队超时"""
+
+    def __init__(self, engine: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.engine = engine
+        self.retry_after = retry_after
+
+
+class EngineQueue:
+    """一个引擎的并发名额和有界等待队列（当前 Web worker 内）"""
+
+    def __init__(self, engine: str, capacity: int, queue_size: int, timeout: float):
+        self.engine = engine
+        self.capacity = max(1, capacity)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """
+        占用一个名额，名额已满时在队列中等待
+        :raises EngineQueueFull: 队列已满或等待超时
+        """
+        started = time.monotonic()
+        with self._cond:
+            if self.active < self.capacity and not self.waiting:
+                self.active += 1
+                return
+            if self.waiting >= self.queue_size:
+                self.rejected += 1
+                raise EngineQueueFull(self.engine, f"{self.engine} 引擎繁忙，等待队列已满", self.retry_after())
+            self.waiting += 1
+            try:
+                acquired = self._cond.wait_for(lambda: self.active < self.capacity, self.timeout)
+            finally:
+                self.waiting -= 1
+            if not acquired:
+                self.timed_out += 1
+                raise EngineQueueFull(self.engine, f"{self.engine} 引擎繁忙，排队超过{self.timeout:g}秒", self.retry_after())
+            self.active += 1
+            self.wait_seconds += time.monotonic() - started
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self.completed += 1
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout / 2))
+
+    def resize(self, capacity: int, queue_size: int):
+        with self._cond:
+            self.capacity = max(1, capacity)
+            self.queue_size = max(0, queue_size)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'queue_size': self.queue_size,
+                'active': self.active,
+                'waiting': self.waiting,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'average_wait_seconds': round(self.wait_seconds / self.completed, 3) if self.completed else 0.0
+            }
+
+
+def queue_size_for(capacity: int) -> int:
+    if app.config['QUEUE_SIZE'] is not None:
+        return int(app.config['QUEUE_SIZE'])
+    return capacity
+
+
+engine_queues = {
+    'tesseract': EngineQueue('tesseract', app.config['TESSERACT_CAPACITY'],
+                             queue_size_for(app.config['TESSERACT_CAPACITY']), app.config['QUEUE_TIMEOUT']),
+    'mineru': EngineQueue('mineru', app.config['MINERU_CAPACITY'],
+                          queue_size_for(app.config['MINERU_CAPACITY']), app.config['QUEUE_TIMEOUT']),
+}
+
+BACKEND_URLS = {
+    'tesseract': app.config['TESSERACT_URL'],
+    'mineru': app.config['MINERU_URL'],
+}
+
+
+def configure_worker(worker_count: int):
+    """多进程部署（ocr_serve）时在每个Web worker中调用：按worker数分摊每个引擎的并发上限和队列长度"""
+    workers = max(1, worker_count)
+    for engine, queue in engine_queues.items():
+        total = app.config[f'{engine.upper()}_CAPACITY']
+        capacity = math.ceil(total / workers)
+        queue.resize(capacity, math.ceil(queue_size_for(total) / workers))
+    logger.info(
+        f"Web worker {os.getpid()}: " +
+        ', '.join(f"{engine} 并发 {queue.capacity} 队列 {queue.queue_size}" for engine, queue in engine_queues.items())
+    )
+
+
+# 存活/就绪状态：就绪检查只读内存状态，不请求后端
+lifecycle = ServiceLifecycle('gateway')
+lifecycle.init_app(app)
+
+# 客户端认证（ocr_auth），与两个OCR服务使用相同的 JWT_SECRET_KEY 和 CLIENT_STORE_FILE
+auth = ServiceAuth(app, 'gateway', json_response)
+client_store = auth.client_store
+requires_auth = auth.requires_auth
+
+# ============ 路由 ============
+# 路由规则版本，规则或阈值改变时旧的缓存结果自动失效
+ROUTING_RULES = 'v1'
+
+# 各引擎接受的参数，其余参数不转发
+ENGINE_PARAMETERS = {
+    'tesseract': ('language', 'psm', 'oem', 'include_words', 'preprocess', 'tiling', 'adaptive', 'stream'),
+    'mineru': ('language', 'stream', 'format'),
+}
+UPLOAD_BOOL_FIELDS = ('include_words', 'tiling', 'stream')
+UPLOAD_JSON_FIELDS = ('preprocess', 'adaptive')
+
+# Tesseract 语言代码 -> MinerU 语言代码（见 ocr_mineru 的 SUPPORTED_LANGUAGES），未列出的原样转发
+MINERU_LANGUAGES = {
+    'eng': 'en',
+    'chi_sim': 'ch',
+    'chi_tra': 'chinese_cht',
+    'kor': 'korean',
+    'jpn': 'japan',
+    'tam': 'ta',
+    'tel': 'te',
+    'kan': 'ka',
+    'tha': 'th',
+    'ell': 'el',
+    'lat': 'latin',
+    'ara': 'arabic',
+    'rus': 'east_slavic',
+    'ukr': 'east_slavic',
+    'bel': 'east_slavic',
+    'hin': 'devanagari',
+}
+
+
+def route_decision(content: bytes, digest: str) -> dict:
+    """按文件内容选择引擎，结果按内容摘要缓存"""
+    file_type, _ = sniff_file_type(content[:16])
+    cache_key = ocr_cache.make_key(
+        digest, 'gateway_route', ROUTING_RULES,
+        sample_pages=ocr_routing.SAMPLE_PAGES,
+        formula_ratio=ocr_routing.FORMULA_RATIO,
+        table_paths=ocr_routing.TABLE_PATHS,
+        thumbnail_width=ocr_routing.THUMBNAIL_WIDTH
+    )
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached, cached=True)
+    started = time.time()
+    result = ocr_routing.choose_engine(content, file_type)
+    result['file_type'] = file_type
+    result['analysis_seconds'] = round(time.time() - started, 3)
+    ocr_cache.set(cache_key, result)
+    return dict(result, cached=False)
+
+
+def select_engine(content: bytes, digest: str, requested) -> dict:
+    """
+    :param requested: engine 参数，auto 或空时按内容路由
+    :raises ValueError: 不支持的引擎
+    """
+    requested = (requested or 'auto').lower()
+    if requested == 'auto':
+        return route_decision(content, digest)
+    if requested not in ocr_routing.ENGINES:
+        raise ValueError(f"engine必须为 auto / {' / '.join(ocr_routing.ENGINES)} 之一")
+    return ocr_routing.decision(requested, 'requested')
+
+
+def backend_parameters(engine: str, data: dict) -> dict:
+    """转发给后端的查询参数：只保留该引擎接受的参数，布尔值和JSON对象转换为字符串"""
+    params = {}
+    for key in ENGINE_PARAMETERS[engine]:
+        value = data.get(key)
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, ensure_ascii=False)
+        params[key] = value
+    if engine == 'mineru':
+        language = data.get('mineru_language')
+        if not language and data.get('language'):
+            primary = str(data['language']).split('+')[0]
+            language = MINERU_LANGUAGES.get(primary, primary)
+        if language:
+            params['language'] = language
+    return params
+
+
+def forward(engine: str, content: bytes, data: dict, filename, route: dict):
+    """
+    在引擎队列中占用名额后把文件转发给后端，流式返回后端的响应，响应结束时释放名额
+    :raises EngineQueueFull: 引擎繁忙
+    :raises requests.exceptions.RequestException: 后端不可用
+    """
+    queue = engine_queues[engine]
+    queue.acquire()
+    try:
+        params = backend_parameters(engine, data)
+        if filename:
+            params['filename'] = filename
+        headers = {'Content-Type': 'application/octet-stream'}
+        for name in ('Authorization', 'Accept'):
+            if request.headers.get(name):
+                headers[name] = request.headers[name]
+        upstream = http_session().post(
+            f"{BACKEND_URLS[engine]}/api/v1/ocr/upload",
+            params=params,
+            data=content,
+            headers=headers,
+            timeout=(app.config['TIMEOUT'], app.config['BACKEND_TIMEOUT']),
+            stream=True
+        )
+    except BaseException:
+        queue.release()
+        raise
+
+    def close():
+        upstream.close()
+        queue.release()
+
+    response = Response(
+        stream_with_context(upstream.iter_content(chunk_size=None)),
+        status=upstream.status_code,
+        content_type=upstream.headers.get('Content-Type', 'application/json; charset=utf-8')
+    )
+    for name in ('Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset'):
+        if name in upstream.headers:
+            response.headers[name] = upstream.headers[name]
+    response.headers['X-OCR-Engine'] = engine
+    response.headers['X-OCR-Route'] = route['reason']
+    response.call_on_close(close)
+    return response
+
+
+def gateway_response(content: bytes, digest: str, data: dict, filename):
+    """选择引擎并转发；繁忙、后端不可用和参数错误时返回JSON错误"""
+    client_id = getattr(request, 'client_id', 'unknown')
+    try:
+        route = select_engine(content, digest, data.get('engine'))
+    except ValueError as e:
+        return json_response(
+            success=False,
+            error="参数错误",
+            message=str(e),
+            status_code=400,
+            client_id=client_id
+        )
+
+    engine = route['engine']
+    logger.info(f"客户端 {client_id} 的请求路由到 {engine}: {route['reason']}")
+    try:
+        return forward(engine, content, data, filename, route)
+    except EngineQueueFull as e:
+        response = json_response(
+            success=False,
+            error="服务繁忙",
+            message=str(e),
+            status_code=503,
+            client_id=client_id,
+            engine=engine
+        )
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except requests.exceptions.RequestException as e:
+        logger.error(f"{engine} 后端请求失败: {str(e)}")
+        return json_response(
+            success=False,
+            error="后端服务不可用",
+            message=f"{engine} 服务请求失败",
+            status_code=502,
+            client_id=client_id,
+            engine=engine
+        )
+
+
+def upload_parameters() -> dict:
+    """读取上传接口的参数：查询参数，multipart请求再合并表单字段"""
+    data = form_parameters(request.args, UPLOAD_BOOL_FIELDS, UPLOAD_JSON_FIELDS)
+    if request.mimetype == 'multipart/form-data':
+        data.update(form_parameters(request.form, UPLOAD_BOOL_FIELDS, UPLOAD_JSON_FIELDS))
+    return data
+
+
+def read_request_file():
+    """
+    读取请求中的文件：JSON请求体中的 file_url 由网关下载，否则读取上传的文件
+    :return: (参数, 文件名, 内容, 摘要)
+    :raises ValueError: 参数错误或没有文件
+    :raises DownloadTooLarge: 文件超过大小上限
+    :raises requests.exceptions.RequestException: 下载失败
+    """
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        file_url = data.get('file_url')
+        if not file_url:
+            raise ValueError("需要file_url参数")
+        parsed = urlparse(file_url)
+        if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+            raise ValueError("URL格式不正确")
+        with fetch(file_url, app.config['MAX_CONTENT_LENGTH'], timeout=app.config['TIMEOUT']) as download:
+            content = download.read()
+            digest = download.digest
+        return data, os.path.basename(parsed.path) or None, content, digest
+
+    data = upload_parameters()
+    uploads = read_uploads(request, app.config['MAX_CONTENT_LENGTH'])
+    filename, upload = uploads[0]
+    with upload:
+        return data, filename, upload.read(), upload.digest
+
+
+def file_error_response(e: Exception):
+    client_id = getattr(request, 'client_id', 'unknown')
+    if isinstance(e, (DownloadTooLarge, RequestEntityTooLarge)):
+        return json_response(
+            success=False,
+            error="文件太大",
+            message=str(e) if isinstance(e, DownloadTooLarge) else
+            f"请求大小超过限制: {app.config['MAX_CONTENT_LENGTH']}字节",
+            status_code=400,
+            client_id=client_id
+        )
+    if isinstance(e, requests.exceptions.RequestException):
+        return json_response(
+            success=False,
+            error="文件下载失败",
+            message=str(e),
+            status_code=400,
+            client_id=client_id
+        )
+    return json_response(
+        success=False,
+        error="参数错误",
+        message=str(e),
+        status_code=400,
+        client_id=client_id
+    )
+
+
+# 健康检查端点
+@app.route('/api/v1/health', methods=['GET'])
+def health_check():
+    """
+    网关健康检查
+    ---
+    tags:
+      - 服务信息
+    summary: 检查网关和两个后端服务的状态
+    description: |
+      请求两个后端的就绪探测（/api/v1/health/ready），并返回每个引擎的并发名额和队列状态。
+      任一后端就绪时网关即可用；两个后端都不可用时返回503。
+    responses:
+      200:
+        description: 网关可用
+        schema:
+          type: object
+          properties:
+            data:
+              type: object
+              properties:
+                backends:
+                  type: object
+                  description: 各后端地址和是否就绪
+                engines:
+                  type: object
+                  description: 每个引擎的并发上限、队列长度、正在处理和排队的请求数（当前worker）
+                auth:
+                  type: object
+                  description: 认证状态、令牌存储、凭证缓存和限流统计（当前worker）
+      503:
+        description: 两个后端都不可用
+    """
+    backends = {}
+    for engine, url in BACKEND_URLS.items():
+        try:
+            ready = http_session().get(f"{url}/api/v1/health/ready", timeout=3).status_code == 200
+        except requests.exceptions.RequestException:
+            ready = False
+        backends[engine] = {'url': url, 'ready': ready}
+
+    data = {
+        'backends': backends,
+        'engines': {engine: queue.stats() for engine, queue in engine_queues.items()},
+        'auth': auth.stats(),
+        'ocr_cache': ocr_cache.stats()
+    }
+    if not any(backend['ready'] for backend in backends.values()):
+        return json_response(
+            success=False,
+            error="服务异常",
+            message="所有后端服务都不可用",
+            data=data,
+            status_code=503
+        )
+    return json_response(
+        success=True,
+        message="服务运行正常",
+        data=data
+    )
+
+# 存活探测
+@app.route('/api/v1/health/live', methods=['GET'])
+def liveness_check():
+    """
+    存活探测
+    ---
+    tags:
+      - 服务信息
+    summary: 进程能处理请求即返回200，不做任何外部调用
+    responses:
+      200:
+        description: 进程存活
+    """
+    return json_response(
+        success=True,
+        message="存活",
+        data=lifecycle.status()
+    )
+
+# 就绪探测
+@app.route('/api/v1/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    就绪探测
+    ---
+    tags:
+      - 服务信息
+    summary: 可以接收新请求时返回200，下线中时返回503
+    description: |
+      只读取进程内状态，不请求后端，可供负载均衡器高频探测。
+    responses:
+      200:
+        description: 就绪
+      503:
+        description: 下线中
+    """
+    ready, checks = lifecycle.readiness()
+    data = dict(lifecycle.status(), checks=checks)
+    if not ready:
+        return json_response(
+            success=False,
+            error="服务未就绪",
+            message="下线中" if lifecycle.draining else "就绪检查未通过",
+            data=data,
+            status_code=503
+        )
+    return json_response(
+        success=True,
+        message="就绪",
+        data=data
+    )
+
+# 获取访问令牌
+@app.route('/api/v1/auth/token', methods=['POST'])
+def get_access_token():
+    """
+    获取API访问令牌（网关和两个OCR服务通用）
+    ---
+    tags:
+      - 认证管理
+    consumes:
+      - application/json
+    parameters:
+      - in: body
+        name: body
+        description: 通过JSON传递凭证
+        schema:
+          type: object
+          properties:
+            client_id:
+              type: string
+            client_secret:
+              type: string
+    responses:
+      200:
+        description: 令牌获取成功
+      400:
+        description: 缺少必要的凭证参数
+      401:
+        description: 无效的客户端凭证
+    """
+    return auth.token_response()
+
+# 路由预览
+@app.route('/api/v1/route', methods=['POST'])
+@requires_auth
+def preview_route():
+    """
+    查看文件会被路由到哪个引擎（不识别）
+    ---
+    tags:
+      - OCR路由
+    security:
+      - Bearer: []
+    summary: 返回路由结果和版面特征
+    description: |
+      请求方式与 /api/v1/ocr/url（JSON请求体，file_url）或 /api/v1/ocr/upload（上传文件）相同。
+
+      **路由原因（reason）**：
+      - single_column：单栏图片，Tesseract
+      - simple_pdf：单栏、公式和表格较少的PDF，Tesseract
+      - multi_column：多栏排版，MinerU
+      - formula：文本层中数学符号较多，MinerU
+      - table：线条对象较多（表格），MinerU
+      - unanalyzable_pdf：无法分析的PDF，MinerU
+      - requested：由 engine 参数指定
+    consumes:
+      - application/json
+      - multipart/form-data
+      - application/octet-stream
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        default: "Bearer "
+      - in: body
+        name: body
+        required: false
+        schema:
+          type: object
+          properties:
+            file_url:
+              type: string
+            engine:
+              type: string
+              enum: [auto, tesseract, mineru]
+    responses:
+      200:
+        description: 路由结果
+        schema:
+          type: object
+          properties:
+            data:
+              type: object
+              properties:
+                engine:
+                  type: string
+                  example: "mineru"
+                reason:
+                  type: string
+                  example: "multi_column"
+                features:
+                  type: object
+                  description: 页数、栏数、数学符号比例、线条对象数等
+                cached:
+                  type: boolean
+      400:
+        description: 参数错误或文件读取失败
+      401:
+        description: 认证失败
+    """
+    try:
+        data, filename, content, digest = read_request_file()
+        route = select_engine(content, digest, data.get('engine'))
+    except (ValueError, DownloadTooLarge, RequestEntityTooLarge, requests.exceptions.RequestException) as e:
+        return file_error_response(e)
+    return json_response(
+        success=True,
+        message=f"路由到 {route['engine']}",
+        data=dict(route, filename=filename, size=len(content))
+    )
+
+# URL识别端点
+@app.route('/api/v1/ocr/url', methods=['POST'])
+@requires_auth
+def ocr_from_url():
+    """
+    通过URL识别，自动选择引擎
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 网关下载文件后按内容选择引擎并转发
+    description: |
+      响应为所选后端的原始响应（格式分别与 Tesseract 和 MinerU 服务的 /api/v1/ocr/upload 相同），
+      响应头 X-OCR-Engine 为所选引擎，X-OCR-Route 为路由原因。
+
+      只转发所选引擎支持的参数：Tesseract 为 language、psm、oem、include_words、preprocess、
+      tiling、adaptive、stream；MinerU 为 language、stream、format。language 使用 Tesseract 的语言代码，
+      转发给 MinerU 时自动换算，也可以用 mineru_language 直接指定 MinerU 的语言代码。
+    consumes:
+      - application/json
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        default: "Bearer "
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - file_url
+          properties:
+            file_url:
+              type: string
+              example: "https://example.com/paper.pdf"
+            engine:
+              type: string
+              enum: [auto, tesseract, mineru]
+              default: auto
+            language:
+              type: string
+              default: "eng"
+            mineru_language:
+              type: string
+            psm:
+              type: string
+            oem:
+              type: string
+            include_words:
+              type: boolean
+            preprocess:
+              type: string
+            tiling:
+              type: boolean
+            adaptive:
+              description: 置信度自适应重试（仅Tesseract），true 或参数对象
+            stream:
+              type: boolean
+            format:
+              type: string
+              enum: [raw, blocks, text, ndjson]
+    responses:
+      200:
+        description: 识别成功，响应体来自所选后端
+      400:
+        description: 参数错误、文件下载失败或文件太大
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限
+      502:
+        description: 后端服务不可用
+      503:
+        description: 所选引擎繁忙（并发名额和等待队列已满或排队超时），见 Retry-After
+    """
+    if not request.is_json:
+        return json_response(
+            success=False,
+            error="参数错误",
+            message="请求体必须为JSON",
+            status_code=400,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+    try:
+        data, filename, content, digest = read_request_file()
+    except (ValueError, DownloadTooLarge, RequestEntityTooLarge, requests.exceptions.RequestException) as e:
+        return file_error_response(e)
+    return gateway_response(content, digest, data, filename)
+
+# 上传识别端点
+@app.route('/api/v1/ocr/upload', methods=['POST'])
+@requires_auth
+def ocr_from_upload():
+    """
+    上传文件识别，自动选择引擎
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 按文件内容选择引擎并转发
+    description: |
+      上传方式与两个OCR服务的 /api/v1/ocr/upload 相同：multipart/form-data 的 file 字段，
+      或原始请求体（参数放在查询字符串）。参数、响应和路由响应头同 /api/v1/ocr/url。
+    consumes:
+      - multipart/form-data
+      - application/octet-stream
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        default: "Bearer "
+      - in: formData
+        name: file
+        type: file
+        required: false
+      - in: formData
+        name: engine
+        type: string
+        enum: [auto, tesseract, mineru]
+        default: auto
+      - in: formData
+        name: language
+        type: string
+        default: "eng"
+      - in: formData
+        name: mineru_language
+        type: string
+      - in: formData
+        name: stream
+        type: boolean
+      - in: formData
+        name: format
+        type: string
+    responses:
+      200:
+        description: 识别成功，响应体来自所选后端
+      400:
+        description: 参数错误、没有上传文件或文件太大
+      401:
+        description: 认证失败
+      502:
+        description: 后端服务不可用
+      503:
+        description: 所选引擎繁忙，见 Retry-After
+    """
+    try:
+        data, filename, content, digest = read_request_file()
+    except (ValueError, DownloadTooLarge, RequestEntityTooLarge, requests.exceptions.RequestException) as e:
+        return file_error_response(e)
+    return gateway_response(content, digest, data, filename)
+
+# 首页
+@app.route('/', methods=['GET'])
+def index():
+    """
+    网关首页和API概览
+    ---
+    tags:
+      - 服务信息
+    summary: 获取网关信息、后端地址和API端点列表
+    responses:
+      200:
+        description: 服务信息获取成功
+    """
+    return json_response(
+        success=True,
+        message="OCR 网关",
+        data={
+            'service': 'OCR Gateway',
+            'version': '1.0.0',
+            'authentication_required': app.config['AUTH_ENABLED'],
+            'backends': BACKEND_URLS,
+            'endpoints': {
+                'health': {'path': '/api/v1/health', 'method': 'GET', 'auth': False},
+                'liveness': {'path': '/api/v1/health/live', 'method': 'GET', 'auth': False},
+                'readiness': {'path': '/api/v1/health/ready', 'method': 'GET', 'auth': False},
+                'get_token': {'path': '/api/v1/auth/token', 'method': 'POST', 'auth': False},
+                'route': {'path': '/api/v1/route', 'method': 'POST', 'auth': True},
+                'ocr': {'path': '/api/v1/ocr/url', 'method': 'POST', 'auth': True},
+                'upload_ocr': {'path': '/api/v1/ocr/upload', 'method': 'POST', 'auth': True}
+            },
+            'authentication': {
+                'method': 'client_id / client_secret',
+                'token_type': 'Bearer Token'
+            }
+        }
+    )
+
+# 错误处理器
+@app.errorhandler(404)
+def not_found(error):
+    return json_response(
+        success=False,
+        error="API端点不存在",
+        message="请检查请求路径",
+        status_code=404
+    )
+
+@app.errorhandler(405)
+def method_not_allowed(error):
+    return json_response(
+        success=False,
+        error="请求方法不允许",
+        message="请检查HTTP方法",
+        status_code=405
+    )
+
+if __name__ == '__main__':
+    logger.info("=" * 50)
+    logger.info("OCR 网关启动")
+    logger.info("=" * 50)
+
+    logger.info(f"认证状态: {'启用' if app.config['AUTH_ENABLED'] else '禁用'}")
+    for engine, url in BACKEND_URLS.items():
+        queue = engine_queues[engine]
+        logger.info(f"{engine} 后端: {url}, 并发 {queue.capacity}, 队列 {queue.queue_size}")
+    logger.info(f"客户端数量: {len(client_store.clients)}")
+
+    logger.info("")
+    logger.info("API端点:")
+    logger.info("  GET  /              - 首页")
+    logger.info("  GET  /api/v1/health - 健康检查")
+    logger.info("  GET  /api/v1/health/live - 存活探测")
+    logger.info("  GET  /api/v1/health/ready - 就绪探测")
+    logger.info("  POST /api/v1/auth/token - 获取令牌")
+    logger.info("  POST /api/v1/route - 路由预览（需认证）")
+    logger.info("  POST /api/v1/ocr/url - OCR识别（需认证）")
+    logger.info("  POST /api/v1/ocr/upload - 上传文件OCR（需认证）")
+    logger.info("")
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', 5002))
+    debug = os.environ.get('DEBUG', 'False').lower() == 'true'
+    logger.info(f"API文档地址: http://{host}:{port}/docs/")
+    logger.info(f"服务器地址: http://{host}:{port}")
+    logger.info(f"调试模式: {debug}")
+    logger.info("生产环境请使用多进程模式: python ocr_serve.py gateway")
+    lifecycle.install_signal_handler()
+    app.run(host=host, port=port, debug=debug, threaded=True)
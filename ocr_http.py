@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 服务共用的文件下载
+
+- 所有下载共用一个带连接池的 requests.Session，同一主机的连接保持复用
+- 响应体分块流式写入 SpooledTemporaryFile：小文件留在内存，超过
+  OCR_DOWNLOAD_SPOOL_BYTES 后转存到工作区根目录（见 ocr_scratch）；
+  in_memory=True 时始终留在内存（Tesseract 服务不写临时文件，大小由上限约束）
+- 累计大小超过上限立即中断下载，不依赖可能缺失或不实的 Content-Length
+- 文件类型按内容开头的魔数判断，不依赖 Content-Type
+- 下载的同时计算 SHA-256 摘要，可直接用作缓存键
+
+上传接口（multipart 或原始请求体）也通过 read_uploads 走同样的有界缓冲，
+与下载的文件共用后续的校验、缓存和识别流程。不写临时文件的服务同时使用
+InMemoryRequest，multipart 解析阶段也不落盘。
+
+环境变量：
+- OCR_HTTP_POOL_HOSTS：连接池缓存的主机数，默认 16
+- OCR_HTTP_POOL_SIZE：每个主机保持的连接数，默认 32
+- OCR_DOWNLOAD_SPOOL_BYTES：内存缓冲上限，默认 2MB
+"""
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+
+import requests
+from flask import Request
+from requests.adapters import HTTPAdapter
+
+from ocr_scratch import scratch
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+CHUNK_SIZE = 64 * 1024
+SPOOL_BYTES = int(os.environ.get('OCR_DOWNLOAD_SPOOL_BYTES', 2 * 1024 * 1024))
+
+# (魔数, 偏移, 类型, 后缀)
+MAGIC_NUMBERS = [
+    (b'%PDF-', 0, 'pdf', '.pdf'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'png', '.png'),
+    (b'\xff\xd8\xff', 0, 'jpeg', '.jpg'),
+    (b'II*\x00', 0, 'tiff', '.tiff'),
+    (b'MM\x00*', 0, 'tiff', '.tiff'),
+    (b'GIF87a', 0, 'gif', '.gif'),
+    (b'GIF89a', 0, 'gif', '.gif'),
+    (b'BM', 0, 'bmp', '.bmp'),
+    (b'WEBP', 8, 'webp', '.webp'),
+]
+
+
+class DownloadTooLarge(Exception):
+    """下载内容超过大小上限"""
+
+
+def sniff_file_type(head: bytes):
+    """
+    按魔数判断文件类型
+    :return: (类型, 后缀)，无法识别时返回 (None, None)
+    """
+    for magic, offset, file_type, suffix in MAGIC_NUMBERS:
+        if head[offset:offset + len(magic)] == magic:
+            if file_type == 'webp' and head[:4] != b'RIFF':
+                continue
+            return file_type, suffix
+    return None, None
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """进程内共享的 Session（首次使用时创建，子进程各自创建）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=int(os.environ.get('OCR_HTTP_POOL_HOSTS', 16)),
+                pool_maxsize=int(os.environ.get('OCR_HTTP_POOL_SIZE', 32))
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            _session = session
+        return _session
+
+
+class DownloadedFile:
+    """下载结果，内容保存在 SpooledTemporaryFile 中"""
+
+    def __init__(self, buffer, size: int, digest: str, file_type, suffix, content_type: str):
+        self._buffer = buffer
+        self.size = size
+        self.digest = digest
+        self.file_type = file_type
+        self.suffix = suffix
+        self.content_type = content_type
+
+    def read(self) -> bytes:
+        self._buffer.seek(0)
+        return self._buffer.read()
+
+    def save(self, path: str) -> str:
+        """写入到文件，不经过整块内存"""
+        self._buffer.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self._buffer, f, CHUNK_SIZE)
+        return path
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InMemoryRequest(Request):
+    """
+    multipart 上传的文件解析到内存中（werkzeug 默认超过 500KB 写入临时文件），
+    整个请求的大小由 MAX_CONTENT_LENGTH 约束。用法：app.request_class = InMemoryRequest
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
+
+def spool_stream(chunks, max_bytes: int, content_type: str = '', deadline: float = None,
+                 in_memory: bool = False) -> DownloadedFile:
+    """
+    把分块数据写入有界缓冲，同时计算摘要并识别类型
+    :param chunks: 可迭代的 bytes 块
+    :param deadline: time.monotonic() 截止时间，超过时抛出 requests.exceptions.Timeout
+    :param in_memory: 始终保存在内存中，不转存到临时文件（最多 max_bytes）
+    :raises DownloadTooLarge: 累计大小超过 max_bytes
+    """
+    if in_memory:
+        buffer = io.BytesIO()
+    else:
+        buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, dir=scratch.root)
+    digest = hashlib.sha256()
+    head = b''
+    size = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise DownloadTooLarge(f"文件大小超过限制: {max_bytes}字节")
+            if deadline is not None and time.monotonic() > deadline:
+                raise requests.exceptions.Timeout("下载超时")
+            if len(head) < 16:
+                head += chunk[:16 - len(head)]
+            digest.update(chunk)
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+    file_type, suffix = sniff_file_type(head)
+    return DownloadedFile(buffer, size, digest.hexdigest(), file_type, suffix, content_type)
+
+
+def fetch(url: str, max_bytes: int, timeout: float = 10, headers: dict = None,
+          deadline: float = None, in_memory: bool = False) -> DownloadedFile:
+    """
+    流式下载URL
+    :param max_bytes: 大小上限，超过时中断连接
+    :param timeout: 连接/读取超时（秒）
+    :param deadline: 整个下载的 time.monotonic() 截止时间，防止慢速响应长期占用线程
+    :param in_memory: 下载内容始终保存在内存中，不写临时文件
+    :raises DownloadTooLarge: 声明或实际大小超过上限
+    :raises requests.exceptions.RequestException: 网络错误或HTTP错误状态
+    """
+    with http_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_length = response.headers.get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            raise DownloadTooLarge(f"文件大小超过限制: {content_length}字节")
+        content_type = response.headers.get('content-type', '')
+        download = spool_stream(
+            response.iter_content(CHUNK_SIZE), max_bytes, content_type, deadline, in_memory
+        )
+    if download.file_type is None:
+        logger.warning(f"无法识别下载文件的类型: {url} (Content-Type: {content_type})")
+    return download
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+
+def form_parameters(values, bool_fields=(), json_fields=()) -> dict:
+    """
+    把表单/查询参数（都是字符串）转换为与JSON请求体相同的类型
+    :param values: request.form 或 request.args
+    :param bool_fields: 布尔参数名
+    :param json_fields: 可以是JSON对象的参数名（以 { 开头时按JSON解析）
+    :raises ValueError: 参数无法转换
+    """
+    data = {}
+    for key in values:
+        value = values.get(key)
+        if key in bool_fields:
+            lowered = value.strip().lower()
+            if lowered in TRUE_VALUES:
+                value = True
+            elif lowered in FALSE_VALUES:
+                value = False
+            else:
+                raise ValueError(f"{key}必须为布尔值")
+        elif key in json_fields and value.lstrip().startswith('{'):
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError(f"{key}不是有效的JSON")
+        data[key] = value
+    return data
+
+
+def read_uploads(req, max_bytes: int, field: str = 'file', max_files: int = 1, in_memory: bool = False):
+    """
+    读取上传的文件：multipart/form-data 时取 field 字段的文件，否则把整个请求体
+    当作一个文件（文件名取查询参数 filename）
+    :param req: Flask 请求对象
+    :param in_memory: 文件始终保存在内存中；multipart 解析本身也不写临时文件时
+                      应用还需使用 InMemoryRequest
+    :return: [(文件名, DownloadedFile)]
+    :raises DownloadTooLarge: 单个文件超过 max_bytes
+    :raises ValueError: 没有文件或文件数超过 max_files
+    """
+    if req.mimetype == 'multipart/form-data':
+        files = [(f.filename, f.stream) for f in req.files.getlist(field)]
+    else:
+        if req.content_length and req.content_length > max_bytes:
+            raise DownloadTooLarge(f"文件大小超过限制: {req.content_length}字节")
+        files = [(req.args.get('filename'), req.stream)]
+    if len(files) > max_files:
+        raise ValueError(f"最多上传{max_files}个文件")
+
+    uploads = []
+    try:
+        for filename, stream in files:
+            upload = spool_stream(
+                iter(lambda: stream.read(CHUNK_SIZE), b''), max_bytes, req.mimetype, in_memory=in_memory
+            )
+            uploads.append((filename, upload))
+    except BaseException:
+        for _, upload in uploads:
+            upload.close()
+        raise
+    for _, upload in uploads:
+        if upload.size == 0:
+            upload.close()
+    uploads = [(filename, upload) for filename, upload in uploads if upload.size > 0]
+    if not uploads:
+        raise ValueError(f"没有上传文件（multipart字段 {field} 或请求体）")
+    return uploads
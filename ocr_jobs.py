@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+异步OCR任务
+
+任务提交后立即返回任务ID，由有界的后台线程池执行。任务函数通过
+job.report_progress() 汇报进度，并在处理各部分之间调用 job.check_cancelled()
+响应取消请求。任务信息保存在内存中，结束后保留 OCR_JOB_TTL 秒。
+
+任务状态、结果和取消标志只存在于提交任务的进程里：同一个服务以多个 Web
+worker 运行时，查询、下载结果和取消请求会落到其他 worker 上并返回 404。
+因此使用异步任务的服务只能以单个 worker 运行（ocr_serve 对 MinerU 服务
+强制 1 个 worker）。
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class JobQueueFull(Exception):
+    """排队中的任务数已达上限"""
+
+
+class ClientJobLimit(Exception):
+    """客户端排队和执行中的任务数已达其并发上限"""
+
+
+class OCRJob:
+    def __init__(self, client_id: str, params: dict):
+        self.job_id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.params = params
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {'pages_done': 0, 'pages_total': None, 'stage': QUEUED}
+        self.result = None
+        self.error = None
+        self._cancel_event = threading.Event()
+        self.future = None
+
+    def report_progress(self, stage: str = None, pages_done: int = None, pages_total: int = None):
+        if stage is not None:
+            self.progress['stage'] = stage
+        if pages_done is not None:
+            self.progress['pages_done'] = pages_done
+        if pages_total is not None:
+            self.progress['pages_total'] = pages_total
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'progress': dict(self.progress),
+            'parameters': self.params,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """管理异步OCR任务，线程安全"""
+
+    def __init__(self, max_workers: int = None, max_queued: int = None, ttl: int = None):
+        self.max_workers = max(1, max_workers or int(os.environ.get('OCR_JOB_WORKERS', 1)))
+        self.max_queued = max_queued or int(os.environ.get('OCR_JOB_MAX_QUEUED', 50))
+        self.ttl = ttl or int(os.environ.get('OCR_JOB_TTL', 3600))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ocr-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, func, client_id: str, params: dict, max_active: int = None) -> OCRJob:
+        """
+        提交任务
+        :param func: func(job) -> result，在后台线程中执行
+        :param max_active: 该客户端排队和执行中的任务数上限（客户端的 max_concurrent），
+            提交请求结束后任务仍在后台运行，按这个上限计入客户端的并发数
+        :raises JobQueueFull: 排队中的任务过多
+        :raises ClientJobLimit: 该客户端未结束的任务已达上限
+        """
+        self._sweep()
+        job = OCRJob(client_id, params)
+        with self._lock:
+            queued = sum(1 for j in self._jobs.values() if j.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"排队中的任务已达上限: {self.max_queued}")
+            if max_active:
+                active = sum(
+                    1 for j in self._jobs.values()
+                    if j.client_id == client_id and j.status not in FINISHED_STATES
+                )
+                if active >= max_active:
+                    raise ClientJobLimit(f"未完成的任务已达并发上限: {max_active}")
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, func, job)
+        logger.info(f"客户端 {client_id} 提交OCR任务: {job.job_id}")
+        return job
+
+    def _run(self, func, job: OCRJob):
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.report_progress(stage=RUNNING)
+        try:
+            job.result = func(job)
+            self._finish(job, SUCCEEDED)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.error(f"OCR任务 {job.job_id} 失败: {str(e)}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    def _finish(self, job: OCRJob, status: str):
+        job.status = status
+        job.finished_at = time.time()
+        job.report_progress(stage=status)
+        logger.info(f"OCR任务 {job.job_id} 结束: {status}")
+
+    def get(self, job_id: str, client_id: str = None):
+        """读取任务，不属于该客户端的任务视为不存在"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (client_id is not None and job.client_id != client_id):
+            return None
+        return job
+
+    def cancel(self, job_id: str, client_id: str = None):
+        """
+        请求取消任务：排队中的任务立即取消，执行中的任务在当前部分处理完后停止
+        :return: 任务，不存在时返回 None
+        """
+        job = self.get(job_id, client_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job._cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return job
+
+    def _sweep(self):
+        """清理已过期的已结束任务"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in FINISHED_STATES and now - job.finished_at > self.ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'workers': self.max_workers, 'max_queued': self.max_queued, 'jobs': counts}
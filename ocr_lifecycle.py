@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 服务的存活/就绪状态与优雅下线
+
+- 存活（live）：进程能处理请求即为存活，不做任何外部调用
+- 就绪（ready）：未处于下线状态且各项就绪检查通过；检查函数只读内存状态，
+  不启动子进程，可被负载均衡器高频探测
+- 下线（draining）：收到 SIGTERM、调用 start_draining() 或 OCR_DRAIN_FILE
+  指定的文件存在时进入下线状态，就绪探测返回失败，已接收的请求继续处理完
+
+每个 Web worker 进程各有一份状态（由 ocr_serve 在 fork 后重置），
+in_flight 为当前 worker 正在处理的请求数。
+"""
+import os
+import time
+import signal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceLifecycle:
+    def __init__(self, name: str):
+        self.name = name
+        self.drain_file = os.environ.get('OCR_DRAIN_FILE')
+        self._lock = threading.Lock()
+        self._checks = {}
+        self._shutdown_hooks = []
+        self.reset()
+
+    def reset(self):
+        """重置为新进程的初始状态（fork 后调用）"""
+        with self._lock:
+            self.pid = os.getpid()
+            self.started_at = time.time()
+            self.in_flight = 0
+            self.requests_total = 0
+            self._draining = False
+
+    # ============ 请求计数 ============
+    def init_app(self, app):
+        """在 Flask 应用上注册请求计数"""
+        @app.before_request
+        def _lifecycle_request_started():
+            with self._lock:
+                self.in_flight += 1
+                self.requests_total += 1
+
+        @app.teardown_request
+        def _lifecycle_request_finished(exc=None):
+            with self._lock:
+                self.in_flight -= 1
+
+    # ============ 就绪检查 ============
+    def add_check(self, name: str, check):
+        """注册就绪检查：check() -> bool，必须是不阻塞的内存检查"""
+        self._checks[name] = check
+
+    def add_shutdown_hook(self, hook):
+        """注册下线时执行的清理函数（关闭进程池等）"""
+        self._shutdown_hooks.append(hook)
+
+    @property
+    def draining(self) -> bool:
+        if self._draining:
+            return True
+        return bool(self.drain_file) and os.path.exists(self.drain_file)
+
+    def start_draining(self, reason: str = ''):
+        with self._lock:
+            if self._draining:
+                return
+            self._draining = True
+        logger.info(f"{self.name} 进入下线状态 (pid={os.getpid()}) {reason}".rstrip())
+
+    def readiness(self):
+        """
+        :return: (是否就绪, 各检查项结果)
+        """
+        results = {}
+        for name, check in self._checks.items():
+            try:
+                results[name] = bool(check())
+            except Exception as e:
+                logger.warning(f"就绪检查 {name} 失败: {str(e)}")
+                results[name] = False
+        results['not_draining'] = not self.draining
+        return all(results.values()), results
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'pid': self.pid,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'in_flight': self.in_flight,
+                'requests_total': self.requests_total,
+                'draining': self.draining
+            }
+
+    def shutdown(self):
+        """执行清理函数，重复调用只执行一次"""
+        self.start_draining('关闭中')
+        hooks, self._shutdown_hooks = self._shutdown_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.warning(f"关闭时清理失败: {str(e)}")
+
+    def install_signal_handler(self):
+        """
+        开发服务器（app.run）下使用：SIGTERM 时先进入下线状态再退出
+        gunicorn 下由 ocr_serve 的钩子处理，不要调用
+        """
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle(signum, frame):
+            self.shutdown()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(0)
+
+        signal.signal(signal.SIGTERM, handle)
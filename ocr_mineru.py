@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from PIL import Image
 import io
 import requests
@@ -9,17 +9,35 @@ from datetime import datetime, timedelta
 import os
 import json
 import secrets
-import hashlib
-from functools import wraps
 import base64
 import time
-import hmac
 import uuid
-import tempfile
+import math
+import sys
 import subprocess
 import shutil
+import importlib.util
+import importlib.metadata
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from flasgger import Swagger, swag_from
+from werkzeug.exceptions import RequestEntityTooLarge
+from ocr_batch import BatchExecutor, remaining_seconds
+from ocr_mineru_worker import MinerUWorkerPool, MinerUWorkerTimeout
+from ocr_cache import ocr_cache, content_digest
+from ocr_http import fetch, read_uploads, form_parameters, DownloadTooLarge
+from ocr_lifecycle import ServiceLifecycle
+from ocr_auth import ServiceAuth
+from ocr_capabilities import EngineCapabilities
+from ocr_blocks import read_content_list, typed_blocks, blocks_text, group_by_page, offset_pages
+from ocr_scratch import scratch, ScratchQuotaExceeded
+import ocr_jobs
+from ocr_jobs import JobManager, JobQueueFull, ClientJobLimit
+
+try:
+    import pypdfium2 as pdfium  # MinerU 的依赖，用于统计和拆分PDF页
+except ImportError:
+    pdfium = None
 
 # 配置日志
 logging.basicConfig(
@@ -65,6 +83,9 @@ swagger = Swagger(app, config=swagger_config, template=swagger_config)
 # ============ MinerU OCR 配置 ============
 class MinerUConfig:
     MINERU_PATH = os.environ.get('MINERU_PATH', 'mineru')  # mineru命令路径
+    # worker: 常驻worker进程（模型只加载一次）；cli: 每次请求调用mineru命令
+    MODE = os.environ.get('MINERU_MODE', 'worker').lower()
+    PROCESS_TIMEOUT = int(os.environ.get('MINERU_TIMEOUT', 300))
     DEFAULT_OUTPUT_DIR = os.environ.get('MINERU_OUTPUT_DIR', '/tmp/mineru_output')
     SUPPORTED_LANGUAGES = {
       'ch': 'chi_sim',  # Chinese Simplified
@@ -85,117 +106,242 @@ class MinerUConfig:
       'devanagari': 'hin+mar+san+ben+nep'  # Devanagari script languages
     }
 
-# 辅助函数：检查mineru是否可用
+def use_mineru_worker() -> bool:
+    """是否使用常驻worker（需要当前Python环境中安装了mineru）"""
+    return MinerUConfig.MODE == 'worker' and importlib.util.find_spec('mineru') is not None
+
+# 常驻MinerU worker池，第一次使用时才启动子进程
+mineru_pool = MinerUWorkerPool()
+
+# 启动时清理进程异常退出遗留的临时目录
+scratch.sweep(('mineru_',))
+
+# 辅助函数：检查mineru是否可用（worker模式读取进程状态，命令行模式读取启动时的探测结果）
 def check_mineru_available() -> bool:
-    """检查mineru命令是否可用"""
-    try:
-        result = subprocess.run(
-            [MinerUConfig.MINERU_PATH, '--version'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            logger.info(f"MinerU available: {result.stdout.strip()}")
-            return True
-        else:
-            logger.error(f"MinerU check failed: {result.stderr}")
-            return False
-    except FileNotFoundError:
-        logger.error(f"MinerU not found at: {MinerUConfig.MINERU_PATH}")
-        return False
-    except Exception as e:
-        logger.error(f"MinerU check error: {str(e)}")
-        return False
+    """检查mineru是否可用"""
+    if use_mineru_worker():
+        return mineru_pool.healthy()
+    return mineru_capabilities.get()['available']
 
 # OCR处理函数
-def process_with_mineru(file_path: str, lang: str = 'en') -> dict:
+def process_with_mineru(file_path: str, lang: str = 'en', timeout: float = None) -> dict:
     """
     使用mineru处理文件OCR
 
     Args:
         file_path: 本地文件路径(PNG、PDF)
         lang: 语言代码
+        timeout: 超时时间（秒），默认 MinerUConfig.PROCESS_TIMEOUT
 
     Returns:
         dict: 包含OCR结果的字典
     """
-    # 创建临时输出目录
-    temp_dir = tempfile.mkdtemp(prefix='mineru_')
-    output_dir = os.path.join(temp_dir, 'output')
-
-    try:
-        # 构建mineru命令
-        cmd = [
-            MinerUConfig.MINERU_PATH,
-            '-p', file_path,          # 输入文件
-            '-o', output_dir,          # 输出目录
-            '--lang', lang,           # 语言
-            '--format', 'json',        # 输出文本格式
-            '--source', 'modelscope',        # 输出文本格式
-            '--quiet'                 # 安静模式
-        ]
-
-        logger.info(f"Running mineru command: {' '.join(cmd)}")
-        # 设置环境变量
-        env = os.environ.copy()
-        env['MINERU_MODEL_SOURCE'] = 'modelscope'
-        # 执行mineru命令
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            env=env,     # 传入修改后的环境变量
-            timeout=300  # 设置超时时间
-
-        )
-
-        if result.returncode != 0:
-            logger.error(f"MinerU failed: {result.stderr}")
-            raise Exception(f"MinerU processing failed: {result.stderr}")
+    timeout = timeout or MinerUConfig.PROCESS_TIMEOUT
+    # 在工作区中创建输出目录，退出时整个工作区删除
+    with scratch.workspace('mineru_') as workspace:
+        output_dir = workspace.file_path('output')
+        try:
+            if use_mineru_worker():
+                mineru_pool.run([file_path], output_dir, lang=lang, timeout=timeout)
+                result = None
+            else:
+                result = run_mineru_cli(file_path, output_dir, lang, timeout=timeout)
+        except (subprocess.TimeoutExpired, MinerUWorkerTimeout):
+            logger.error("MinerU processing timeout")
+            raise Exception("OCR processing timeout")
+        workspace.check_quota()
 
         # 读取输出文件
         output_files = list(Path(output_dir).rglob('*_content_list.json'))
         if not output_files:
             raise Exception("No output files generated by mineru")
 
-        # 合并所有文本文件内容
-        all_text = []
-        for txt_file in output_files:
-            with open(txt_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    all_text.append(content)
+        # 解析所有输出文件的内容块
+        content = read_content_lists(output_files)
 
-        # 如果没有输出文件，尝试从stdout读取
-        if not all_text and result.stdout:
-            all_text = [result.stdout.strip()]
+    # 如果没有内容块，尝试从stdout读取
+    if not content and result is not None and result.stdout:
+        content = [{'type': 'text', 'text': result.stdout.strip(), 'page_idx': 0}]
 
-        final_text = '\n\n'.join(all_text) if all_text else ''
+    raw_output = result.stdout if result is not None and result.stdout else ''
+    return build_ocr_result(content, raw_output)
 
-        # 清理临时目录
-        shutil.rmtree(temp_dir, ignore_errors=True)
+def read_content_lists(output_files) -> list:
+    """读取并解析 *_content_list.json 文件，合并为一个内容块列表，跳过空文件"""
+    content = []
+    for content_file in output_files:
+        content.extend(read_content_list(content_file))
+    return content
 
-        return {
-            'text': final_text,
-            'raw_output': result.stdout if result.stdout else '',
-            'character_count': len(final_text),
-            'word_count': len(final_text.split()) if final_text else 0
-        }
+def build_ocr_result(content: list, raw_output: str = '') -> dict:
+    """
+    由解析后的内容块构造OCR结果
+    结果中只保存内容块，纯文本和类型化的块在生成响应时按输出格式转换，字数按纯文本统计
+    """
+    text = blocks_text(typed_blocks(content))
+    return {
+        'content': content,
+        'raw_output': raw_output,
+        'character_count': len(text),
+        'word_count': len(text.split())
+    }
 
-    except subprocess.TimeoutExpired:
-        logger.error("MinerU processing timeout")
-        # 清理临时目录
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        raise Exception("OCR processing timeout")
-    except Exception as e:
-        # 清理临时目录
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        raise
+# 识别结果的输出格式：raw 为 content_list 的JSON字符串（兼容旧版本），blocks 为类型化的内容块，
+# text 只返回纯文本，ndjson 按页流式返回
+OUTPUT_FORMATS = ('raw', 'blocks', 'text', 'ndjson')
 
-# 辅助函数：安全获取MinerU版本
-def get_mineru_version_str() -> str:
-    """安全地获取MinerU版本字符串"""
+def parse_output_format(data: dict, allow_stream: bool = True):
+    """
+    读取请求的输出格式，stream=true 或 Accept: application/x-ndjson 等同于 format=ndjson
+    :return: (输出格式, 是否流式返回)
+    :raises ValueError: 不支持的格式
+    """
+    stream = allow_stream and (
+        bool(data.get('stream', False)) or
+        'application/x-ndjson' in request.headers.get('Accept', '')
+    )
+    output_format = data.get('format') or ('ndjson' if stream else 'raw')
+    allowed = OUTPUT_FORMATS if allow_stream else OUTPUT_FORMATS[:-1]
+    if output_format not in allowed:
+        raise ValueError(f"format必须为 {' / '.join(allowed)} 之一")
+    return output_format, stream or output_format == 'ndjson'
+
+def ocr_result_payload(ocr_result: dict, output_format: str) -> dict:
+    """按输出格式生成响应中的识别结果"""
+    if output_format == 'raw':
+        content = ocr_result['content']
+        payload = {'text': json.dumps(content, ensure_ascii=False) if content else ''}
+    else:
+        blocks = typed_blocks(ocr_result['content'])
+        payload = {'text': blocks_text(blocks)}
+        if output_format == 'blocks':
+            payload['blocks'] = blocks
+    payload['character_count'] = ocr_result['character_count']
+    payload['word_count'] = ocr_result['word_count']
+    return payload
+
+def mineru_cache_key(digest: str, lang: str) -> str:
+    """识别结果的缓存键；结果中保存的是解析后的内容块，与输出格式无关"""
+    return ocr_cache.make_key(
+        digest,
+        'mineru',
+        get_mineru_version_str(),
+        lang=lang,
+        result='content'
+    )
+
+def process_batch_with_mineru(file_paths: list, lang: str = 'en', timeout: float = None) -> list:
+    """
+    一次MinerU调用处理多个文件，模型只加载一次
+
+    所有文件已位于同一输入目录，输出中的 <文件名>/**/<文件名>_content_list.json
+    按文件名映射回各输入文件。整体调用失败（非超时）时逐个文件重试，
+    以便把错误归属到具体文件；重试共用批次剩余的时间，超过截止时间后
+    剩下的文件直接记为超时。
+
+    Args:
+        file_paths: 同一目录下的本地文件路径，文件名（不含后缀）互不相同
+        lang: 语言代码
+        timeout: 整个批次的超时时间（秒）
+
+    Returns:
+        list: 与file_paths顺序一致，每项为OCR结果字典或Exception
+    """
+    if not file_paths:
+        return []
+    timeout = timeout or MinerUConfig.PROCESS_TIMEOUT
+    deadline = time.monotonic() + timeout
+    input_dir = str(Path(file_paths[0]).parent)
+
+    with scratch.workspace('mineru_') as workspace:
+        output_dir = workspace.file_path('output')
+        try:
+            if use_mineru_worker():
+                mineru_pool.run(file_paths, output_dir, lang=lang, timeout=timeout)
+            else:
+                run_mineru_cli(input_dir, output_dir, lang, timeout=timeout)
+            workspace.check_quota()
+        except (subprocess.TimeoutExpired, MinerUWorkerTimeout):
+            logger.error("MinerU batch processing timeout")
+            return [Exception("OCR processing timeout") for _ in file_paths]
+        except ScratchQuotaExceeded as e:
+            return [e for _ in file_paths]
+        except Exception as e:
+            if len(file_paths) == 1:
+                return [e]
+            logger.warning(f"MinerU批量处理失败，逐个文件重试: {str(e)}")
+            results = []
+            for file_path in file_paths:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    results.append(Exception("OCR processing timeout"))
+                    continue
+                try:
+                    results.append(process_with_mineru(file_path, lang=lang, timeout=remaining))
+                except Exception as item_error:
+                    results.append(item_error)
+            return results
+
+        results = []
+        for file_path in file_paths:
+            name = Path(file_path).stem
+            output_files = list(Path(output_dir).glob(f'{name}/**/{name}_content_list.json'))
+            if not output_files:
+                results.append(Exception("No output files generated by mineru"))
+                continue
+            results.append(build_ocr_result(read_content_lists(output_files)))
+        return results
+
+def run_mineru_cli(file_path: str, output_dir: str, lang: str, timeout: float = None) -> subprocess.CompletedProcess:
+    """调用mineru命令行处理文件或目录（MINERU_MODE=cli 或未安装mineru包时使用）"""
+    # 构建mineru命令
+    cmd = [
+        MinerUConfig.MINERU_PATH,
+        '-p', file_path,          # 输入文件或目录
+        '-o', output_dir,          # 输出目录
+        '--lang', lang,           # 语言
+        '--format', 'json',        # 输出文本格式
+        '--source', 'modelscope',        # 输出文本格式
+        '--quiet'                 # 安静模式
+    ]
+
+    logger.info(f"Running mineru command: {' '.join(cmd)}")
+    # 设置环境变量
+    env = os.environ.copy()
+    env['MINERU_MODEL_SOURCE'] = 'modelscope'
+    # 执行mineru命令
+    result = subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        env=env,     # 传入修改后的环境变量
+        timeout=timeout or MinerUConfig.PROCESS_TIMEOUT  # 设置超时时间
+    )
+
+    if result.returncode != 0:
+        logger.error(f"MinerU failed: {result.stderr}")
+        raise Exception(f"MinerU processing failed: {result.stderr}")
+    return result
+
+# 辅助函数：探测MinerU版本和命令行可用性（命令行模式会启动mineru进程）
+def probe_mineru() -> dict:
+    """
+    探测MinerU能力信息
+    :raises Exception: 命令行模式下探测失败，由 EngineCapabilities 保留上一次的结果
+    """
+    info = {
+        'mode': 'worker' if use_mineru_worker() else 'cli',
+        'version': 'unknown',
+        'available': False
+    }
+    if info['mode'] == 'worker':
+        # worker模式的可用性由worker进程状态决定，这里只取版本
+        info['available'] = True
+        try:
+            info['version'] = importlib.metadata.version('mineru')
+            return info
+        except importlib.metadata.PackageNotFoundError:
+            pass
     try:
         result = subprocess.run(
             [MinerUConfig.MINERU_PATH, '--version'],
@@ -203,11 +349,34 @@ def get_mineru_version_str() -> str:
             text=True,
             timeout=5
         )
-        if result.returncode == 0:
-            return result.stdout.strip()
+    except FileNotFoundError:
+        error = f"MinerU not found at: {MinerUConfig.MINERU_PATH}"
+        logger.error(error)
+        if info['mode'] == 'cli':
+            raise RuntimeError(error)
+        return info
     except Exception as e:
-        logger.warning(f"获取MinerU版本失败: {str(e)}")
-    return "unknown"
+        logger.error(f"MinerU check error: {str(e)}")
+        if info['mode'] == 'cli':
+            raise
+        return info
+    if result.returncode != 0:
+        logger.error(f"MinerU check failed: {result.stderr}")
+        if info['mode'] == 'cli':
+            raise RuntimeError(f"MinerU check failed: {result.stderr.strip()}")
+        return info
+    info['version'] = result.stdout.strip()
+    info['available'] = True
+    logger.info(f"MinerU available: {info['version']}")
+    return info
+
+# 引擎能力信息：启动时探测一次，之后只读缓存，通过刷新接口重新探测
+mineru_capabilities = EngineCapabilities('mineru', probe_mineru)
+mineru_capabilities.refresh()
+
+def get_mineru_version_str() -> str:
+    """安全地获取MinerU版本字符串（读取缓存）"""
+    return mineru_capabilities.get()['version']
 
 # 响应格式化函数
 def format_response(success=True, message=None, data=None, error=None, **kwargs):
@@ -256,6 +425,18 @@ class Config:
     MAX_IMAGE_SIZE = 8192
     TIMEOUT = 10
 
+    # 批量OCR配置
+    BATCH_MAX_ITEMS = int(os.environ.get('OCR_BATCH_MAX_ITEMS', 10))
+
+    # 同步接口的页数上限，更大的PDF请使用异步任务接口
+    SYNC_MAX_PAGES = int(os.environ.get('OCR_SYNC_MAX_PAGES', 20))
+    # 异步任务配置
+    JOB_MAX_CONTENT_LENGTH = int(os.environ.get('OCR_JOB_MAX_CONTENT_LENGTH', 200 * 1024 * 1024))
+    JOB_CHUNK_PAGES = int(os.environ.get('MINERU_JOB_CHUNK_PAGES', 10))
+    # 流式接口的页数上限
+    MAX_PAGES = int(os.environ.get('OCR_MAX_PAGES', 200))
+    BATCH_ITEM_TIMEOUT = int(os.environ.get('OCR_BATCH_ITEM_TIMEOUT', 300))
+
     # 认证配置
     AUTH_ENABLED = os.environ.get('AUTH_ENABLED', 'True').lower() == 'true'
     TOKEN_EXPIRATION_HOURS = int(os.environ.get('TOKEN_EXPIRATION_HOURS', 24))
@@ -267,6 +448,8 @@ class Config:
     # 公开端点
     PUBLIC_ENDPOINTS = [
         '/api/v1/health',
+        '/api/v1/health/live',
+        '/api/v1/health/ready',
         '/api/v1/auth/token',
         '/',
         '/api/v1/test/ocr'
@@ -274,246 +457,54 @@ class Config:
 
 app.config.from_object(Config)
 
-# 检查mineru是否可用
-if not check_mineru_available():
-    logger.warning("MinerU is not available. OCR functionality may be limited.")
-
-# 令牌存储
-token_store = {}
-
-# 客户端存储类
-class ClientStore:
-    def __init__(self):
-        self.clients_file = app.config['CLIENT_STORE_FILE']
-        self.clients = self.load_clients()
+# 批量OCR执行器：下载在线程池中并发执行，之后所有文件由一次MinerU调用处理
+batch_executor = BatchExecutor()
 
-        if not self.clients:
-            self.init_default_client()
+# 多页文档按页段并行处理，并发数默认与MinerU worker数一致
+PAGE_WORKERS = int(os.environ.get('OCR_PAGE_WORKERS', 0)) or mineru_pool.size
+page_executor = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix='mineru-page')
 
-    def load_clients(self) -> dict:
-        """从文件加载客户端数据"""
-        try:
-            if os.path.exists(self.clients_file):
-                with open(self.clients_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"加载客户端文件失败: {str(e)}")
-        return {}
-
-    def save_clients(self):
-        """保存客户端数据到文件"""
-        try:
-            with open(self.clients_file, 'w') as f:
-                json.dump(self.clients, f, indent=2)
-        except Exception as e:
-            logger.error(f"保存客户端文件失败: {str(e)}")
-
-    def init_default_client(self):
-        """初始化默认客户端"""
-        client_id = "default_client"
-        client_secret = secrets.token_urlsafe(32)
-
-        self.clients[client_id] = {
-            'client_secret_hash': self.hash_secret(client_secret),
-            'name': '默认客户端',
-            'description': '系统默认客户端',
-            'created_at': datetime.now().isoformat(),
-            'is_active': True,
-            'rate_limit': 100,
-            'scopes': ['ocr:read', 'ocr:batch'],
-            'metadata': {
-                'owner': 'system',
-                'contact': 'admin@example.com'
-            }
-        }
-        self.save_clients()
-
-        logger.info(f"已创建默认客户端 - ID: {client_id}")
-        logger.info(f"默认客户端密钥: {client_secret}")
-        logger.warning("请在生产环境中修改默认客户端密钥！")
-
-    def hash_secret(self, secret: str) -> str:
-        """哈希加密密钥"""
-        salt = os.urandom(16)
-        return hashlib.pbkdf2_hmac(
-            'sha256',
-            secret.encode('utf-8'),
-            salt,
-            100000
-        ).hex() + '.' + salt.hex()
-
-    def verify_secret(self, secret: str, stored_hash: str) -> bool:
-        """验证密钥"""
-        try:
-            hash_part, salt_hex = stored_hash.split('.')
-            salt = bytes.fromhex(salt_hex)
-
-            new_hash = hashlib.pbkdf2_hmac(
-                'sha256',
-                secret.encode('utf-8'),
-                salt,
-                100000
-            ).hex()
-
-            return secrets.compare_digest(new_hash, hash_part)
-        except:
-            return False
-
-    def validate_client(self, client_id: str, client_secret: str) -> bool:
-        """验证客户端凭证"""
-        if client_id not in self.clients:
-            return False
-
-        client = self.clients[client_id]
-
-        if not client.get('is_active', True):
-            return False
-
-        stored_hash = client.get('client_secret_hash')
-        if not stored_hash:
-            return False
-
-        return self.verify_secret(client_secret, stored_hash)
-
-    def get_client_info(self, client_id: str):
-        """获取客户端信息"""
-        if client_id not in self.clients:
-            return None
-
-        client = self.clients[client_id].copy()
-        client.pop('client_secret_hash', None)
-        return client
-
-# 初始化客户端存储
-client_store = ClientStore()
-
-# 令牌管理函数
-def create_token(client_id: str) -> str:
-    """创建访问令牌"""
-    token_id = str(uuid.uuid4())
-    expires_at = int(time.time()) + app.config['TOKEN_EXPIRATION_HOURS'] * 3600
-
-    message = f"{client_id}:{token_id}:{expires_at}"
-    signature = hmac.new(
-        app.config['JWT_SECRET_KEY'].encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
-
-    client_id_encoded = base64.urlsafe_b64encode(client_id.encode()).decode().rstrip('=')
-    token = f"{client_id_encoded}.{token_id}.{expires_at}.{signature}"
-
-    token_store[token] = {
-        'client_id': client_id,
-        'token_id': token_id,
-        'expires_at': expires_at,
-        'created_at': int(time.time())
-    }
-
-    return token
-
-def validate_token(token: str) -> dict:
-    """验证访问令牌"""
-    try:
-        parts = token.split('.')
-        if len(parts) != 4:
-            return None
-
-        client_id_encoded, token_id, expires_at_str, signature = parts
-        client_id = base64.urlsafe_b64decode(client_id_encoded + '=' * (4 - len(client_id_encoded) % 4)).decode()
-
-        message = f"{client_id}:{token_id}:{expires_at_str}"
-        expected_signature = hmac.new(
-            app.config['JWT_SECRET_KEY'].encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-
-        if not hmac.compare_digest(signature, expected_signature):
-            return None
-
-        expires_at = int(expires_at_str)
-        if time.time() > expires_at:
-            return None
-
-        if token in token_store:
-            stored_info = token_store[token]
-            if stored_info['client_id'] != client_id or stored_info['token_id'] != token_id:
-                return None
-
-        return {
-            'client_id': client_id,
-            'token_id': token_id,
-            'expires_at': expires_at
-        }
-
-    except Exception as e:
-        logger.error(f"令牌验证失败: {str(e)}")
-        return None
-
-# 认证装饰器
-def requires_auth(f):
-    """认证装饰器"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if not app.config['AUTH_ENABLED']:
-            return f(*args, **kwargs)
+# 异步OCR任务，默认并发数与MinerU worker数一致
+job_manager = JobManager(max_workers=int(os.environ.get('OCR_JOB_WORKERS', 0)) or mineru_pool.size)
+# 客户端未完成的任务达到 max_concurrent 时，建议多少秒后重试
+JOB_RETRY_AFTER = 30
 
-        if request.path in app.config['PUBLIC_ENDPOINTS']:
-            return f(*args, **kwargs)
 
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header:
-            return json_response(
-                success=False,
-                error="需要认证信息",
-                message="请提供Authorization头",
-                status_code=401
-            )
-
-        if not auth_header.startswith('Bearer '):
-            return json_response(
-                success=False,
-                error="令牌格式不正确",
-                message="应为Bearer token格式",
-                status_code=401
-            )
-
-        token = auth_header[7:]
-        token_info = validate_token(token)
-
-        if not token_info:
-            return json_response(
-                success=False,
-                error="无效或过期的令牌",
-                message="请重新获取访问令牌",
-                status_code=401
-            )
-
-        client_id = token_info['client_id']
+def configure_worker(worker_count: int):
+    """多进程部署（ocr_serve）时在每个Web worker中调用：启动本进程的MinerU worker"""
+    if worker_count > 1:
+        logger.warning(
+            f"MinerU服务运行 {worker_count} 个Web worker：每个都有自己的MinerU worker池，"
+            "异步任务只能在提交它的Web worker上查询"
+        )
+    if use_mineru_worker():
+        mineru_pool.start()
 
-        if client_id not in client_store.clients:
-            return json_response(
-                success=False,
-                error="客户端不存在",
-                message="客户端ID无效",
-                status_code=401
-            )
 
-        client = client_store.clients[client_id]
-        if not client.get('is_active', True):
-            return json_response(
-                success=False,
-                error="客户端已被停用",
-                message="请联系管理员",
-                status_code=403
-            )
+def shutdown_executors():
+    page_executor.shutdown(wait=False, cancel_futures=True)
 
-        request.client_id = client_id
-        return f(*args, **kwargs)
 
-    return decorated
+# 存活/就绪状态：就绪检查只读内存状态，不启动子进程
+lifecycle = ServiceLifecycle('mineru')
+lifecycle.init_app(app)
+lifecycle.add_check(
+    'mineru',
+    lambda: mineru_pool.healthy() if use_mineru_worker() else shutil.which(MinerUConfig.MINERU_PATH) is not None
+)
+lifecycle.add_shutdown_hook(shutdown_executors)
+lifecycle.add_shutdown_hook(mineru_pool.close)
+
+# 客户端认证（ocr_auth）：客户端存储、令牌、凭证缓存和按客户端限流。
+# 各服务与网关使用相同的 JWT_SECRET_KEY 和 CLIENT_STORE_FILE 时令牌通用
+auth = ServiceAuth(app, 'mineru', json_response)
+client_store = auth.client_store
+token_store = auth.token_store
+credential_cache = auth.credential_cache
+rate_limiter = auth.rate_limiter
+create_token = auth.create_token
+validate_token = auth.validate_token
+requires_auth = auth.requires_auth
 
 # 健康检查端点
 @app.route('/api/v1/health', methods=['GET'])
@@ -528,7 +519,7 @@ def health_check():
       检查OCR API服务的运行状态，包括MinerU引擎可用性和认证系统状态。
 
       **检查项**：
-      - MinerU OCR引擎
+      - MinerU OCR引擎（命令行模式读取启动时的探测结果，不启动子进程）
       - 认证系统状态
       - 客户端数量
       - 活跃令牌数
@@ -562,6 +553,12 @@ def health_check():
                 active_tokens:
                   type: integer
                   example: 5
+                token_store:
+                  type: object
+                  description: 令牌存储的记录数、上限、已过期和被淘汰的记录数（当前worker）
+                credential_cache:
+                  type: object
+                  description: 客户端凭证缓存的有效期、条数和命中次数（当前worker）
       503:
         description: 服务异常
         schema:
@@ -587,9 +584,18 @@ def health_check():
             data={
                 'mineru_version': get_mineru_version_str(),
                 'mineru_available': mineru_available,
+                'mineru_mode': 'worker' if use_mineru_worker() else 'cli',
+                'capabilities_refreshed_at': mineru_capabilities.get()['refreshed_at'],
+                'mineru_workers': mineru_pool.stats() if use_mineru_worker() else None,
                 'auth_enabled': app.config['AUTH_ENABLED'],
                 'total_clients': len(client_store.clients),
-                'active_tokens': len(token_store)
+                'active_tokens': len(token_store),
+                'token_store': token_store.stats(),
+                'credential_cache': credential_cache.stats(),
+                'rate_limit': rate_limiter.stats(),
+                'ocr_cache': ocr_cache.stats(),
+                'ocr_jobs': job_manager.stats(),
+                'scratch': scratch.stats()
             }
         )
     except Exception as e:
@@ -600,6 +606,89 @@ def health_check():
             status_code=503
         )
 
+# 存活探测
+@app.route('/api/v1/health/live', methods=['GET'])
+def liveness_check():
+    """
+    存活探测
+    ---
+    tags:
+      - 服务信息
+    summary: 进程能处理请求即返回200，不做任何外部调用
+    responses:
+      200:
+        description: 进程存活
+    """
+    return json_response(
+        success=True,
+        message="存活",
+        data=lifecycle.status()
+    )
+
+# 就绪探测
+@app.route('/api/v1/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    就绪探测
+    ---
+    tags:
+      - 服务信息
+    summary: 可以接收新请求时返回200，下线中或检查失败时返回503
+    description: |
+      只读取进程内状态，不启动子进程，可供负载均衡器高频探测。
+      收到SIGTERM或 OCR_DRAIN_FILE 指定的文件存在时进入下线状态，返回503，
+      已接收的请求继续处理完。
+    responses:
+      200:
+        description: 就绪
+      503:
+        description: 未就绪或下线中
+    """
+    ready, checks = lifecycle.readiness()
+    data = dict(lifecycle.status(), checks=checks)
+    if not ready:
+        return json_response(
+            success=False,
+            error="服务未就绪",
+            message="下线中" if lifecycle.draining else "就绪检查未通过",
+            data=data,
+            status_code=503
+        )
+    return json_response(
+        success=True,
+        message="就绪",
+        data=data
+    )
+
+# 重新探测引擎能力信息
+@app.route('/api/v1/capabilities/refresh', methods=['POST'])
+@requires_auth
+def refresh_capabilities():
+    """
+    重新探测引擎能力信息
+    ---
+    tags:
+      - OCR配置管理
+    security:
+      - BearerAuth: []
+    summary: 重新获取MinerU版本和命令行可用性
+    description: |
+      版本和命令行可用性在服务启动时探测一次并缓存，健康检查只读缓存。
+      升级或重新安装MinerU后调用此接口刷新。多进程部署时只刷新处理该请求的worker。
+    responses:
+      200:
+        description: 刷新完成
+      401:
+        description: 认证失败
+    """
+    capabilities = mineru_capabilities.refresh()
+    return json_response(
+        success=True,
+        message="引擎能力信息已刷新",
+        data=capabilities,
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
 # 获取访问令牌
 @app.route('/api/v1/auth/token', methods=['POST'])
 def get_access_token():
@@ -642,72 +731,7 @@ def get_access_token():
       401:
         description: 无效的客户端凭证
     """
-    try:
-        client_id = None
-        client_secret = None
-
-        # 首先尝试Basic Auth
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Basic '):
-            try:
-                decoded = base64.b64decode(auth_header[6:]).decode('utf-8')
-                client_id, client_secret = decoded.split(':', 1)
-            except:
-                pass
-
-        # 尝试从JSON体获取
-        if not client_id or not client_secret:
-            if request.is_json:
-                data = request.get_json()
-                client_id = data.get('client_id')
-                client_secret = data.get('client_secret')
-
-        # 尝试表单数据
-        if not client_id or not client_secret:
-            client_id = request.form.get('client_id')
-            client_secret = request.form.get('client_secret')
-
-        if not client_id or not client_secret:
-            return json_response(
-                success=False,
-                error="缺少客户端凭证",
-                message="请提供client_id和client_secret",
-                status_code=400
-            )
-
-        # 验证客户端凭证
-        if not client_store.validate_client(client_id, client_secret):
-            return json_response(
-                success=False,
-                error="无效的客户端凭证",
-                message="请检查client_id和client_secret",
-                status_code=401
-            )
-
-        # 创建访问令牌
-        token = create_token(client_id)
-        expires_at = time.time() + app.config['TOKEN_EXPIRATION_HOURS'] * 3600
-
-        return json_response(
-            success=True,
-            message="令牌生成成功",
-            data={
-                'access_token': token,
-                'token_type': 'Bearer',
-                'expires_in': app.config['TOKEN_EXPIRATION_HOURS'] * 3600,
-                'expires_at': datetime.fromtimestamp(expires_at).isoformat() + 'Z',
-                'client_id': client_id
-            }
-        )
-
-    except Exception as e:
-        logger.error(f"令牌生成失败: {str(e)}")
-        return json_response(
-            success=False,
-            error="服务器内部错误",
-            message=str(e) if app.debug else "请稍后重试",
-            status_code=500
-        )
+    return auth.token_response()
 
 # 语言列表端点
 @app.route('/api/v1/languages', methods=['GET'])
@@ -929,19 +953,11 @@ def test_ocr():
 
         file_url = data['file_url']
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(file_url, headers=headers, timeout=10)
-        response.raise_for_status()
+        # 下载的文件保存到工作区，退出时删除
+        with scratch.workspace('mineru_test_') as workspace:
+            with fetch(file_url, app.config['MAX_CONTENT_LENGTH']) as download:
+                temp_path = workspace.write(f'input{download.suffix or ".png"}', download)
 
-        # 创建临时文件保存文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_file.write(response.content)
-            temp_path = temp_file.name
-
-        try:
             # 使用mineru处理
             ocr_result = process_with_mineru(temp_path, lang='eng')
 
@@ -954,18 +970,15 @@ def test_ocr():
                 success=True,
                 message="OCR识别成功",
                 data={
-                    'text': ocr_result['text'],
+                    'text': ocr_result_payload(ocr_result, 'raw')['text'],
                     'image_size': image_size,
                     'image_mode': image_mode,
                     'character_count': ocr_result['character_count'],
                     'word_count': ocr_result['word_count']
                 }
             )
-        finally:
-            # 清理临时文件
-            os.unlink(temp_path)
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, DownloadTooLarge, ScratchQuotaExceeded) as e:
         return json_response(
             success=False,
             error="文件下载失败",
@@ -980,6 +993,87 @@ def test_ocr():
             status_code=500
         )
 
+def mineru_content_response(content: bytes, digest: str, suffix: str, lang: str, source: dict,
+                            output_format: str, stream: bool):
+    """
+    识别一个文件的内容并生成响应，URL接口和上传接口共用
+    :param digest: 内容摘要，用作缓存键
+    :param suffix: 按魔数确定的文件后缀
+    :param source: 文件来源（file_url 或 filename），写入响应的 parameters
+    :param output_format: 输出格式，见 OUTPUT_FORMATS
+    :param stream: 是否以NDJSON逐页返回
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    parameters = dict(source, language=lang, format=output_format)
+
+    # 流式返回：多页文档按页段并行处理，逐页返回
+    if stream:
+        return mineru_stream_response(content, suffix, lang, parameters, output_format)
+
+    # 命中缓存时直接返回，不写临时文件也不调用MinerU
+    cache_key = mineru_cache_key(digest, lang)
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        ocr_result, image_info = cached['result'], cached['image_info']
+    else:
+        content, suffix = normalize_document(content, suffix)
+
+        # 文件写入工作区，退出时删除
+        with scratch.workspace('mineru_') as workspace:
+            temp_path = workspace.write(f'input{suffix}', content)
+
+            # 大型PDF请使用异步任务接口，避免长时间占用请求线程
+            pages = count_pdf_pages(temp_path) if suffix == '.pdf' else None
+            if pages and pages > app.config['SYNC_MAX_PAGES']:
+                return json_response(
+                    success=False,
+                    error="文件页数过多",
+                    message=f"PDF共{pages}页，同步接口最多处理{app.config['SYNC_MAX_PAGES']}页，请使用流式返回（stream=true）或 /api/v1/ocr/jobs",
+                    status_code=413,
+                    client_id=client_id
+                )
+
+            # 使用mineru处理，多页PDF按页段并行处理
+            if pages and pages > 1:
+                ocr_result = process_pdf_in_parallel(temp_path, pages, lang)
+            else:
+                ocr_result = process_with_mineru(temp_path, lang=lang)
+
+            # 获取文件信息
+            file_size = os.path.getsize(temp_path)
+
+            # 如果是文件，获取文件信息
+            image_info = {}
+            try:
+                with Image.open(temp_path) as image:
+                    image_info = {
+                        'size': image.size,
+                        'mode': image.mode,
+                        'format': image.format
+                    }
+            except:
+                # 如果不是文件（如PDF），只提供基本信息
+                image_info = {
+                    'type': 'document',
+                    'size_bytes': file_size,
+                    'format': suffix.lstrip('.'),
+                    'pages': pages
+                }
+
+        ocr_cache.set(cache_key, {'result': ocr_result, 'image_info': image_info})
+
+    return json_response(
+        success=True,
+        message="OCR识别完成",
+        data={
+            'ocr_result': ocr_result_payload(ocr_result, output_format),
+            'image_info': image_info,
+            'cached': cached is not None,
+            'parameters': parameters
+        },
+        client_id=client_id
+    )
+
 # 主OCR端点
 @app.route('/api/v1/ocr/url', methods=['POST'])
 @requires_auth
@@ -1027,6 +1121,23 @@ def ocr_from_url():
               default: "en"
               example: "en"
               description: 识别语言代码
+            stream:
+              type: boolean
+              default: false
+              description: |
+                以NDJSON（application/x-ndjson）按页流式返回，每行一页（type=page，含内容块），
+                最后一行为汇总（type=done）；多页PDF/TIFF按页段在多个MinerU worker上并行处理。
+                也可通过请求头 Accept: application/x-ndjson 开启，等同于 format=ndjson
+            format:
+              type: string
+              enum: [raw, blocks, text, ndjson]
+              default: raw
+              description: |
+                输出格式：
+                - raw：text 为 MinerU content_list 的JSON字符串（兼容旧版本）
+                - blocks：blocks 为类型化的内容块（text/title/table/formula/image，含 page 和 bbox），text 为纯文本
+                - text：只返回纯文本
+                - ndjson：按页流式返回，同 stream=true
     responses:
       200:
         description: OCR识别成功
@@ -1045,6 +1156,35 @@ def ocr_from_url():
                   properties:
                     text:
                       type: string
+                    blocks:
+                      type: array
+                      description: 仅 format=blocks 时返回
+                      items:
+                        type: object
+                        properties:
+                          type:
+                            type: string
+                            enum: [text, title, table, formula, image]
+                          page:
+                            type: integer
+                          bbox:
+                            type: array
+                            items:
+                              type: number
+                          text:
+                            type: string
+                          level:
+                            type: integer
+                            description: 标题级别（title）
+                          html:
+                            type: string
+                            description: 表格HTML（table）
+                          latex:
+                            type: string
+                            description: 公式LaTeX（formula）
+                          caption:
+                            type: string
+                            description: 表格或图片的标题
                     character_count:
                       type: integer
                     word_count:
@@ -1069,6 +1209,10 @@ def ocr_from_url():
         description: 请求参数无效或文件URL错误
       401:
         description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
+      413:
+        description: PDF页数超过同步接口上限（OCR_SYNC_MAX_PAGES，默认20），请使用 /api/v1/ocr/jobs
       500:
         description: 服务器内部错误
     """
@@ -1108,96 +1252,37 @@ def ocr_from_url():
 
         # 获取参数
         lang = data.get('language', 'eng')
+        try:
+            output_format, stream = parse_output_format(data)
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=getattr(request, 'client_id', 'unknown')
+            )
 
         logger.info(f"客户端 {getattr(request, 'client_id', 'unknown')} 请求OCR: {file_url}")
 
-        # 下载文件
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-        }
-
-        response = requests.get(file_url, headers=headers, timeout=10, stream=True)
-        response.raise_for_status()
-
-        # 检查内容类型
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type and 'pdf' not in content_type:
-            logger.warning(f"URL返回的不是支持的文件: {content_type}")
-
-        # 检查文件大小
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > app.config['MAX_CONTENT_LENGTH']:
+        # 流式下载文件，超过大小上限时立即中断
+        headers = {'Accept': 'image/webp,image/apng,image/*,application/pdf,*/*;q=0.8'}
+        try:
+            with fetch(file_url, app.config['MAX_CONTENT_LENGTH'], headers=headers) as download:
+                content = download.read()
+                digest = download.digest
+                # 按文件内容的魔数确定后缀，无法识别时按图片处理
+                suffix = download.suffix or '.png'
+        except DownloadTooLarge as e:
             return json_response(
                 success=False,
                 error="文件太大",
-                message=f"文件大小超过限制: {content_length}字节",
+                message=str(e),
                 status_code=400,
                 client_id=getattr(request, 'client_id', 'unknown')
             )
 
-        # 根据文件扩展名确定后缀
-        content_type = response.headers.get('content-type', '').lower()
-        if 'pdf' in content_type:
-            suffix = '.pdf'
-        elif 'png' in content_type:
-            suffix = '.png'
-        elif 'jpeg' in content_type or 'jpg' in content_type:
-            suffix = '.jpg'
-        elif 'tiff' in content_type or 'tif' in content_type:
-            suffix = '.tiff'
-        else:
-            suffix = '.png'  # 默认后缀
-
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_file.write(response.content)
-            temp_path = temp_file.name
-
-        try:
-            # 使用mineru处理
-            ocr_result = process_with_mineru(temp_path, lang=lang)
-
-            # 获取文件信息
-            file_size = os.path.getsize(temp_path)
-
-            # 如果是文件，获取文件信息
-            image_info = {}
-            try:
-                with Image.open(temp_path) as image:
-                    image_info = {
-                        'size': image.size,
-                        'mode': image.mode,
-                        'format': image.format
-                    }
-            except:
-                # 如果不是文件（如PDF），只提供基本信息
-                image_info = {
-                    'type': 'document',
-                    'size_bytes': file_size,
-                    'format': suffix.lstrip('.')
-                }
-
-            return json_response(
-                success=True,
-                message="OCR识别完成",
-                data={
-                    'ocr_result': {
-                        'text': ocr_result['text'],
-                        'character_count': ocr_result['character_count'],
-                        'word_count': ocr_result['word_count']
-                    },
-                    'image_info': image_info,
-                    'parameters': {
-                        'file_url': file_url,
-                        'language': lang
-                    }
-                },
-                client_id=getattr(request, 'client_id', 'unknown')
-            )
-        finally:
-            # 清理临时文件
-            os.unlink(temp_path)
+        return mineru_content_response(content, digest, suffix, lang, {'file_url': file_url}, output_format, stream)
 
     except requests.exceptions.Timeout:
         return json_response(
@@ -1215,6 +1300,14 @@ def ocr_from_url():
             status_code=502,
             client_id=getattr(request, 'client_id', 'unknown')
         )
+    except ScratchQuotaExceeded as e:
+        return json_response(
+            success=False,
+            error="文件太大",
+            message=str(e),
+            status_code=413,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
     except Exception as e:
         logger.error(f"OCR处理错误: {str(e)}")
         return json_response(
@@ -1225,6 +1318,94 @@ def ocr_from_url():
             client_id=getattr(request, 'client_id', 'unknown')
         )
 
+def stage_batch_item(index: int, download, workspace, lang: str) -> dict:
+    """
+    批量请求中的一个文件：命中缓存时直接返回结果，否则写入批量输入目录
+    URL批量和上传批量共用
+    :param download: ocr_http.DownloadedFile
+    :param workspace: 批量输入目录所在的工作区（ocr_scratch.Workspace）
+    """
+    # 命中缓存的文件不再交给MinerU
+    cache_key = mineru_cache_key(download.digest, lang)
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        return {'cached': cached['result']}
+
+    # 文件名包含序号，用于把输出映射回请求中的文件；后缀按文件内容确定
+    file_path = workspace.write(f'item_{index:03d}{download.suffix or ".png"}', download)
+    return {'path': file_path, 'cache_key': cache_key}
+
+def process_staged_batch(items: list, lang: str, batch_started: float) -> list:
+    """
+    用一次MinerU调用处理所有暂存的文件
+    :param items: [(ok, stage_batch_item 的结果或错误信息)]
+    :return: 与 items 一一对应的 [(ok, 识别结果或错误信息)]
+    """
+    ocr_results = {
+        i: item['cached']
+        for i, (ok, item) in enumerate(items)
+        if ok and 'cached' in item
+    }
+    staged = [
+        (i, item)
+        for i, (ok, item) in enumerate(items)
+        if ok and 'path' in item
+    ]
+    remaining = app.config['BATCH_ITEM_TIMEOUT'] - (time.monotonic() - batch_started)
+    if staged and remaining > 0:
+        batch_output = process_batch_with_mineru(
+            [item['path'] for _, item in staged], lang=lang, timeout=remaining
+        )
+        for (i, item), output in zip(staged, batch_output):
+            ocr_results[i] = output
+            if not isinstance(output, Exception):
+                ocr_cache.set(item['cache_key'], {
+                    'result': output,
+                    'image_info': {'size_bytes': os.path.getsize(item['path'])}
+                })
+    elif staged:
+        ocr_results.update({i: Exception("处理超时") for i, _ in staged})
+
+    outcomes = []
+    for index, (ok, value) in enumerate(items):
+        if ok:
+            value = ocr_results[index]
+            ok = not isinstance(value, Exception)
+            value = value if ok else str(value)
+        outcomes.append((ok, value))
+    return outcomes
+
+def batch_response(label_field: str, labels: list, outcomes: list, output_format: str = 'raw'):
+    """批量结果响应，label_field 为 url 或 filename"""
+    results = []
+    for label, (ok, value) in zip(labels, outcomes):
+        if ok:
+            results.append({
+                label_field: label,
+                'success': True,
+                **ocr_result_payload(value, output_format)
+            })
+        else:
+            results.append({
+                label_field: label,
+                'success': False,
+                'error': value
+            })
+
+    successful = len([r for r in results if r['success']])
+
+    return json_response(
+        success=True,
+        message=f"批量处理完成，成功 {successful}/{len(labels)}",
+        data={
+            'total': len(labels),
+            'successful': successful,
+            'failed': len(labels) - successful,
+            'results': results
+        },
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
 # 批量OCR端点
 @app.route('/api/v1/ocr/batch', methods=['POST'])
 @requires_auth
@@ -1238,10 +1419,13 @@ def ocr_batch_urls():
       - Bearer: []
     summary: 批量处理多个文件URL
     description: |
-      同时处理最多10个文件URL的OCR识别，支持统一语言设置。
+      并发处理多个文件URL的OCR识别，支持统一语言设置。
+      下载并发执行，所有文件放入同一目录后由一次MinerU调用处理（模型只加载一次），
+      输出按文件映射回各URL，结果顺序与输入一致。
 
       **限制**：
-      - 单次请求最多10个URL
+      - 单次请求最多10个URL（可通过OCR_BATCH_MAX_ITEMS配置）
+      - 整个批次的处理时间上限为300秒（可通过OCR_BATCH_ITEM_TIMEOUT配置），下载失败或超时的项单独返回失败
       - 每个URL需要符合文件格式要求
       - 所有文件使用相同的语言设置
     parameters:
@@ -1283,6 +1467,11 @@ def ocr_batch_urls():
               default: "en"
               example: "chinese_cht"
               description: 识别语言代码
+            format:
+              type: string
+              enum: [raw, blocks, text]
+              default: raw
+              description: 输出格式，见 /api/v1/ocr/url；blocks 时每项结果带 blocks
     responses:
       200:
         description: 批量处理完成
@@ -1335,9 +1524,11 @@ def ocr_batch_urls():
         description: |
           - 缺少urls参数
           - urls不是数组
-          - urls超过10个
+          - urls超过数量上限
       401:
         description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
       500:
         description: 服务器内部错误
     """
@@ -1354,79 +1545,289 @@ def ocr_batch_urls():
             )
 
         urls = data['urls']
-        if not isinstance(urls, list) or len(urls) > 10:
+        max_items = app.config['BATCH_MAX_ITEMS']
+        if not isinstance(urls, list) or len(urls) > max_items:
             return json_response(
                 success=False,
                 error="参数错误",
-                message="urls必须为数组且最多10个URL",
+                message=f"urls必须为数组且最多{max_items}个URL",
                 status_code=400,
                 client_id=getattr(request, 'client_id', 'unknown')
             )
 
         lang = data.get('language', 'eng')
-        results = []
-
-        for url in urls:
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
+        try:
+            output_format, _ = parse_output_format(data, allow_stream=False)
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=getattr(request, 'client_id', 'unknown')
+            )
 
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-
-                # 根据内容类型确定后缀
-                content_type = response.headers.get('content-type', '').lower()
-                if 'pdf' in content_type:
-                    suffix = '.pdf'
-                elif 'png' in content_type:
-                    suffix = '.png'
-                elif 'jpeg' in content_type or 'jpg' in content_type:
-                    suffix = '.jpg'
-                else:
-                    suffix = '.png'
-
-                # 创建临时文件
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-                    temp_file.write(response.content)
-                    temp_path = temp_file.name
+        # 所有文件下载到同一输入目录，由一次MinerU调用处理
+        workspace = scratch.workspace('mineru_batch_')
 
-                try:
-                    # 使用mineru处理
-                    ocr_result = process_with_mineru(temp_path, lang=lang)
-
-                    results.append({
-                        'url': url,
-                        'success': True,
-                        'text': ocr_result['text'],
-                        'character_count': ocr_result['character_count'],
-                        'word_count': ocr_result['word_count']
-                    })
-                finally:
-                    # 清理临时文件
-                    os.unlink(temp_path)
+        def download_item(indexed_url, deadline):
+            index, url = indexed_url
+            with fetch(
+                url,
+                app.config['MAX_CONTENT_LENGTH'],
+                timeout=remaining_seconds(deadline, app.config['TIMEOUT']),
+                deadline=deadline
+            ) as download:
+                return stage_batch_item(index, download, workspace, lang)
 
-            except Exception as e:
-                results.append({
-                    'url': url,
-                    'success': False,
-                    'error': str(e)
-                })
+        try:
+            batch_started = time.monotonic()
+            downloads = batch_executor.run(
+                list(enumerate(urls)), download_item, timeout=app.config['BATCH_ITEM_TIMEOUT']
+            )
+            outcomes = process_staged_batch(downloads, lang, batch_started)
+        finally:
+            workspace.cleanup()
 
-        successful = len([r for r in results if r['success']])
+        return batch_response('url', urls, outcomes, output_format)
 
+    except Exception as e:
+        logger.error(f"批量OCR处理错误: {str(e)}")
         return json_response(
-            success=True,
-            message=f"批量处理完成，成功 {successful}/{len(urls)}",
-            data={
-                'total': len(urls),
-                'successful': successful,
-                'failed': len(urls) - successful,
-                'results': results
-            },
+            success=False,
+            error="批量处理失败",
+            message=str(e),
+            status_code=500,
             client_id=getattr(request, 'client_id', 'unknown')
         )
 
+def upload_parameters() -> dict:
+    """读取上传接口的参数：查询参数，multipart请求再合并表单字段"""
+    data = form_parameters(request.args, bool_fields=('stream',))
+    if request.mimetype == 'multipart/form-data':
+        data.update(form_parameters(request.form, bool_fields=('stream',)))
+    return data
+
+# 上传文件OCR端点
+@app.route('/api/v1/ocr/upload', methods=['POST'])
+@requires_auth
+def ocr_from_upload():
+    """
+    上传图片/PDF进行OCR文字识别
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 直接上传文件识别，省去先上传对象存储再由服务下载的往返
+    description: |
+      两种上传方式：
+      - multipart/form-data：文件放在 file 字段，language、stream 作为表单字段
+      - 原始请求体：请求体即文件内容（Content-Type 如 image/png、application/pdf），参数放在查询字符串
+
+      校验、缓存、页数限制和流式返回与 /api/v1/ocr/url 一致，响应格式相同，
+      parameters 中以 filename 代替 file_url。
+    consumes:
+      - multipart/form-data
+      - application/octet-stream
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        description: |
+          Bearer令牌认证头
+
+          **格式**：`Bearer <your_access_token>`
+        default: "Bearer "
+      - in: formData
+        name: file
+        type: file
+        required: false
+        description: 待识别的图片或PDF（multipart方式）
+      - in: formData
+        name: language
+        type: string
+        default: "eng"
+        description: 识别语言代码
+      - in: formData
+        name: stream
+        type: boolean
+        default: false
+        description: 以NDJSON逐页返回
+      - in: formData
+        name: format
+        type: string
+        enum: [raw, blocks, text, ndjson]
+        default: raw
+        description: 输出格式，见 /api/v1/ocr/url
+    responses:
+      200:
+        description: 识别成功，格式同 /api/v1/ocr/url
+      400:
+        description: |
+          - 参数错误
+          - 没有上传文件
+          - 文件超过大小限制
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
+      413:
+        description: PDF页数超过同步接口上限
+      500:
+        description: 服务器内部错误
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    try:
+        try:
+            data = upload_parameters()
+            output_format, stream = parse_output_format(data)
+            uploads = read_uploads(request, app.config['MAX_CONTENT_LENGTH'])
+        except (DownloadTooLarge, RequestEntityTooLarge) as e:
+            return json_response(
+                success=False,
+                error="文件太大",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+
+        lang = data.get('language', 'eng')
+
+        filename, upload = uploads[0]
+        with upload:
+            content = upload.read()
+            digest = upload.digest
+            suffix = upload.suffix or '.png'
+
+        logger.info(f"客户端 {client_id} 上传OCR: {filename or '请求体'} ({len(content)}字节)")
+        return mineru_content_response(content, digest, suffix, lang, {'filename': filename}, output_format, stream)
+
+    except ScratchQuotaExceeded as e:
+        return json_response(
+            success=False,
+            error="文件太大",
+            message=str(e),
+            status_code=413,
+            client_id=client_id
+        )
+    except Exception as e:
+        logger.error(f"OCR处理错误: {str(e)}")
+        return json_response(
+            success=False,
+            error="处理失败",
+            message=str(e) if app.debug else "服务器内部错误",
+            status_code=500,
+            client_id=client_id
+        )
+
+# 批量上传OCR端点
+@app.route('/api/v1/ocr/batch/upload', methods=['POST'])
+@requires_auth
+def ocr_batch_upload():
+    """
+    批量上传文件进行OCR文字识别
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 一次上传多个文件，由一次MinerU调用处理
+    description: |
+      multipart/form-data 请求，文件放在重复的 files 字段中，最多 OCR_BATCH_MAX_ITEMS 个
+      （默认10），language 作为表单字段。缓存与 /api/v1/ocr/batch 共用，整个请求的大小
+      受 MAX_CONTENT_LENGTH 限制。
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        description: |
+          Bearer令牌认证头
+
+          **格式**：`Bearer <your_access_token>`
+        default: "Bearer "
+      - in: formData
+        name: files
+        type: file
+        required: true
+        description: 待识别的图片或PDF（可重复）
+      - in: formData
+        name: language
+        type: string
+        default: "eng"
+        description: 识别语言代码
+      - in: formData
+        name: format
+        type: string
+        enum: [raw, blocks, text]
+        default: raw
+        description: 输出格式，见 /api/v1/ocr/url
+    responses:
+      200:
+        description: 批量处理完成，格式同 /api/v1/ocr/batch，results 中以 filename 代替 url
+      400:
+        description: |
+          - 参数错误
+          - 没有上传文件或文件数超过上限
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
+      500:
+        description: 服务器内部错误
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    try:
+        try:
+            data = upload_parameters()
+            output_format, _ = parse_output_format(data, allow_stream=False)
+            uploads = read_uploads(
+                request,
+                app.config['MAX_CONTENT_LENGTH'],
+                field='files',
+                max_files=app.config['BATCH_MAX_ITEMS']
+            )
+        except (DownloadTooLarge, RequestEntityTooLarge, ValueError) as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+
+        lang = data.get('language', 'eng')
+
+        # 所有文件写入同一输入目录，由一次MinerU调用处理
+        workspace = scratch.workspace('mineru_batch_')
+        try:
+            batch_started = time.monotonic()
+            staged = []
+            for index, (_, upload) in enumerate(uploads):
+                try:
+                    staged.append((True, stage_batch_item(index, upload, workspace, lang)))
+                except Exception as e:
+                    staged.append((False, str(e)))
+            outcomes = process_staged_batch(staged, lang, batch_started)
+        finally:
+            workspace.cleanup()
+            for _, upload in uploads:
+                upload.close()
+
+        return batch_response('filename', [filename for filename, _ in uploads], outcomes, output_format)
+
     except Exception as e:
         logger.error(f"批量OCR处理错误: {str(e)}")
         return json_response(
@@ -1434,9 +1835,525 @@ def ocr_batch_urls():
             error="批量处理失败",
             message=str(e),
             status_code=500,
+            client_id=client_id
+        )
+
+# ============ 异步OCR任务 ============
+def count_pdf_pages(file_path: str):
+    """PDF页数，无法读取时返回 None"""
+    if pdfium is None:
+        return None
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.warning(f"读取PDF页数失败: {str(e)}")
+        return None
+
+def split_pdf(file_path: str, chunk_pages: int, output_dir: str) -> list:
+    """
+    按页数把PDF拆分成多个文件
+
+    Returns:
+        list: [(起始页索引, 文件路径)]
+    """
+    chunks = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        total = len(pdf)
+        for start in range(0, total, chunk_pages):
+            end = min(start + chunk_pages, total)
+            chunk = pdfium.PdfDocument.new()
+            try:
+                chunk.import_pages(pdf, list(range(start, end)))
+                chunk_path = os.path.join(output_dir, f'chunk_{start:05d}.pdf')
+                chunk.save(chunk_path)
+            finally:
+                chunk.close()
+            chunks.append((start, chunk_path))
+    finally:
+        pdf.close()
+    return chunks
+
+def merge_chunk_results(chunk_results: list) -> dict:
+    """
+    合并分段处理的结果，content_list中的page_idx换算为原文档页码
+
+    Args:
+        chunk_results: [(起始页索引, OCR结果字典)]
+    """
+    content = []
+    for start, ocr_result in chunk_results:
+        content.extend(offset_pages(ocr_result['content'], start))
+    return build_ocr_result(content)
+
+def run_ocr_job(job) -> dict:
+    """后台执行的OCR任务：下载、按页分段处理、汇报进度"""
+    file_url = job.params['file_url']
+    lang = job.params['language']
+
+    job.report_progress(stage='downloading')
+    with fetch(file_url, app.config['JOB_MAX_CONTENT_LENGTH'], timeout=app.config['TIMEOUT']) as download:
+        content = download.read()
+        digest = download.digest
+        suffix = download.suffix
+
+    cache_key = mineru_cache_key(digest, lang)
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        pages = cached['image_info'].get('pages', 1)
+        job.report_progress(stage='done', pages_done=pages, pages_total=pages)
+        return {'ocr_result': cached['result'], 'image_info': cached['image_info'], 'cached': True}
+
+    content, suffix = normalize_document(content, suffix or '.png')
+    is_pdf = suffix == '.pdf'
+
+    with scratch.workspace('mineru_job_') as workspace:
+        file_path = workspace.write(f'input{suffix}', content)
+
+        pages = count_pdf_pages(file_path) if is_pdf else 1
+        chunk_pages = app.config['JOB_CHUNK_PAGES']
+        if pages and pages > chunk_pages:
+            chunks = split_pdf(file_path, chunk_pages, workspace.path)
+            workspace.check_quota()
+        else:
+            chunks = [(0, file_path)]
+        job.report_progress(stage='processing', pages_done=0, pages_total=pages)
+
+        chunk_results = []
+        for index, (start, chunk_path) in enumerate(chunks):
+            job.check_cancelled()
+            chunk_results.append((start, process_with_mineru(chunk_path, lang=lang)))
+            if pages:
+                next_start = chunks[index + 1][0] if index + 1 < len(chunks) else pages
+                job.report_progress(pages_done=next_start)
+
+        ocr_result = chunk_results[0][1] if len(chunk_results) == 1 else merge_chunk_results(chunk_results)
+        image_info = {
+            'type': 'document' if is_pdf else 'image',
+            'size_bytes': len(content),
+            'format': suffix.lstrip('.'),
+            'pages': pages
+        }
+
+    ocr_cache.set(cache_key, {'result': ocr_result, 'image_info': image_info})
+    job.report_progress(stage='done')
+    return {'ocr_result': ocr_result, 'image_info': image_info, 'cached': False}
+
+def job_links(job_id: str) -> dict:
+    return {
+        'status': f'/api/v1/ocr/jobs/{job_id}',
+        'result': f'/api/v1/ocr/jobs/{job_id}/result'
+    }
+
+@app.route('/api/v1/ocr/jobs', methods=['POST'])
+@requires_auth
+def create_ocr_job():
+    """
+    提交异步OCR任务
+    ---
+    tags:
+      - 异步OCR任务
+    security:
+      - Bearer: []
+    summary: 提交文件URL，立即返回任务ID
+    description: |
+      适用于大型PDF。任务在后台按页分段处理，可通过任务状态接口查询进度，
+      通过结果接口获取识别结果，或通过DELETE取消任务。
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        description: Bearer令牌认证头
+      - in: body
+        name: body
+        required: true
+        schema:
+          id: OcrJobRequest
+          required:
+            - file_url
+          properties:
+            file_url:
+              type: string
+              format: uri
+              description: 待识别文件的公开URL（PDF或图片）
+            language:
+              type: string
+              default: "eng"
+              description: 识别语言代码
+            format:
+              type: string
+              enum: [raw, blocks, text]
+              default: raw
+              description: 结果的默认输出格式，获取结果时可用查询参数 format 覆盖
+    responses:
+      202:
+        description: 任务已提交
+      400:
+        description: 请求参数无效
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限（见 Retry-After 和 X-RateLimit-* 响应头），客户端排队和执行中的任务数达到其 max_concurrent，或排队中的任务过多
+    """
+    data = request.get_json(silent=True)
+    if not data or 'file_url' not in data:
+        return json_response(
+            success=False,
+            error="缺少参数",
+            message="需要file_url参数",
+            status_code=400,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+
+    file_url = data['file_url']
+    parsed = urlparse(file_url) if isinstance(file_url, str) else None
+    if not parsed or parsed.scheme not in ['http', 'https'] or not parsed.netloc:
+        return json_response(
+            success=False,
+            error="无效的URL",
+            message="URL格式不正确",
+            status_code=400,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+
+    try:
+        output_format, _ = parse_output_format(data, allow_stream=False)
+    except ValueError as e:
+        return json_response(
+            success=False,
+            error="参数错误",
+            message=str(e),
+            status_code=400,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+
+    params = {'file_url': file_url, 'language': data.get('language', 'eng'), 'format': output_format}
+    # 请求结束时并发名额即释放，后台任务按客户端的 max_concurrent 单独计数
+    decision = g.get('rate_limit')
+    max_active = decision.max_concurrent if decision is not None else None
+    try:
+        job = job_manager.submit(run_ocr_job, getattr(request, 'client_id', 'unknown'), params, max_active=max_active)
+    except ClientJobLimit as e:
+        response = json_response(
+            success=False,
+            error="请求过于频繁",
+            message=str(e),
+            status_code=429,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+        response.headers['Retry-After'] = str(JOB_RETRY_AFTER)
+        return response
+    except JobQueueFull as e:
+        return json_response(
+            success=False,
+            error="任务过多",
+            message=str(e),
+            status_code=429,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+
+    return json_response(
+        success=True,
+        message="任务已提交",
+        data={**job.to_dict(), 'links': job_links(job.job_id)},
+        status_code=202,
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
+def job_not_found():
+    return json_response(
+        success=False,
+        error="任务不存在",
+        message="任务ID无效或已过期",
+        status_code=404,
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
+@app.route('/api/v1/ocr/jobs/<job_id>', methods=['GET'])
+@requires_auth
+def get_ocr_job(job_id):
+    """
+    查询异步OCR任务状态
+    ---
+    tags:
+      - 异步OCR任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: |
+          任务状态：queued / running / succeeded / failed / cancelled，
+          progress 中包含 pages_done / pages_total
+      404:
+        description: 任务不存在
+    """
+    job = job_manager.get(job_id, getattr(request, 'client_id', 'unknown'))
+    if job is None:
+        return job_not_found()
+    return json_response(
+        success=True,
+        message=f"任务状态: {job.status}",
+        data={**job.to_dict(), 'links': job_links(job.job_id)},
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
+@app.route('/api/v1/ocr/jobs/<job_id>/result', methods=['GET'])
+@requires_auth
+def get_ocr_job_result(job_id):
+    """
+    获取异步OCR任务结果
+    ---
+    tags:
+      - 异步OCR任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+      - in: query
+        name: format
+        type: string
+        enum: [raw, blocks, text]
+        required: false
+        description: 输出格式，默认取提交任务时的 format
+    responses:
+      200:
+        description: 识别结果，格式与 /api/v1/ocr/url 相同
+      404:
+        description: 任务不存在
+      409:
+        description: 任务尚未完成、已失败或已取消
+    """
+    job = job_manager.get(job_id, getattr(request, 'client_id', 'unknown'))
+    if job is None:
+        return job_not_found()
+    if job.status != ocr_jobs.SUCCEEDED:
+        return json_response(
+            success=False,
+            error="结果不可用",
+            message=job.error or f"任务状态: {job.status}",
+            data=job.to_dict(),
+            status_code=409,
             client_id=getattr(request, 'client_id', 'unknown')
         )
 
+    try:
+        output_format, _ = parse_output_format(
+            {'format': request.args.get('format') or job.params.get('format')}, allow_stream=False
+        )
+    except ValueError as e:
+        return json_response(
+            success=False,
+            error="参数错误",
+            message=str(e),
+            status_code=400,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
+
+    return json_response(
+        success=True,
+        message="OCR识别完成",
+        data={
+            'ocr_result': ocr_result_payload(job.result['ocr_result'], output_format),
+            'image_info': job.result['image_info'],
+            'cached': job.result['cached'],
+            'parameters': job.params
+        },
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
+@app.route('/api/v1/ocr/jobs/<job_id>', methods=['DELETE'])
+@requires_auth
+def cancel_ocr_job(job_id):
+    """
+    取消异步OCR任务
+    ---
+    tags:
+      - 异步OCR任务
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: job_id
+        type: string
+        required: true
+    responses:
+      200:
+        description: |
+          已请求取消。排队中的任务立即取消，执行中的任务在当前页段处理完后停止
+      404:
+        description: 任务不存在
+    """
+    job = job_manager.cancel(job_id, getattr(request, 'client_id', 'unknown'))
+    if job is None:
+        return job_not_found()
+    return json_response(
+        success=True,
+        message="已请求取消任务" if job.status not in ocr_jobs.FINISHED_STATES else f"任务已结束: {job.status}",
+        data=job.to_dict(),
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
+# ============ 多页文档并行处理 ============
+def normalize_document(content: bytes, suffix: str):
+    """多帧TIFF转换为PDF，使每一帧都作为一页处理"""
+    if content[:4] in (b'II*\x00', b'MM\x00*'):
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                frames = getattr(image, 'n_frames', 1)
+                if frames > 1:
+                    pages = []
+                    for index in range(frames):
+                        image.seek(index)
+                        pages.append(image.convert('RGB'))
+                    buffer = io.BytesIO()
+                    pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:])
+                    return buffer.getvalue(), '.pdf'
+        except Exception as e:
+            logger.warning(f"TIFF转换失败，按单页处理: {str(e)}")
+    return content, suffix
+
+def submit_pdf_chunks(file_path: str, pages: int, lang: str, workspace) -> list:
+    """把PDF拆成页段（写入工作区）并提交给MinerU并行处理，返回 [(起始页索引, 页数, Future)]"""
+    chunk_pages = max(1, min(app.config['JOB_CHUNK_PAGES'], math.ceil(pages / PAGE_WORKERS)))
+    chunks = split_pdf(file_path, chunk_pages, workspace.path)
+    workspace.check_quota()
+    return [
+        (start, min(chunk_pages, pages - start), page_executor.submit(process_with_mineru, chunk_path, lang))
+        for start, chunk_path in chunks
+    ]
+
+def process_pdf_in_parallel(file_path: str, pages: int, lang: str) -> dict:
+    """多页PDF按页段并行处理后合并结果"""
+    workspace = scratch.workspace('mineru_pages_')
+    futures = []
+    try:
+        futures = submit_pdf_chunks(file_path, pages, lang, workspace)
+        return merge_chunk_results([(start, future.result()) for start, _, future in futures])
+    finally:
+        for _, _, future in futures:
+            future.cancel()
+        workspace.cleanup()
+
+def page_entry(index: int, pages_total: int, content: list, output_format: str) -> dict:
+    """一页的流式结果，output_format 为 text 时不带内容块"""
+    blocks = typed_blocks(content)
+    text = blocks_text(blocks)
+    entry = {
+        'page': index + 1,
+        'pages_total': pages_total,
+        'success': True,
+        'text': text,
+        'character_count': len(text),
+        'word_count': len(text.split())
+    }
+    if output_format != 'text':
+        entry['blocks'] = blocks
+    return entry
+
+def iter_mineru_pages(content: bytes, suffix: str, lang: str, output_format: str = 'ndjson'):
+    """
+    并行处理多页文档，按页序产出每页结果
+
+    页段在多个MinerU worker上并行处理，某一页段完成且之前的页段都已
+    产出后，立即产出该页段中的各页。全部成功时结果写入缓存。
+    """
+    cache_key = mineru_cache_key(content_digest(content), lang)
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        pages_total = cached['image_info'].get('pages') or 1
+        grouped = group_by_page(cached['result']['content'])
+        for index in range(pages_total):
+            yield dict(page_entry(index, pages_total, grouped.get(index, []), output_format), cached=True)
+        return
+
+    content, suffix = normalize_document(content, suffix)
+    workspace = scratch.workspace('mineru_pages_')
+    futures = []
+    try:
+        file_path = workspace.write(f'input{suffix}', content)
+        pages_total = (count_pdf_pages(file_path) if suffix == '.pdf' else None) or 1
+        if pages_total > app.config['MAX_PAGES']:
+            raise ValueError(f"文档共{pages_total}页，超过上限{app.config['MAX_PAGES']}页")
+
+        if pages_total > 1:
+            futures = submit_pdf_chunks(file_path, pages_total, lang, workspace)
+        else:
+            futures = [(0, 1, page_executor.submit(process_with_mineru, file_path, lang))]
+
+        chunk_results = []
+        for start, count, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                for index in range(start, start + count):
+                    yield {
+                        'page': index + 1,
+                        'pages_total': pages_total,
+                        'success': False,
+                        'error': str(e),
+                        'cached': False
+                    }
+                continue
+            chunk_results.append((start, result))
+            grouped = group_by_page(result['content'], start)
+            for index in range(start, start + count):
+                yield dict(page_entry(index, pages_total, grouped.get(index, []), output_format), cached=False)
+
+        if len(chunk_results) == len(futures):
+            ocr_cache.set(cache_key, {
+                'result': merge_chunk_results(chunk_results),
+                'image_info': {
+                    'type': 'document',
+                    'size_bytes': len(content),
+                    'format': suffix.lstrip('.'),
+                    'pages': pages_total
+                }
+            })
+    finally:
+        for _, _, future in futures:
+            future.cancel()
+        workspace.cleanup()
+
+def mineru_stream_response(content: bytes, suffix: str, lang: str, parameters: dict, output_format: str = 'ndjson'):
+    """以NDJSON按页流式返回识别结果，每行一页，最后一行为汇总"""
+    client_id = getattr(request, 'client_id', 'unknown')
+
+    def generate():
+        pages_total = successful = 0
+        cached = False
+        try:
+            for page in iter_mineru_pages(content, suffix, lang, output_format):
+                pages_total = page['pages_total']
+                successful += 1 if page['success'] else 0
+                cached = page['cached']
+                yield json.dumps(dict(page, type='page'), ensure_ascii=False) + '\n'
+            yield json.dumps({
+                'type': 'done',
+                'pages_total': pages_total,
+                'successful': successful,
+                'cached': cached,
+                'parameters': parameters,
+                'client_id': client_id
+            }, ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.error(f"多页OCR处理错误: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson; charset=utf-8')
+
 # 首页
 @app.route('/', methods=['GET'])
 def index():
@@ -1507,11 +2424,20 @@ def index():
             'authentication_required': app.config['AUTH_ENABLED'],
             'endpoints': {
                 'health': {'path': '/api/v1/health', 'method': 'GET', 'auth': False},
+                'liveness': {'path': '/api/v1/health/live', 'method': 'GET', 'auth': False},
+                'readiness': {'path': '/api/v1/health/ready', 'method': 'GET', 'auth': False},
                 'get_token': {'path': '/api/v1/auth/token', 'method': 'POST', 'auth': False},
                 'languages': {'path': '/api/v1/languages', 'method': 'GET', 'auth': True},
+                'refresh_capabilities': {'path': '/api/v1/capabilities/refresh', 'method': 'POST', 'auth': True},
                 'test_ocr': {'path': '/api/v1/test/ocr', 'method': 'POST', 'auth': False},
                 'ocr': {'path': '/api/v1/ocr/url', 'method': 'POST', 'auth': True},
-                'batch_ocr': {'path': '/api/v1/ocr/batch', 'method': 'POST', 'auth': True}
+                'batch_ocr': {'path': '/api/v1/ocr/batch', 'method': 'POST', 'auth': True},
+                'upload_ocr': {'path': '/api/v1/ocr/upload', 'method': 'POST', 'auth': True},
+                'batch_upload_ocr': {'path': '/api/v1/ocr/batch/upload', 'method': 'POST', 'auth': True},
+                'create_job': {'path': '/api/v1/ocr/jobs', 'method': 'POST', 'auth': True},
+                'job_status': {'path': '/api/v1/ocr/jobs/{job_id}', 'method': 'GET', 'auth': True},
+                'job_result': {'path': '/api/v1/ocr/jobs/{job_id}/result', 'method': 'GET', 'auth': True},
+                'cancel_job': {'path': '/api/v1/ocr/jobs/{job_id}', 'method': 'DELETE', 'auth': True}
             },
             'authentication': {
                 'method': 'client_id / client_secret',
@@ -1540,11 +2466,21 @@ def method_not_allowed(error):
     )
 
 if __name__ == '__main__':
+    # 直接运行脚本时，子进程默认会把本脚本作为 __mp_main__ 重新执行一遍；
+    # worker 入口都在 ocr_mineru_worker 中，去掉脚本路径后子进程不再导入本脚本
+    del sys.modules['__main__'].__file__
+
     # 启动信息
     logger.info("=" * 50)
     logger.info("OCR API 服务启动 (MinerU引擎)")
     logger.info("=" * 50)
 
+    if use_mineru_worker():
+        # 启动常驻worker，模型在后台加载
+        mineru_pool.start()
+        logger.info(f"MinerU模式: 常驻worker ({mineru_pool.size}个)")
+    else:
+        logger.info("MinerU模式: 命令行")
     mineru_available = check_mineru_available()
     logger.info(f"MinerU可用性: {'可用' if mineru_available else '不可用'}")
     logger.info(f"MinerU版本: {get_mineru_version_str()}")
@@ -1559,11 +2495,20 @@ if __name__ == '__main__':
     logger.info("API端点:")
     logger.info("  GET  /              - 首页")
     logger.info("  GET  /api/v1/health - 健康检查")
+    logger.info("  GET  /api/v1/health/live - 存活探测")
+    logger.info("  GET  /api/v1/health/ready - 就绪探测")
     logger.info("  POST /api/v1/auth/token - 获取令牌")
     logger.info("  GET  /api/v1/languages - 语言列表（需认证）")
+    logger.info("  POST /api/v1/capabilities/refresh - 刷新引擎能力信息（需认证）")
     logger.info("  POST /api/v1/test/ocr - 测试OCR（无需认证）")
     logger.info("  POST /api/v1/ocr/url - OCR识别（需认证）")
     logger.info("  POST /api/v1/ocr/batch - 批量OCR（需认证）")
+    logger.info("  POST /api/v1/ocr/upload - 上传文件OCR（需认证）")
+    logger.info("  POST /api/v1/ocr/batch/upload - 批量上传OCR（需认证）")
+    logger.info("  POST /api/v1/ocr/jobs - 提交异步OCR任务（需认证）")
+    logger.info("  GET  /api/v1/ocr/jobs/<job_id> - 任务状态（需认证）")
+    logger.info("  GET  /api/v1/ocr/jobs/<job_id>/result - 任务结果（需认证）")
+    logger.info("  DELETE /api/v1/ocr/jobs/<job_id> - 取消任务（需认证）")
     logger.info("")
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
@@ -1572,4 +2517,6 @@ if __name__ == '__main__':
     logger.info(f"OpenAPI规范文件: http://{host}:{port}/api/v1/apispec.json")
     logger.info(f"服务器地址: http://{host}:{port}")
     logger.info(f"调试模式: {debug}")
+    logger.info("生产环境请使用多进程模式: python ocr_serve.py mineru")
+    lifecycle.install_signal_handler()
     app.run(host=host, port=port, debug=debug, threaded=True)
\ No newline at end of file
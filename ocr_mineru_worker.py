@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+"""
+常驻 MinerU worker 池
+
+每个 worker 是一个长期运行的子进程，启动时导入 MinerU 并（可选）用一页空白
+文档预热，使版面/OCR 模型只加载一次。服务进程通过本地管道向 worker 发送任务
+（输入文件、输出目录、语言），worker 调用 mineru.cli.common.do_parse 完成解析
+后回报结果，输出文件与 mineru 命令行一致（*_content_list.json 等）。
+
+- worker 在第一次使用时才启动，导入本模块不会创建子进程
+- 后台健康检查线程会重启意外退出的空闲 worker
+- 任务执行中 worker 崩溃或超时，会终止并重启该 worker，任务返回错误
+"""
+import io
+import os
+import time
+import uuid
+import logging
+import threading
+import traceback
+import multiprocessing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class MinerUWorkerError(Exception):
+    """MinerU worker 处理失败"""
+
+
+class MinerUWorkerTimeout(MinerUWorkerError):
+    """MinerU worker 处理超时"""
+
+
+def _blank_pdf_bytes() -> bytes:
+    """生成一页空白PDF，用于预热模型"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (595, 842), color='white').save(buffer, format='PDF')
+    return buffer.getvalue()
+
+
+def _worker_main(conn, model_source: str, warmup: bool):
+    """worker 进程入口：加载 MinerU 后循环处理任务"""
+    os.environ.setdefault('MINERU_MODEL_SOURCE', model_source)
+    try:
+        from mineru.cli.common import do_parse, read_fn
+
+        def parse(output_dir, names, pdf_bytes_list, lang):
+            do_parse(
+                output_dir,
+                names,
+                pdf_bytes_list,
+                [lang] * len(names),
+                backend='pipeline',
+                parse_method='auto',
+                f_draw_layout_bbox=False,
+                f_draw_span_bbox=False,
+                f_dump_md=False,
+                f_dump_middle_json=False,
+                f_dump_model_output=False,
+                f_dump_orig_pdf=False,
+                f_dump_content_list=True
+            )
+
+        if warmup:
+            warmup_dir = Path(os.environ.get('TMPDIR', '/tmp')) / f'mineru_warmup_{os.getpid()}'
+            try:
+                parse(str(warmup_dir), ['warmup'], [_blank_pdf_bytes()], 'ch')
+            finally:
+                import shutil
+                shutil.rmtree(warmup_dir, ignore_errors=True)
+    except Exception as e:
+        conn.send({'type': 'failed', 'error': str(e), 'traceback': traceback.format_exc()})
+        return
+
+    conn.send({'type': 'ready', 'pid': os.getpid()})
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        try:
+            files = [Path(file) for file in task['files']]
+            names = task.get('names') or [file.stem for file in files]
+            parse(task['output_dir'], names, [read_fn(file) for file in files], task['lang'])
+            conn.send({'type': 'done', 'task_id': task['task_id']})
+        except Exception as e:
+            conn.send({
+                'type': 'error',
+                'task_id': task['task_id'],
+                'error': str(e),
+                'traceback': traceback.format_exc()
+            })
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.ready = False
+        self.started_at = None
+        self.tasks = 0
+        self.restarts = -1
+
+
+def _worker_context():
+    """worker 由 forkserver 派生，forkserver 只预先导入本模块，不执行服务模块的初始化；
+    不支持 forkserver 的平台退回 spawn"""
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['ocr_mineru_worker'])
+    return context
+
+
+class MinerUWorkerPool:
+    """常驻 MinerU worker 池，线程安全"""
+
+    def __init__(self, size: int = None, model_source: str = None, warmup: bool = None,
+                 start_timeout: float = None, monitor_interval: float = None):
+        self.size = max(1, size or int(os.environ.get('MINERU_WORKERS', 1)))
+        self.model_source = model_source or os.environ.get('MINERU_MODEL_SOURCE', 'modelscope')
+        if warmup is None:
+            warmup = os.environ.get('MINERU_WORKER_WARMUP', 'true').lower() == 'true'
+        self.warmup = warmup
+        self.start_timeout = start_timeout or float(os.environ.get('MINERU_WORKER_START_TIMEOUT', 600))
+        self.monitor_interval = monitor_interval or float(os.environ.get('MINERU_WORKER_MONITOR_INTERVAL', 10))
+        self._ctx = _worker_context()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._idle = []
+        self._started = False
+        self._closed = False
+        self._monitor = None
+        self._completed = 0
+        self._failed = 0
+
+    # ============ 生命周期 ============
+    def start(self):
+        """启动所有 worker 和健康检查线程（重复调用无副作用）"""
+        with self._cond:
+            if self._started or self._closed:
+                return
+            self._started = True
+            for index in range(self.size):
+                worker = _Worker(index)
+                self._spawn(worker)
+                self._workers.append(worker)
+                self._idle.append(worker)
+        self._monitor = threading.Thread(target=self._monitor_loop, name='mineru-monitor', daemon=True)
+        self._monitor.start()
+        logger.info(f"MinerU worker池已启动，worker数: {self.size}")
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.model_source, self.warmup),
+            name=f'mineru-worker-{worker.index}',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker.process = process
+        worker.conn = parent_conn
+        worker.ready = False
+        worker.started_at = time.time()
+        worker.restarts += 1
+
+    def _stop(self, worker: _Worker):
+        try:
+            worker.conn.close()
+        except Exception:
+            pass
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(5)
+
+    def _restart(self, worker: _Worker, reason: str):
+        logger.warning(f"重启MinerU worker {worker.index} (pid={worker.process.pid}): {reason}")
+        self._stop(worker)
+        if not self._closed:
+            self._spawn(worker)
+
+    def _monitor_loop(self):
+        while not self._closed:
+            time.sleep(self.monitor_interval)
+            with self._cond:
+                # 只检查空闲 worker，执行中的 worker 由持有它的线程处理
+                dead = [worker for worker in self._idle if not worker.process.is_alive()]
+            for worker in dead:
+                with self._cond:
+                    if worker not in self._idle:
+                        continue
+                    self._idle.remove(worker)
+                try:
+                    self._restart(worker, f"进程已退出 (exitcode={worker.process.exitcode})")
+                finally:
+                    self._checkin(worker)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            workers = list(self._workers)
+            self._cond.notify_all()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+            self._stop(worker)
+
+    # ============ 任务 ============
+    def _checkout(self, deadline: float) -> _Worker:
+        self.start()
+        with self._cond:
+            while not self._idle:
+                if self._closed:
+                    raise MinerUWorkerError("MinerU worker池已关闭")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise MinerUWorkerTimeout("等待MinerU worker超时")
+                self._cond.wait(remaining)
+            return self._idle.pop(0)
+
+    def _checkin(self, worker: _Worker):
+        with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def _wait_ready(self, worker: _Worker):
+        remaining = worker.started_at + self.start_timeout - time.time()
+        if remaining <= 0 or not worker.conn.poll(remaining):
+            self._restart(worker, "启动超时")
+            raise MinerUWorkerError("MinerU worker启动超时")
+        message = worker.conn.recv()
+        if message.get('type') != 'ready':
+            error = message.get('error', '未知错误')
+            logger.error(f"MinerU worker启动失败: {message.get('traceback', error)}")
+            self._restart(worker, "启动失败")
+            raise MinerUWorkerError(f"MinerU初始化失败: {error}")
+        worker.ready = True
+        logger.info(f"MinerU worker {worker.index} 就绪 (pid={message['pid']})")
+
+    def run(self, files, output_dir: str, lang: str = 'ch', timeout: float = 300, names=None):
+        """
+        用一个 worker 解析一个或多个文件
+        :param files: 输入文件路径列表（PDF或图片）
+        :param output_dir: 输出目录，结构与 mineru 命令行一致
+        :param lang: 语言代码
+        :param timeout: 超时时间（秒），包含排队时间
+        :param names: 输出文件名（默认使用输入文件名）
+        """
+        deadline = time.monotonic() + timeout
+        worker = self._checkout(deadline)
+        try:
+            if not worker.ready:
+                try:
+                    self._wait_ready(worker)
+                except (EOFError, OSError):
+                    self._restart(worker, "启动时进程退出")
+                    raise MinerUWorkerError("MinerU worker启动失败")
+
+            task_id = uuid.uuid4().hex
+            try:
+                worker.conn.send({
+                    'task_id': task_id,
+                    'files': [str(file) for file in files],
+                    'names': names,
+                    'output_dir': str(output_dir),
+                    'lang': lang
+                })
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    self._restart(worker, "处理超时")
+                    raise MinerUWorkerTimeout("OCR processing timeout")
+                message = worker.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                self._restart(worker, "处理时进程退出")
+                with self._cond:
+                    self._failed += 1
+                raise MinerUWorkerError("MinerU worker异常退出")
+
+            worker.tasks += 1
+            if message.get('type') != 'done' or message.get('task_id') != task_id:
+                with self._cond:
+                    self._failed += 1
+                logger.error(f"MinerU处理失败: {message.get('traceback', message)}")
+                raise MinerUWorkerError(f"MinerU processing failed: {message.get('error', '未知错误')}")
+            with self._cond:
+                self._completed += 1
+        finally:
+            self._checkin(worker)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'started': self._started,
+                'size': self.size,
+                'idle': len(self._idle),
+                'completed': self._completed,
+                'failed': self._failed,
+                'workers': [
+                    {
+                        'index': worker.index,
+                        'pid': worker.process.pid if worker.process else None,
+                        'alive': worker.process.is_alive() if worker.process else False,
+                        'ready': worker.ready,
+                        'tasks': worker.tasks,
+                        'restarts': worker.restarts
+                    }
+                    for worker in self._workers
+                ]
+            }
+
+    def healthy(self) -> bool:
+        """未启动或至少有一个存活的 worker"""
+        with self._cond:
+            if not self._started:
+                return True
+            return any(worker.process.is_alive() for worker in self._workers)
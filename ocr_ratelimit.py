@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+按客户端限流（两个 OCR 服务共用）
+
+每个客户端有两项限制，取自客户端记录：
+- rate_limit：每分钟请求数，用令牌桶实现，桶容量为 burst（默认等于 rate_limit），
+  允许短时突发；为 0 或未设置时不限速率
+- max_concurrent：同时处理中的请求数上限，默认 OCR_DEFAULT_MAX_CONCURRENT；
+  异步任务在提交请求结束后继续运行，由 JobManager 在提交时按同一上限
+  检查该客户端排队和执行中的任务数
+
+计数保存在本机 SQLite 文件中，同一主机上的所有 Web worker 进程共用，
+多进程部署时限制依然成立。并发计数以租约记录：请求结束时释放，进程异常
+退出遗留的租约在 OCR_RATELIMIT_LEASE_TTL 秒后失效。存储出错时放行请求
+（只记录警告），限流不会成为服务的单点故障。
+
+响应带有 X-RateLimit-Limit / X-RateLimit-Remaining / X-RateLimit-Reset
+头，被拒绝的请求返回 429 和 Retry-After。
+
+环境变量：
+- OCR_RATELIMIT_ENABLED：是否启用，默认 true
+- OCR_RATELIMIT_DB：SQLite 文件路径，默认 /tmp/ocr_ratelimit.sqlite3
+- OCR_RATELIMIT_LEASE_TTL：并发租约的最长有效期（秒），默认 900
+- OCR_DEFAULT_MAX_CONCURRENT：客户端记录未设置 max_concurrent 时的默认值，默认 4
+"""
+import os
+import math
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitDecision:
+    def __init__(self, allowed: bool, limit, remaining, reset: int, retry_after: int = 0,
+                 reason: str = None, lease_id: str = None, max_concurrent: int = None):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+        self.reason = reason
+        self.lease_id = lease_id
+        self.max_concurrent = max_concurrent
+
+    def headers(self) -> dict:
+        headers = {}
+        if self.limit:
+            headers.update({
+                'X-RateLimit-Limit': str(self.limit),
+                'X-RateLimit-Remaining': str(self.remaining),
+                'X-RateLimit-Reset': str(self.reset)
+            })
+        if self.max_concurrent:
+            headers['X-Concurrency-Limit'] = str(self.max_concurrent)
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+ALLOW_ALL = RateLimitDecision(True, None, None, 0)
+
+
+class ClientRateLimiter:
+    """令牌桶 + 并发租约，计数保存在 SQLite 中，多进程安全"""
+
+    def __init__(self, namespace: str, db_path: str = None, enabled: bool = None,
+                 lease_ttl: float = None, default_max_concurrent: int = None):
+        if enabled is None:
+            enabled = os.environ.get('OCR_RATELIMIT_ENABLED', 'true').lower() == 'true'
+        self.enabled = enabled
+        self.namespace = namespace
+        self.db_path = db_path or os.environ.get('OCR_RATELIMIT_DB', '/tmp/ocr_ratelimit.sqlite3')
+        self.lease_ttl = lease_ttl or float(os.environ.get('OCR_RATELIMIT_LEASE_TTL', 900))
+        if default_max_concurrent is None:
+            default_max_concurrent = int(os.environ.get('OCR_DEFAULT_MAX_CONCURRENT', 4))
+        self.default_max_concurrent = default_max_concurrent
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.rejected = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS buckets ('
+                    'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+                )
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS leases ('
+                    'lease_id TEXT PRIMARY KEY, key TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_leases_key ON leases(key)')
+                self._initialized = True
+        self._local.conn = conn
+        return conn
+
+    def limits_for(self, client: dict):
+        """
+        :return: (每分钟请求数, 桶容量, 最大并发数)，0 表示不限
+        """
+        rate = int(client.get('rate_limit') or 0)
+        burst = int(client.get('burst') or rate)
+        max_concurrent = client.get('max_concurrent', self.default_max_concurrent)
+        return rate, burst, int(max_concurrent or 0)
+
+    def acquire(self, client_id: str, client: dict) -> RateLimitDecision:
+        """检查并占用一次请求额度和一个并发名额"""
+        if not self.enabled:
+            return ALLOW_ALL
+        rate, burst, max_concurrent = self.limits_for(client)
+        if not rate and not max_concurrent:
+            return ALLOW_ALL
+
+        key = f'{self.namespace}:{client_id}'
+        per_second = rate / 60.0
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                tokens = burst
+                if rate:
+                    row = conn.execute('SELECT tokens, updated_at FROM buckets WHERE key = ?', (key,)).fetchone()
+                    if row is not None:
+                        tokens = min(burst, row[0] + (now - row[1]) * per_second)
+
+                active = 0
+                if max_concurrent:
+                    conn.execute('DELETE FROM leases WHERE expires_at < ?', (now,))
+                    active = conn.execute('SELECT COUNT(*) FROM leases WHERE key = ?', (key,)).fetchone()[0]
+
+                reason = None
+                retry_after = 0
+                lease_id = None
+                if max_concurrent and active >= max_concurrent:
+                    reason = 'concurrency'
+                    retry_after = 1
+                elif rate and tokens < 1:
+                    reason = 'rate'
+                    retry_after = max(1, math.ceil((1 - tokens) / per_second))
+                else:
+                    if rate:
+                        tokens -= 1
+                    if max_concurrent:
+                        lease_id = uuid.uuid4().hex
+                        conn.execute(
+                            'INSERT INTO leases (lease_id, key, expires_at) VALUES (?, ?, ?)',
+                            (lease_id, key, now + self.lease_ttl)
+                        )
+
+                if rate:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                        (key, tokens, now)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except Exception as e:
+            logger.warning(f"限流存储不可用，放行请求: {str(e)}")
+            return ALLOW_ALL
+
+        if reason is not None:
+            self.rejected += 1
+        return RateLimitDecision(
+            allowed=reason is None,
+            limit=rate or None,
+            remaining=max(0, int(tokens)) if rate else None,
+            reset=math.ceil((burst - tokens) / per_second) if rate else 0,
+            retry_after=retry_after,
+            reason=reason,
+            lease_id=lease_id,
+            max_concurrent=max_concurrent or None
+        )
+
+    def release(self, lease_id: str):
+        if not lease_id:
+            return
+        try:
+            self._connect().execute('DELETE FROM leases WHERE lease_id = ?', (lease_id,))
+        except Exception as e:
+            logger.warning(f"释放并发租约失败: {str(e)}")
+
+    def init_app(self, app):
+        """注册响应头和请求结束时释放并发名额（流式响应在输出结束后释放）"""
+        @app.after_request
+        def _rate_limit_headers(response):
+            decision = g.get('rate_limit')
+            if decision is not None:
+                for name, value in decision.headers().items():
+                    response.headers.setdefault(name, value)
+            return response
+
+        @app.teardown_request
+        def _rate_limit_release(exc=None):
+            decision = g.pop('rate_limit', None)
+            if decision is not None:
+                self.release(decision.lease_id)
+
+    def stats(self) -> dict:
+        return {'enabled': self.enabled, 'rejected': self.rejected}
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 网关的引擎选择：用低成本的启发式规则判断输入交给 Tesseract 还是 MinerU
+
+Tesseract 识别一页图片只需要几百毫秒的 CPU；MinerU 要做版面分析、公式和表格
+识别，单页成本高一到两个数量级，但能正确处理多栏排版、公式和表格。规则只看
+缩略图和 PDF 文本层，不做识别：
+
+- 单页图片、多帧 TIFF：单栏版面交给 Tesseract，检测到多栏交给 MinerU
+- PDF：抽样前几页，文本层中数学符号比例高（公式）、多栏版面或大量线条对象
+  （表格）时交给 MinerU，否则交给 Tesseract；无法解析的 PDF 交给 MinerU
+- 无法识别的类型交给 Tesseract（由 Tesseract 服务返回格式错误）
+
+多栏检测：把缩略图二值化后按高度分成若干横条，统计每列的墨迹量，
+横条内部出现足够宽的空白列（栏间距）即为多栏；过半的非空横条有栏间距时
+判为多栏，标题、通栏图片不影响结果。
+
+环境变量：
+- OCR_ROUTE_SAMPLE_PAGES：PDF 抽样的页数，默认 3
+- OCR_ROUTE_FORMULA_RATIO：数学符号占文本层字符的比例阈值，默认 0.02
+- OCR_ROUTE_TABLE_PATHS：单页线条对象数阈值，默认 200
+- OCR_ROUTE_THUMBNAIL_WIDTH：版面分析的缩略图宽度（像素），默认 600
+"""
+import io
+import os
+import logging
+
+import numpy as np
+from PIL import Image
+
+try:
+    import pypdfium2 as pdfium  # 可选依赖，用于PDF分析
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('tesseract', 'mineru')
+
+SAMPLE_PAGES = int(os.environ.get('OCR_ROUTE_SAMPLE_PAGES', 3))
+FORMULA_RATIO = float(os.environ.get('OCR_ROUTE_FORMULA_RATIO', 0.02))
+TABLE_PATHS = int(os.environ.get('OCR_ROUTE_TABLE_PATHS', 200))
+THUMBNAIL_WIDTH = int(os.environ.get('OCR_ROUTE_THUMBNAIL_WIDTH', 600))
+
+# 多栏检测参数：横条数、栏间距最小宽度（占页宽比例）、空白列的墨迹上限
+BANDS = 6
+MIN_GUTTER = 0.02
+GUTTER_INK = 0.002
+# 每栏至少占页宽的比例，排除页边的行号、页眉装饰
+MIN_COLUMN = 0.15
+
+_PATH_OBJECT = 2  # FPDF_PAGEOBJ_PATH
+
+# 常见数学符号之外，按码位区间统计：希腊字母、数学运算符、箭头、数学字母数字符号
+_MATH_CHARS = set('=+−±×÷·∑∏∫∮√∞∂∇≈≠≡≤≥∈∉⊂⊃∪∩∧∨¬∀∃′″')
+_MATH_RANGES = (
+    (0x0391, 0x03C9),
+    (0x2190, 0x21FF),
+    (0x2200, 0x22FF),
+    (0x27C0, 0x27EF),
+    (0x2980, 0x2AFF),
+    (0x1D400, 0x1D7FF),
+)
+
+
+def decision(engine: str, reason: str, **features) -> dict:
+    return {'engine': engine, 'reason': reason, 'features': features}
+
+
+def _is_math(char: str) -> bool:
+    if char in _MATH_CHARS:
+        return True
+    code = ord(char)
+    return any(low <= code <= high for low, high in _MATH_RANGES)
+
+
+def formula_ratio(text: str) -> float:
+    """数学符号占非空白字符的比例"""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    return sum(1 for c in chars if _is_math(c)) / len(chars)
+
+
+def _thumbnail(image: Image.Image) -> np.ndarray:
+    """灰度缩略图二值化，返回墨迹掩码（True 为墨迹）"""
+    gray = image.convert('L')
+    if gray.width > THUMBNAIL_WIDTH:
+        height = max(1, round(gray.height * THUMBNAIL_WIDTH / gray.width))
+        gray = gray.resize((THUMBNAIL_WIDTH, height), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.uint8)
+    # 以平均亮度的八成为阈值，白底文档上足以区分文字和背景
+    return pixels < pixels.mean() * 0.8
+
+
+def _band_columns(ink: np.ndarray) -> int:
+    """一个横条中的栏数：两侧都有足够宽的文字区域的空白列段视为栏间距"""
+    width = ink.shape[1]
+    profile = ink.mean(axis=0)
+    blank = profile <= GUTTER_INK
+    min_gutter = max(2, int(width * MIN_GUTTER))
+    min_column = int(width * MIN_COLUMN)
+
+    columns = []
+    start = None
+    for x in range(width + 1):
+        if x < width and not blank[x]:
+            if start is None:
+                start = x
+            continue
+        if start is not None:
+            columns.append([start, x])
+            start = None
+    if not columns:
+        return 0
+
+    # 间隔小于栏间距的文字段合并为一栏（词间距、字母间隙）
+    merged = [columns[0]]
+    for begin, end in columns[1:]:
+        if begin - merged[-1][1] < min_gutter:
+            merged[-1][1] = end
+        else:
+            merged.append([begin, end])
+    return sum(1 for begin, end in merged if end - begin >= min_column) or 1
+
+
+def column_count(image: Image.Image) -> int:
+    """版面的栏数（1 为单栏），过半的非空横条为多栏时取其中最常见的栏数"""
+    ink = _thumbnail(image)
+    height = ink.shape[0]
+    counts = []
+    for index in range(BANDS):
+        band = ink[height * index // BANDS:height * (index + 1) // BANDS]
+        if band.size and band.mean() > GUTTER_INK:
+            counts.append(_band_columns(band))
+    if not counts:
+        return 1
+    multi = [count for count in counts if count > 1]
+    if len(multi) * 2 <= len(counts):
+        return 1
+    return max(set(multi), key=multi.count)
+
+
+def analyze_image(content: bytes) -> dict:
+    with Image.open(io.BytesIO(content)) as image:
+        frames = getattr(image, 'n_frames', 1)
+        return {
+            'width': image.width,
+            'height': image.height,
+            'pages': frames,
+            'columns': column_count(image),
+        }
+
+
+def analyze_pdf(content: bytes) -> dict:
+    """抽样前 SAMPLE_PAGES 页：文本层的数学符号比例、线条对象数和栏数"""
+    if pdfium is None:
+        raise RuntimeError("未安装pypdfium2，无法分析PDF")
+    pdf = pdfium.PdfDocument(content)
+    try:
+        pages = len(pdf)
+        text_parts = []
+        max_paths = 0
+        columns = 1
+        for index in range(min(pages, SAMPLE_PAGES)):
+            page = pdf[index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    text_parts.append(textpage.get_text_range())
+                finally:
+                    textpage.close()
+                paths = sum(1 for obj in page.get_objects() if obj.type == _PATH_OBJECT)
+                max_paths = max(max_paths, paths)
+                scale = THUMBNAIL_WIDTH / max(1.0, page.get_width())
+                bitmap = page.render(scale=scale, grayscale=True)
+                columns = max(columns, column_count(bitmap.to_pil()))
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+    text = ''.join(text_parts)
+    return {
+        'pages': pages,
+        'sampled_pages': min(pages, SAMPLE_PAGES),
+        'text_layer': bool(text.strip()),
+        'formula_ratio': round(formula_ratio(text), 4),
+        'max_paths': max_paths,
+        'columns': columns,
+    }
+
+
+def choose_engine(content: bytes, file_type) -> dict:
+    """
+    为一份输入选择引擎
+    :param file_type: ocr_http.sniff_file_type 判断的类型
+    :return: {'engine': 'tesseract'|'mineru', 'reason': 原因, 'features': 分析得到的特征}
+    """
+    if file_type == 'pdf':
+        try:
+            features = analyze_pdf(content)
+        except Exception as e:
+            logger.warning(f"PDF版面分析失败，交给MinerU处理: {str(e)}")
+            return decision('mineru', 'unanalyzable_pdf', error=str(e))
+        if features['formula_ratio'] >= FORMULA_RATIO:
+            return decision('mineru', 'formula', **features)
+        if features['columns'] > 1:
+            return decision('mineru', 'multi_column', **features)
+        if features['max_paths'] >= TABLE_PATHS:
+            return decision('mineru', 'table', **features)
+        return decision('tesseract', 'simple_pdf', **features)
+
+    if file_type is None:
+        return decision('tesseract', 'unknown_type')
+
+    try:
+        features = analyze_image(content)
+    except Exception as e:
+        logger.warning(f"图片版面分析失败，交给Tesseract处理: {str(e)}")
+        return decision('tesseract', 'unanalyzable_image', error=str(e))
+    if features['columns'] > 1:
+        return decision('mineru', 'multi_column', **features)
+    return decision('tesseract', 'single_column', **features)
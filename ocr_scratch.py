@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 临时文件的工作区
+
+MinerU 只能读写文件：输入文件、按页拆分的 PDF 和 MinerU 的输出目录都放在
+工作区中。
+
+- 工作区根目录默认放在内存文件系统 /dev/shm 上（可写且剩余空间足够时），
+  否则使用系统临时目录；也可以用 OCR_SCRATCH_DIR 指定，如挂载的 tmpfs
+- 每个工作区有大小上限：写入输入文件前检查，MinerU 输出后再检查一次，
+  超过上限时抛出 ScratchQuotaExceeded
+- 工作区以 with 语句使用，退出时整个目录删除；目录名带有所属进程号，
+  进程异常退出遗留的目录由 sweep() 在服务启动时清理
+- 下载和上传的内存缓冲（ocr_http）溢出时也写到工作区根目录
+
+环境变量：
+- OCR_SCRATCH_DIR：工作区根目录，默认自动选择
+- OCR_SCRATCH_MIN_FREE：自动选择 /dev/shm 时要求的最小剩余空间（字节），默认 2GB
+- OCR_SCRATCH_QUOTA：每个工作区的大小上限（字节），默认 1GB
+- OCR_SCRATCH_ORPHAN_AGE：无法判断所属进程的遗留目录在多久（秒）之后清理，默认 3600
+"""
+import os
+import re
+import time
+import shutil
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+SHM_DIR = '/dev/shm'
+_OWNER_PID = re.compile(r'_p(\d+)-')
+
+
+class ScratchQuotaExceeded(Exception):
+    """工作区中的文件超过大小上限"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def default_root(min_free: int) -> str:
+    """/dev/shm 可写且剩余空间不少于 min_free 时使用它，否则使用系统临时目录"""
+    try:
+        if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK) and \
+                shutil.disk_usage(SHM_DIR).free >= min_free:
+            return SHM_DIR
+    except OSError:
+        pass
+    return tempfile.gettempdir()
+
+
+class Workspace:
+    """一个请求的临时目录"""
+
+    def __init__(self, path: str, quota: int):
+        self.path = path
+        self.quota = quota
+
+    def file_path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def mkdir(self, name: str) -> str:
+        path = self.file_path(name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def usage(self) -> int:
+        return _tree_size(self.path)
+
+    def reserve(self, size: int):
+        """写入 size 字节前检查上限"""
+        if self.usage() + size > self.quota:
+            raise ScratchQuotaExceeded(f"临时文件超过上限: {self.quota}字节")
+
+    def check_quota(self):
+        """外部程序（MinerU）写完输出后检查上限"""
+        usage = self.usage()
+        if usage > self.quota:
+            raise ScratchQuotaExceeded(f"临时文件超过上限: {usage}/{self.quota}字节")
+
+    def write(self, name: str, data) -> str:
+        """
+        写入一个文件
+        :param data: bytes，或带 size 属性和 save(path) 方法的对象（ocr_http.DownloadedFile）
+        :return: 文件路径
+        """
+        path = self.file_path(name)
+        if isinstance(data, (bytes, bytearray)):
+            self.reserve(len(data))
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            self.reserve(data.size)
+            data.save(path)
+        return path
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+class ScratchSpace:
+    def __init__(self, root: str = None, quota: int = None, orphan_age: float = None):
+        min_free = int(os.environ.get('OCR_SCRATCH_MIN_FREE', 2 * 1024 ** 3))
+        self.root = root or os.environ.get('OCR_SCRATCH_DIR') or default_root(min_free)
+        self.quota = quota or int(os.environ.get('OCR_SCRATCH_QUOTA', 1024 ** 3))
+        self.orphan_age = orphan_age or float(os.environ.get('OCR_SCRATCH_ORPHAN_AGE', 3600))
+        os.makedirs(self.root, exist_ok=True)
+        self.created = 0
+        self.swept = 0
+
+    @property
+    def in_memory(self) -> bool:
+        return os.path.realpath(self.root).startswith(SHM_DIR)
+
+    def workspace(self, prefix: str = 'ocr_') -> Workspace:
+        """创建工作区，目录名为 <prefix>p<进程号>-<随机串>"""
+        path = tempfile.mkdtemp(prefix=f'{prefix}p{os.getpid()}-', dir=self.root)
+        self.created += 1
+        return Workspace(path, self.quota)
+
+    def sweep(self, prefixes=('mineru_',)) -> int:
+        """
+        清理遗留的临时目录：所属进程已不存在的目录，以及旧版本创建的、
+        超过 orphan_age 的不带进程号的目录。同时检查系统临时目录
+        :return: 清理的目录数
+        """
+        prefixes = tuple(prefixes)
+        now = time.time()
+        removed = 0
+        for directory in {self.root, tempfile.gettempdir()}:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.startswith(prefixes) or not entry.is_dir(follow_symlinks=False):
+                    continue
+                match = _OWNER_PID.search(entry.name)
+                try:
+                    if match:
+                        orphaned = not _pid_alive(int(match.group(1)))
+                    else:
+                        orphaned = now - entry.stat(follow_symlinks=False).st_mtime > self.orphan_age
+                except OSError:
+                    continue
+                if orphaned:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+        self.swept += removed
+        if removed:
+            logger.info(f"已清理遗留的临时目录 {removed} 个")
+        return removed
+
+    def stats(self) -> dict:
+        try:
+            free = shutil.disk_usage(self.root).free
+        except OSError:
+            free = None
+        return {
+            'root': self.root,
+            'in_memory': self.in_memory,
+            'quota': self.quota,
+            'free_bytes': free,
+            'workspaces_created': self.created,
+            'orphans_swept': self.swept
+        }
+
+
+scratch = ScratchSpace()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+以多进程方式运行 OCR 服务（gunicorn 预派生 + 多线程 worker）
+
+    python ocr_serve.py tesseract
+    python ocr_serve.py mineru
+    python ocr_serve.py gateway
+
+- 应用在主进程中预加载一次，再 fork 出 worker：客户端存储只初始化一次，
+  JWT 密钥在所有 worker 间共享（未设置 JWT_SECRET_KEY 时由主进程生成）
+- 每个 worker 使用 gthread 处理并发请求，慢请求不会阻塞其他请求
+- 引擎池、识别进程池、令牌存储、异步任务等状态属于各个 worker 进程：
+  Tesseract 服务按 worker 数分摊每个进程的引擎池和识别进程池；MinerU 服务
+  固定只用一个 worker（模型常驻在 MinerU worker 进程中，异步任务保存在内存里，
+  多个 Web worker 之间无法查询彼此的任务，设置了更大的 OCR_SERVE_WORKERS
+  也按 1 个启动）；网关按 worker 数分摊每个引擎的
+  并发上限，转发请求时线程等待后端响应，默认使用更多线程
+- 收到 SIGTERM 后就绪探测立即返回失败，已接收的请求在
+  OCR_SERVE_GRACEFUL_TIMEOUT 秒内处理完，之后关闭进程池
+
+环境变量：
+- OCR_SERVE_BIND：监听地址，默认 HOST:PORT（0.0.0.0:5000）
+- OCR_SERVE_WORKERS：Web worker 数，Tesseract 默认 CPU 核数，网关默认 2，MinerU 固定为 1
+- OCR_SERVE_THREADS：每个 worker 的线程数，默认 8（网关默认 32）
+- OCR_SERVE_TIMEOUT：单个请求的最长处理时间（秒），默认 600
+- OCR_SERVE_GRACEFUL_TIMEOUT：优雅下线的等待时间（秒），默认 60
+- OCR_SERVE_MAX_REQUESTS：worker 处理多少个请求后重启，默认 0（不重启）
+"""
+import os
+import sys
+import signal
+import logging
+import secrets
+import importlib
+
+logger = logging.getLogger(__name__)
+
+SERVICES = {
+    'tesseract': {'module': 'ocr_tesseract', 'workers': os.cpu_count() or 1},
+    # 异步任务保存在 worker 进程内存中，查询、取消必须落到提交任务的 worker
+    'mineru': {'module': 'ocr_mineru', 'workers': 1, 'max_workers': 1},
+    'gateway': {'module': 'ocr_gateway', 'workers': 2, 'threads': 32},
+}
+
+
+def serve_options(service: str) -> dict:
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = os.environ.get('PORT', '5000')
+    max_requests = int(os.environ.get('OCR_SERVE_MAX_REQUESTS', 0))
+    workers = int(os.environ.get('OCR_SERVE_WORKERS', 0)) or SERVICES[service]['workers']
+    max_workers = SERVICES[service].get('max_workers')
+    if max_workers and workers > max_workers:
+        logger.warning(
+            f"{service} 服务的异步任务保存在进程内存中，多个 worker 之间无法查询彼此的任务，"
+            f"worker 数从 {workers} 限制为 {max_workers}"
+        )
+        workers = max_workers
+    return {
+        'bind': os.environ.get('OCR_SERVE_BIND', f'{host}:{port}'),
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': int(os.environ.get('OCR_SERVE_THREADS', 0)) or SERVICES[service].get('threads', 8),
+        'timeout': int(os.environ.get('OCR_SERVE_TIMEOUT', 600)),
+        'graceful_timeout': int(os.environ.get('OCR_SERVE_GRACEFUL_TIMEOUT', 60)),
+        'keepalive': 5,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'preload_app': True,
+        'accesslog': '-',
+    }
+
+
+def load_service(service: str):
+    """导入服务模块；JWT 密钥在导入前确定，保证所有 worker 使用同一个"""
+    if not os.environ.get('JWT_SECRET_KEY'):
+        os.environ['JWT_SECRET_KEY'] = secrets.token_hex(32)
+        logger.warning("未设置JWT_SECRET_KEY，已生成临时密钥，服务重启后已签发的令牌失效")
+    return importlib.import_module(SERVICES[service]['module'])
+
+
+def make_hooks(module, workers: int) -> dict:
+    """gunicorn 钩子：fork 后重置每个 worker 的状态，SIGTERM 时进入下线状态"""
+
+    def post_fork(server, worker):
+        module.lifecycle.reset()
+        module.configure_worker(workers)
+
+    def post_worker_init(worker):
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_term(signum, frame):
+            module.lifecycle.start_draining('SIGTERM')
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_term)
+
+    def worker_exit(server, worker):
+        module.lifecycle.shutdown()
+
+    return {'post_fork': post_fork, 'post_worker_init': post_worker_init, 'worker_exit': worker_exit}
+
+
+def main(argv=None):
+    from gunicorn.app.base import BaseApplication
+
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1 or argv[0] not in SERVICES:
+        print(f"用法: python ocr_serve.py [{'|'.join(SERVICES)}]")
+        return 2
+    service = argv[0]
+    options = serve_options(service)
+    module = load_service(service)
+    options.update(make_hooks(module, options['workers']))
+
+    class OCRApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return module.app
+
+    logger.info(
+        f"启动 {service} 服务: {options['bind']}, worker {options['workers']} x 线程 {options['threads']}"
+    )
+    OCRApplication().run()
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
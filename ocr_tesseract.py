@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import pytesseract
 from PIL import Image
 import io
@@ -10,13 +10,28 @@ from datetime import datetime, timedelta
 import os
 import json
 import secrets
-import hashlib
-from functools import wraps
 import base64
 import time
-import hmac
 import uuid
+import shutil
+import sys
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
 from flasgger import Swagger, swag_from
+from werkzeug.exceptions import RequestEntityTooLarge
+from ocr_tesseract_engine import engine_pool, EnginePoolTimeout
+from ocr_tesseract_engine import init_worker_process, recognize_image_bytes, recognize_image
+from ocr_tesseract_engine import detect_document_kind, document_page_count, split_document, recognize_document_page
+from ocr_batch import BatchExecutor, wait_result, remaining_seconds
+from ocr_cache import ocr_cache, content_digest
+from ocr_preprocess import parse_options as parse_preprocess_options
+from ocr_adaptive import parse_options as parse_adaptive_options, cache_param as adaptive_cache_param
+from ocr_http import fetch, read_uploads, form_parameters, DownloadTooLarge, InMemoryRequest
+from ocr_lifecycle import ServiceLifecycle
+from ocr_auth import ServiceAuth
+from ocr_capabilities import EngineCapabilities
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +41,8 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['JSON_AS_ASCII'] = False
+# 下载和上传的文件只保存在内存中（大小受 MAX_CONTENT_LENGTH 限制），不写临时文件
+app.request_class = InMemoryRequest
 
 # ============ Flasgger 配置 ============
 swagger_config = {
@@ -57,15 +74,24 @@ swagger_config = {
 
 # 初始化Swagger
 swagger = Swagger(app, config=swagger_config, template=swagger_config)
-# 辅助函数：安全获取Tesseract版本
+# 辅助函数：探测Tesseract版本、语言包，并用一张空白图片自检（会启动tesseract进程）
+def probe_tesseract() -> dict:
+    """
+    探测Tesseract能力信息
+    :raises Exception: 探测失败，由 EngineCapabilities 保留上一次的结果
+    """
+    version = str(pytesseract.get_tesseract_version())
+    languages = sorted(pytesseract.get_languages(config=''))
+    pytesseract.image_to_string(Image.new('L', (100, 50), color=255), lang='eng')
+    return {'version': version, 'languages': languages, 'available': True}
+
+# 引擎能力信息：启动时探测一次，之后只读缓存，通过刷新接口重新探测
+tesseract_capabilities = EngineCapabilities('tesseract', probe_tesseract)
+tesseract_capabilities.refresh()
+
 def get_tesseract_version_str() -> str:
-    """安全地获取Tesseract版本字符串"""
-    try:
-        version = pytesseract.get_tesseract_version()
-        return str(version)
-    except Exception as e:
-        logger.warning(f"获取Tesseract版本失败: {str(e)}")
-        return "unknown"
+    """安全地获取Tesseract版本字符串（读取缓存）"""
+    return tesseract_capabilities.get()['version']
 
 # 响应格式化函数
 def format_response(success=True, message=None, data=None, error=None, **kwargs):
@@ -119,6 +145,16 @@ class Config:
     MAX_IMAGE_SIZE = 8192
     TIMEOUT = 10
 
+    # 批量OCR配置
+    BATCH_MAX_ITEMS = int(os.environ.get('OCR_BATCH_MAX_ITEMS', 10))
+    BATCH_WORKERS = int(os.environ.get('OCR_BATCH_WORKERS', 0)) or os.cpu_count() or 1
+    BATCH_ITEM_TIMEOUT = int(os.environ.get('OCR_BATCH_ITEM_TIMEOUT', 60))
+
+    # 多页文档配置
+    PDF_DPI = int(os.environ.get('OCR_PDF_DPI', 300))
+    MAX_PAGES = int(os.environ.get('OCR_MAX_PAGES', 200))
+    PAGE_TIMEOUT = int(os.environ.get('OCR_PAGE_TIMEOUT', 120))
+
     # 认证配置
     AUTH_ENABLED = os.environ.get('AUTH_ENABLED', 'True').lower() == 'true'
     TOKEN_EXPIRATION_HOURS = int(os.environ.get('TOKEN_EXPIRATION_HOURS', 24))
@@ -130,6 +166,8 @@ class Config:
     # 公开端点
     PUBLIC_ENDPOINTS = [
         '/api/v1/health',
+        '/api/v1/health/live',
+        '/api/v1/health/ready',
         '/api/v1/auth/token',
         '/',
         '/api/v1/test/ocr'
@@ -137,242 +175,85 @@ class Config:
 
 app.config.from_object(Config)
 
-# 令牌存储
-token_store = {}
-
-# 客户端存储类
-class ClientStore:
-    def __init__(self):
-        self.clients_file = app.config['CLIENT_STORE_FILE']
-        self.clients = self.load_clients()
-
-        if not self.clients:
-            self.init_default_client()
-
-    def load_clients(self) -> dict:
-        """从文件加载客户端数据"""
-        try:
-            if os.path.exists(self.clients_file):
-                with open(self.clients_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"加载客户端文件失败: {str(e)}")
-        return {}
-
-    def save_clients(self):
-        """保存客户端数据到文件"""
-        try:
-            with open(self.clients_file, 'w') as f:
-                json.dump(self.clients, f, indent=2)
-        except Exception as e:
-            logger.error(f"保存客户端文件失败: {str(e)}")
-
-    def init_default_client(self):
-        """初始化默认客户端"""
-        client_id = "default_client"
-        client_secret = secrets.token_urlsafe(32)
-
-        self.clients[client_id] = {
-            'client_secret_hash': self.hash_secret(client_secret),
-            'name': '默认客户端',
-            'description': '系统默认客户端',
-            'created_at': datetime.now().isoformat(),
-            'is_active': True,
-            'rate_limit': 100,
-            'scopes': ['ocr:read', 'ocr:batch'],
-            'metadata': {
-                'owner': 'system',
-                'contact': 'admin@example.com'
-            }
-        }
-        self.save_clients()
-
-        logger.info(f"已创建默认客户端 - ID: {client_id}")
-        logger.info(f"默认客户端密钥: {client_secret}")
-        logger.warning("请在生产环境中修改默认客户端密钥！")
-
-    def hash_secret(self, secret: str) -> str:
-        """哈希加密密钥"""
-        salt = os.urandom(16)
-        return hashlib.pbkdf2_hmac(
-            'sha256',
-            secret.encode('utf-8'),
-            salt,
-            100000
-        ).hex() + '.' + salt.hex()
-
-    def verify_secret(self, secret: str, stored_hash: str) -> bool:
-        """验证密钥"""
-        try:
-            hash_part, salt_hex = stored_hash.split('.')
-            salt = bytes.fromhex(salt_hex)
-
-            new_hash = hashlib.pbkdf2_hmac(
-                'sha256',
-                secret.encode('utf-8'),
-                salt,
-                100000
-            ).hex()
-
-            return secrets.compare_digest(new_hash, hash_part)
-        except:
-            return False
-
-    def validate_client(self, client_id: str, client_secret: str) -> bool:
-        """验证客户端凭证"""
-        if client_id not in self.clients:
-            return False
-
-        client = self.clients[client_id]
-
-        if not client.get('is_active', True):
-            return False
-
-        stored_hash = client.get('client_secret_hash')
-        if not stored_hash:
-            return False
-
-        return self.verify_secret(client_secret, stored_hash)
-
-    def get_client_info(self, client_id: str):
-        """获取客户端信息"""
-        if client_id not in self.clients:
-            return None
-
-        client = self.clients[client_id].copy()
-        client.pop('client_secret_hash', None)
-        return client
-
-# 初始化客户端存储
-client_store = ClientStore()
-
-# 令牌管理函数
-def create_token(client_id: str) -> str:
-    """创建访问令牌"""
-    token_id = str(uuid.uuid4())
-    expires_at = int(time.time()) + app.config['TOKEN_EXPIRATION_HOURS'] * 3600
+# 批量OCR执行器：下载在线程池中并发执行，识别交给有界进程池
+batch_executor = BatchExecutor()
+_ocr_process_pool = None
+_ocr_process_pool_lock = threading.Lock()
 
-    message = f"{client_id}:{token_id}:{expires_at}"
-    signature = hmac.new(
-        app.config['JWT_SECRET_KEY'].encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
 
-    client_id_encoded = base64.urlsafe_b64encode(client_id.encode()).decode().rstrip('=')
-    token = f"{client_id_encoded}.{token_id}.{expires_at}.{signature}"
+def get_ocr_process_pool() -> ProcessPoolExecutor:
+    """懒加载识别进程池
 
-    token_store[token] = {
-        'client_id': client_id,
-        'token_id': token_id,
-        'expires_at': expires_at,
-        'created_at': int(time.time())
-    }
-
-    return token
-
-def validate_token(token: str) -> dict:
-    """验证访问令牌"""
-    try:
-        parts = token.split('.')
-        if len(parts) != 4:
-            return None
-
-        client_id_encoded, token_id, expires_at_str, signature = parts
-        client_id = base64.urlsafe_b64decode(client_id_encoded + '=' * (4 - len(client_id_encoded) % 4)).decode()
-
-        message = f"{client_id}:{token_id}:{expires_at_str}"
-        expected_signature = hmac.new(
-            app.config['JWT_SECRET_KEY'].encode(),
-            message.encode(),
-            hashlib.sha256
-        ).hexdigest()
-
-        if not hmac.compare_digest(signature, expected_signature):
-            return None
-
-        expires_at = int(expires_at_str)
-        if time.time() > expires_at:
-            return None
-
-        if token in token_store:
-            stored_info = token_store[token]
-            if stored_info['client_id'] != client_id or stored_info['token_id'] != token_id:
-                return None
-
-        return {
-            'client_id': client_id,
-            'token_id': token_id,
-            'expires_at': expires_at
-        }
-
-    except Exception as e:
-        logger.error(f"令牌验证失败: {str(e)}")
-        return None
-
-# 认证装饰器
-def requires_auth(f):
-    """认证装饰器"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        if not app.config['AUTH_ENABLED']:
-            return f(*args, **kwargs)
-
-        if request.path in app.config['PUBLIC_ENDPOINTS']:
-            return f(*args, **kwargs)
-
-        auth_header = request.headers.get('Authorization')
-
-        if not auth_header:
-            return json_response(
-                success=False,
-                error="需要认证信息",
-                message="请提供Authorization头",
-                status_code=401
+    识别进程由 forkserver 派生，forkserver 只预先导入 ocr_tesseract_engine，
+    不会执行本模块的初始化（Flask应用、客户端存储、能力探测等）；
+    不支持 forkserver 的平台退回 spawn
+    """
+    global _ocr_process_pool
+    with _ocr_process_pool_lock:
+        if _ocr_process_pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['ocr_tesseract_engine'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            _ocr_process_pool = ProcessPoolExecutor(
+                max_workers=app.config['BATCH_WORKERS'],
+                mp_context=context,
+                initializer=init_worker_process
             )
+            logger.info(f"已创建OCR进程池，进程数: {app.config['BATCH_WORKERS']}")
+        return _ocr_process_pool
 
-        if not auth_header.startswith('Bearer '):
-            return json_response(
-                success=False,
-                error="令牌格式不正确",
-                message="应为Bearer token格式",
-                status_code=401
-            )
 
-        token = auth_header[7:]
-        token_info = validate_token(token)
+def reset_ocr_process_pool(broken_pool: ProcessPoolExecutor):
+    """进程池中的worker异常退出后重建进程池"""
+    global _ocr_process_pool
+    with _ocr_process_pool_lock:
+        if _ocr_process_pool is broken_pool:
+            _ocr_process_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
 
-        if not token_info:
-            return json_response(
-                success=False,
-                error="无效或过期的令牌",
-                message="请重新获取访问令牌",
-                status_code=401
-            )
 
-        client_id = token_info['client_id']
+def shutdown_ocr_process_pool():
+    global _ocr_process_pool
+    with _ocr_process_pool_lock:
+        pool, _ocr_process_pool = _ocr_process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
 
-        if client_id not in client_store.clients:
-            return json_response(
-                success=False,
-                error="客户端不存在",
-                message="客户端ID无效",
-                status_code=401
-            )
 
-        client = client_store.clients[client_id]
-        if not client.get('is_active', True):
-            return json_response(
-                success=False,
-                error="客户端已被停用",
-                message="请联系管理员",
-                status_code=403
-            )
+def configure_worker(worker_count: int):
+    """
+    多进程部署（ocr_serve）时在每个Web worker中调用：
+    未显式配置时按worker数分摊CPU核，避免引擎和识别进程数随worker数成倍增加
+    """
+    share = max(1, (os.cpu_count() or 1) // max(1, worker_count))
+    if not os.environ.get('TESSERACT_POOL_SIZE'):
+        engine_pool.size = share
+    if not os.environ.get('OCR_BATCH_WORKERS'):
+        app.config['BATCH_WORKERS'] = share
+    logger.info(
+        f"Web worker {os.getpid()}: 引擎池容量 {engine_pool.size}, 识别进程数 {app.config['BATCH_WORKERS']}"
+    )
 
-        request.client_id = client_id
-        return f(*args, **kwargs)
 
-    return decorated
+# 存活/就绪状态：就绪检查只读内存状态，不启动子进程
+lifecycle = ServiceLifecycle('tesseract')
+lifecycle.init_app(app)
+lifecycle.add_check('tesseract_binary', lambda: shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None)
+lifecycle.add_shutdown_hook(shutdown_ocr_process_pool)
+lifecycle.add_shutdown_hook(engine_pool.close)
+
+# 客户端认证（ocr_auth）：客户端存储、令牌、凭证缓存和按客户端限流。
+# 各服务与网关使用相同的 JWT_SECRET_KEY 和 CLIENT_STORE_FILE 时令牌通用
+auth = ServiceAuth(app, 'tesseract', json_response)
+client_store = auth.client_store
+token_store = auth.token_store
+credential_cache = auth.credential_cache
+rate_limiter = auth.rate_limiter
+create_token = auth.create_token
+validate_token = auth.validate_token
+requires_auth = auth.requires_auth
 
 # 健康检查端点
 @app.route('/api/v1/health', methods=['GET'])
@@ -387,7 +268,7 @@ def health_check():
       检查OCR API服务的运行状态，包括Tesseract引擎可用性和认证系统状态。
 
       **检查项**：
-      - Tesseract OCR引擎
+      - Tesseract OCR引擎（启动时探测并自检，结果缓存，不启动子进程）
       - 认证系统状态
       - 客户端数量
       - 活跃令牌数
@@ -418,6 +299,12 @@ def health_check():
                 active_tokens:
                   type: integer
                   example: 5
+                token_store:
+                  type: object
+                  description: 令牌存储的记录数、上限、已过期和被淘汰的记录数（当前worker）
+                credential_cache:
+                  type: object
+                  description: 客户端凭证缓存的有效期、条数和命中次数（当前worker）
       503:
         description: 服务异常
         schema:
@@ -434,17 +321,24 @@ def health_check():
               example: "Tesseract初始化失败"
     """
     try:
-        test_image = Image.new('RGB', (100, 50), color='white')
-        pytesseract.image_to_string(test_image, lang='eng')
+        capabilities = tesseract_capabilities.get()
+        if not capabilities['available']:
+            raise Exception(capabilities.get('error') or "Tesseract不可用")
 
         return json_response(
             success=True,
             message="服务运行正常",
             data={
-                'tesseract_version': get_tesseract_version_str(),
+                'tesseract_version': capabilities['version'],
+                'capabilities_refreshed_at': capabilities['refreshed_at'],
                 'auth_enabled': app.config['AUTH_ENABLED'],
                 'total_clients': len(client_store.clients),
-                'active_tokens': len(token_store)
+                'active_tokens': len(token_store),
+                'token_store': token_store.stats(),
+                'credential_cache': credential_cache.stats(),
+                'rate_limit': rate_limiter.stats(),
+                'engine_pool': engine_pool.stats(),
+                'ocr_cache': ocr_cache.stats()
             }
         )
     except Exception as e:
@@ -455,6 +349,89 @@ def health_check():
             status_code=503
         )
 
+# 存活探测
+@app.route('/api/v1/health/live', methods=['GET'])
+def liveness_check():
+    """
+    存活探测
+    ---
+    tags:
+      - 服务信息
+    summary: 进程能处理请求即返回200，不做任何外部调用
+    responses:
+      200:
+        description: 进程存活
+    """
+    return json_response(
+        success=True,
+        message="存活",
+        data=lifecycle.status()
+    )
+
+# 就绪探测
+@app.route('/api/v1/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    就绪探测
+    ---
+    tags:
+      - 服务信息
+    summary: 可以接收新请求时返回200，下线中或检查失败时返回503
+    description: |
+      只读取进程内状态，不启动子进程，可供负载均衡器高频探测。
+      收到SIGTERM或 OCR_DRAIN_FILE 指定的文件存在时进入下线状态，返回503，
+      已接收的请求继续处理完。
+    responses:
+      200:
+        description: 就绪
+      503:
+        description: 未就绪或下线中
+    """
+    ready, checks = lifecycle.readiness()
+    data = dict(lifecycle.status(), checks=checks)
+    if not ready:
+        return json_response(
+            success=False,
+            error="服务未就绪",
+            message="下线中" if lifecycle.draining else "就绪检查未通过",
+            data=data,
+            status_code=503
+        )
+    return json_response(
+        success=True,
+        message="就绪",
+        data=data
+    )
+
+# 重新探测引擎能力信息
+@app.route('/api/v1/capabilities/refresh', methods=['POST'])
+@requires_auth
+def refresh_capabilities():
+    """
+    重新探测引擎能力信息
+    ---
+    tags:
+      - OCR配置管理
+    security:
+      - BearerAuth: []
+    summary: 重新获取Tesseract版本和已安装的语言包
+    description: |
+      版本和语言列表在服务启动时探测一次并缓存，健康检查和语言列表接口只读缓存。
+      安装或删除语言包后调用此接口刷新。多进程部署时只刷新处理该请求的worker。
+    responses:
+      200:
+        description: 刷新完成
+      401:
+        description: 认证失败
+    """
+    capabilities = tesseract_capabilities.refresh()
+    return json_response(
+        success=True,
+        message="引擎能力信息已刷新",
+        data=capabilities,
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
 # 获取访问令牌
 @app.route('/api/v1/auth/token', methods=['POST'])
 def get_access_token():
@@ -497,72 +474,7 @@ def get_access_token():
       401:
         description: 无效的客户端凭证
     """
-    try:
-        client_id = None
-        client_secret = None
-
-        # 首先尝试Basic Auth
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Basic '):
-            try:
-                decoded = base64.b64decode(auth_header[6:]).decode('utf-8')
-                client_id, client_secret = decoded.split(':', 1)
-            except:
-                pass
-
-        # 尝试从JSON体获取
-        if not client_id or not client_secret:
-            if request.is_json:
-                data = request.get_json()
-                client_id = data.get('client_id')
-                client_secret = data.get('client_secret')
-
-        # 尝试表单数据
-        if not client_id or not client_secret:
-            client_id = request.form.get('client_id')
-            client_secret = request.form.get('client_secret')
-
-        if not client_id or not client_secret:
-            return json_response(
-                success=False,
-                error="缺少客户端凭证",
-                message="请提供client_id和client_secret",
-                status_code=400
-            )
-
-        # 验证客户端凭证
-        if not client_store.validate_client(client_id, client_secret):
-            return json_response(
-                success=False,
-                error="无效的客户端凭证",
-                message="请检查client_id和client_secret",
-                status_code=401
-            )
-
-        # 创建访问令牌
-        token = create_token(client_id)
-        expires_at = time.time() + app.config['TOKEN_EXPIRATION_HOURS'] * 3600
-
-        return json_response(
-            success=True,
-            message="令牌生成成功",
-            data={
-                'access_token': token,
-                'token_type': 'Bearer',
-                'expires_in': app.config['TOKEN_EXPIRATION_HOURS'] * 3600,
-                'expires_at': datetime.fromtimestamp(expires_at).isoformat() + 'Z',
-                'client_id': client_id
-            }
-        )
-
-    except Exception as e:
-        logger.error(f"令牌生成失败: {str(e)}")
-        return json_response(
-            success=False,
-            error="服务器内部错误",
-            message=str(e) if app.debug else "请稍后重试",
-            status_code=500
-        )
+    return auth.token_response()
 
 # 语言列表端点
 @app.route('/api/v1/languages', methods=['GET'])
@@ -716,7 +628,7 @@ def list_languages():
           .then(data => console.log(data));
     """
     try:
-        langs = pytesseract.get_languages(config='')
+        langs = tesseract_capabilities.get().get('languages', [])
 
         # 常见语言的中文名称映射
         language_names = {
@@ -867,17 +779,11 @@ def test_ocr():
 
         file_url = data['file_url']
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        response = requests.get(file_url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        image_data = io.BytesIO(response.content)
+        with fetch(file_url, app.config['MAX_CONTENT_LENGTH'], in_memory=True) as download:
+            image_data = io.BytesIO(download.read())
         image = Image.open(image_data)
 
-        text = pytesseract.image_to_string(image, lang='eng')
+        text = engine_pool.recognize(image, lang='eng')['text']
 
         return json_response(
             success=True,
@@ -891,7 +797,7 @@ def test_ocr():
             }
         )
 
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, DownloadTooLarge) as e:
         return json_response(
             success=False,
             error="图片下载失败",
@@ -906,6 +812,330 @@ def test_ocr():
             status_code=500
         )
 
+def preprocess_cache_param(options: dict) -> str:
+    """预处理参数在缓存键中的表示"""
+    return json.dumps(options, sort_keys=True)
+
+# 多页文档（PDF/多帧TIFF）逐页并行识别
+def iter_document_pages(content: bytes, kind: str, lang: str, psm, oem, include_words: bool,
+                        preprocess_options: dict = None, tiling=None, adaptive: dict = None):
+    """
+    逐页并行识别多页文档，按页序产出每页结果
+
+    每页在OCR进程池中光栅化并识别；全部页成功时整份结果写入缓存，
+    之后相同文档直接从缓存产出。
+    """
+    dpi = app.config['PDF_DPI']
+    cache_key = ocr_cache.make_key(
+        content_digest(content),
+        'tesseract',
+        get_tesseract_version_str(),
+        lang=lang,
+        psm=psm,
+        oem=oem,
+        dpi=dpi,
+        preprocess=preprocess_cache_param(preprocess_options),
+        tiling=tiling,
+        adaptive=adaptive_cache_param(adaptive)
+    )
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        for page in cached['pages']:
+            if not include_words:
+                page = {k: v for k, v in page.items() if k != 'words'}
+            yield dict(page, cached=True)
+        return
+
+    futures = []
+    try:
+        pages_total = document_page_count(content, kind)
+        if pages_total > app.config['MAX_PAGES']:
+            raise ValueError(f"文档共{pages_total}页，超过上限{app.config['MAX_PAGES']}页")
+
+        # 文档在内存中拆成逐页数据交给识别进程，不写临时文件
+        pool = get_ocr_process_pool()
+        futures = [
+            pool.submit(
+                recognize_document_page, page, kind, dpi, lang, psm, oem,
+                preprocess_options, tiling, adaptive
+            )
+            for page in split_document(content, kind)
+        ]
+
+        pages = []
+        for index, future in enumerate(futures):
+            try:
+                result = future.result(timeout=app.config['PAGE_TIMEOUT'])
+                text = result['text'].strip()
+                width, height = result['image_size']
+                page = {
+                    'page': index + 1,
+                    'pages_total': pages_total,
+                    'success': True,
+                    'text': text,
+                    'confidence': float(result['confidence']),
+                    'character_count': len(text),
+                    'word_count': len(text.split()),
+                    'width': width,
+                    'height': height,
+                    'words': result['words'],
+                    'preprocess': result['preprocess']
+                }
+                if 'adaptive' in result:
+                    page['adaptive'] = result['adaptive']
+            except BrokenProcessPool:
+                reset_ocr_process_pool(pool)
+                raise Exception("OCR进程异常退出")
+            except Exception as e:
+                page = {
+                    'page': index + 1,
+                    'pages_total': pages_total,
+                    'success': False,
+                    'error': "处理超时" if isinstance(e, FuturesTimeout) else str(e)
+                }
+            pages.append(page)
+            if not include_words:
+                page = {k: v for k, v in page.items() if k != 'words'}
+            yield dict(page, cached=False)
+
+        if all(page['success'] for page in pages):
+            ocr_cache.set(cache_key, {'pages': pages})
+    finally:
+        # 客户端断开或出错时取消尚未开始的页
+        for future in futures:
+            future.cancel()
+
+def ocr_document_response(content: bytes, kind: str, parameters: dict, include_words: bool, stream: bool,
+                          preprocess_options: dict = None, tiling=None, adaptive: dict = None):
+    """多页文档的响应：stream为真时以NDJSON逐页返回，否则汇总为一个JSON"""
+    client_id = getattr(request, 'client_id', 'unknown')
+    pages = iter_document_pages(
+        content, kind, parameters['language'], parameters['psm'], parameters['oem'], include_words,
+        preprocess_options, tiling, adaptive
+    )
+    image_info = {'type': 'document', 'format': kind, 'dpi': app.config['PDF_DPI']}
+
+    if stream:
+        def generate():
+            pages_total = successful = 0
+            cached = False
+            try:
+                for page in pages:
+                    pages_total = page['pages_total']
+                    successful += 1 if page['success'] else 0
+                    cached = page['cached']
+                    yield json.dumps(dict(page, type='page'), ensure_ascii=False) + '\n'
+                yield json.dumps({
+                    'type': 'done',
+                    'pages_total': pages_total,
+                    'successful': successful,
+                    'cached': cached,
+                    'image_info': image_info,
+                    'parameters': parameters,
+                    'client_id': client_id
+                }, ensure_ascii=False) + '\n'
+            except Exception as e:
+                logger.error(f"多页OCR处理错误: {str(e)}")
+                yield json.dumps({'type': 'error', 'error': str(e)}, ensure_ascii=False) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson; charset=utf-8')
+
+    try:
+        results = list(pages)
+    except ValueError as e:
+        return json_response(
+            success=False,
+            error="文档页数过多",
+            message=str(e),
+            status_code=413,
+            client_id=client_id
+        )
+
+    succeeded = [page for page in results if page['success']]
+    text = '\n\n'.join(page['text'] for page in succeeded)
+    confidence = (
+        sum(page['confidence'] for page in succeeded) / len(succeeded) if succeeded else 0
+    )
+    image_info['pages'] = len(results)
+    return json_response(
+        success=True,
+        message=f"OCR识别完成，成功 {len(succeeded)}/{len(results)} 页",
+        data={
+            'ocr_result': {
+                'text': text,
+                'confidence': float(confidence),
+                'character_count': len(text),
+                'word_count': len(text.split()),
+                'pages': results
+            },
+            'image_info': image_info,
+            'cached': bool(results) and results[0]['cached'],
+            'parameters': parameters
+        },
+        client_id=client_id
+    )
+
+def parse_ocr_parameters(data: dict):
+    """
+    解析并校验识别参数，URL接口和上传接口共用
+    :return: (参数, None)；参数无效时返回 (None, 错误响应)
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    psm = data.get('psm', '6')
+    oem = data.get('oem', '3')
+    if not str(psm).isdigit() or not str(oem).isdigit():
+        return None, json_response(
+            success=False,
+            error="参数错误",
+            message="psm和oem必须为整数",
+            status_code=400,
+            client_id=client_id
+        )
+
+    try:
+        preprocess_options = parse_preprocess_options(data.get('preprocess'))
+    except ValueError as e:
+        return None, json_response(
+            success=False,
+            error="预处理参数错误",
+            message=str(e),
+            status_code=400,
+            client_id=client_id
+        )
+
+    tiling = data.get('tiling')
+    if tiling is not None and not isinstance(tiling, bool):
+        return None, json_response(
+            success=False,
+            error="参数错误",
+            message="tiling必须为布尔值",
+            status_code=400,
+            client_id=client_id
+        )
+
+    try:
+        adaptive = parse_adaptive_options(data.get('adaptive'))
+    except ValueError as e:
+        return None, json_response(
+            success=False,
+            error="参数错误",
+            message=str(e),
+            status_code=400,
+            client_id=client_id
+        )
+
+    return {
+        'language': data.get('language', 'eng'),
+        'psm': psm,
+        'oem': oem,
+        'include_words': bool(data.get('include_words', False)),
+        'preprocess': preprocess_options,
+        'tiling': tiling,
+        'adaptive': adaptive,
+        'stream': bool(data.get('stream', False)) or
+        'application/x-ndjson' in request.headers.get('Accept', '')
+    }, None
+
+def ocr_content_response(content: bytes, digest: str, params: dict, source: dict):
+    """
+    识别一个文件的内容并生成响应，URL接口和上传接口共用
+    :param digest: 内容摘要，用作缓存键
+    :param params: parse_ocr_parameters 的结果
+    :param source: 文件来源（file_url 或 filename），写入响应的 parameters
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    lang, psm, oem = params['language'], params['psm'], params['oem']
+    preprocess_options, tiling, adaptive = params['preprocess'], params['tiling'], params['adaptive']
+    parameters = dict(source, language=lang, psm=psm, oem=oem)
+
+    # 多页PDF/TIFF逐页并行识别，可按页流式返回
+    kind = detect_document_kind(content)
+    if kind is not None:
+        return ocr_document_response(
+            content,
+            kind,
+            parameters,
+            params['include_words'],
+            params['stream'],
+            preprocess_options,
+            tiling,
+            adaptive
+        )
+
+    # 命中缓存时直接返回，不解码图片
+    cache_key = ocr_cache.make_key(
+        digest,
+        'tesseract',
+        get_tesseract_version_str(),
+        lang=lang,
+        psm=psm,
+        oem=oem,
+        preprocess=preprocess_cache_param(preprocess_options),
+        tiling=tiling,
+        adaptive=adaptive_cache_param(adaptive)
+    )
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        result, image_info = cached['result'], cached['image_info']
+    else:
+        # 读取图片数据
+        image_data = io.BytesIO(content)
+        image = Image.open(image_data)
+
+        # 验证图片尺寸
+        if max(image.size) > app.config['MAX_IMAGE_SIZE']:
+            return json_response(
+                success=False,
+                error="图片尺寸过大",
+                message=f"图片尺寸超过限制: {image.size}",
+                status_code=400,
+                client_id=client_id
+            )
+
+        # 转换格式
+        if image.mode not in ['1', 'L', 'RGB', 'RGBA']:
+            image = image.convert('RGB')
+
+        # 预处理图片（缩放、纠偏、二值化、裁边）后识别，一次识别同时得到文本、单词框和置信度；
+        # 超大图片分块并发识别；开启adaptive时置信度不足会换用其他psm/预处理重试
+        result = recognize_image(
+            image, lang=lang, psm=psm, oem=oem, preprocess_options=preprocess_options,
+            tiling=tiling, adaptive=adaptive
+        )
+        result.pop('image_size', None)
+        image_info = {
+            'size': image.size,
+            'mode': image.mode,
+            'format': image.format
+        }
+        ocr_cache.set(cache_key, {'result': result, 'image_info': image_info})
+
+    text = result['text']
+
+    ocr_result = {
+        'text': text.strip(),
+        'confidence': float(result['confidence']),
+        'character_count': len(text.strip()),
+        'word_count': len(text.strip().split())
+    }
+    if params['include_words']:
+        ocr_result['words'] = result['words']
+
+    return json_response(
+        success=True,
+        message="OCR识别完成",
+        data={
+            'ocr_result': ocr_result,
+            'image_info': image_info,
+            'preprocess': result.get('preprocess'),
+            'tiling': result.get('tiling'),
+            'adaptive': result.get('adaptive'),
+            'cached': cached is not None,
+            'parameters': parameters
+        },
+        client_id=client_id
+    )
+
 # 主OCR端点
 @app.route('/api/v1/ocr/url', methods=['POST'])
 @requires_auth
@@ -917,6 +1147,9 @@ def ocr_from_url():
       - OCR核心功能
     security:
       - Bearer: []
+    description: |
+      单页图片直接识别。多页PDF和多帧TIFF会按页拆分（PDF按OCR_PDF_DPI光栅化，默认300），
+      各页在进程池中并行识别，结果按页序返回，页数上限由OCR_MAX_PAGES配置（默认200）。
     parameters:
       - in: header
         name: Authorization
@@ -953,6 +1186,50 @@ def ocr_from_url():
               default: "eng"
               example: "eng"
               description: 识别语言代码，支持多语言用+连接
+            psm:
+              type: integer
+              default: 6
+              description: Tesseract页面分割模式
+            oem:
+              type: integer
+              default: 3
+              description: Tesseract引擎模式
+            include_words:
+              type: boolean
+              default: false
+              description: 是否返回单词框和单词置信度
+            preprocess:
+              description: |
+                识别前的图片预处理，可为预设名或参数对象，默认只缩小过大的图片。
+                预设：none（不处理）、default（缩放）、scan（缩放+纠偏+Otsu二值化+裁边）、
+                photo（缩放+纠偏+自适应二值化+裁边）。
+                参数：preset、target_dpi(300)、max_side(3500)、deskew、max_skew_angle(10)、
+                binarize(none/otsu/adaptive)、adaptive_window(31)、adaptive_offset(10)、crop。
+                响应中的 preprocess 字段给出各步骤耗时（毫秒）和处理后尺寸
+              example: "scan"
+            tiling:
+              type: boolean
+              description: |
+                是否把图片切成重叠分块并发识别。不传时按尺寸自动判断：原图最长边超过
+                OCR_TILE_THRESHOLD（默认4000像素）时分块。分块识别的图片预处理时不按
+                max_side 缩小，保留原有分辨率。分块结果按阅读顺序拼接，重叠区的重复
+                单词只保留一次
+            adaptive:
+              description: |
+                置信度自适应重试，默认关闭。为 true 或参数对象时，平均置信度低于阈值
+                会换用其他psm（默认 3/6/4/11）和预处理预设（默认 scan/photo）并发重试，
+                保留置信度最高的结果；所有尝试的识别耗时之和不超过 max_seconds。
+                参数：threshold(60)、max_attempts(4，含第一次)、max_seconds(30)、psm、preprocess。
+                响应中的 adaptive 字段列出每次尝试的参数、置信度和耗时，selected 为选用的尝试；
+                多页文档逐页重试，报告在每页的 adaptive 字段中
+              example: {"threshold": 70, "max_attempts": 3}
+            stream:
+              type: boolean
+              default: false
+              description: |
+                多页PDF/TIFF时以NDJSON（application/x-ndjson）按页流式返回，
+                每行一页（type=page），最后一行为汇总（type=done）；
+                也可通过请求头 Accept: application/x-ndjson 开启
     responses:
       200:
         description: OCR识别成功
@@ -978,6 +1255,25 @@ def ocr_from_url():
                       type: integer
                     word_count:
                       type: integer
+                    words:
+                      type: array
+                      description: 仅当include_words为true时返回
+                      items:
+                        type: object
+                        properties:
+                          text:
+                            type: string
+                          confidence:
+                            type: number
+                          bbox:
+                            type: array
+                            description: "[x1, y1, x2, y2]"
+                            items:
+                              type: integer
+                          block:
+                            type: integer
+                          line:
+                            type: integer
                 image_info:
                   type: object
                 parameters:
@@ -999,6 +1295,8 @@ def ocr_from_url():
         description: 请求参数无效或图片URL错误
       401:
         description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
       500:
         description: 服务器内部错误
     """
@@ -1036,100 +1334,28 @@ def ocr_from_url():
                 client_id=getattr(request, 'client_id', 'unknown')
             )
 
-        # 获取参数
-        lang = data.get('language', 'eng')
-        psm = data.get('psm', '6')
-        oem = data.get('oem', '3')
+        params, error_response = parse_ocr_parameters(data)
+        if error_response is not None:
+            return error_response
 
         logger.info(f"客户端 {getattr(request, 'client_id', 'unknown')} 请求OCR: {file_url}")
 
-        # 下载图片
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'
-        }
-
-        response = requests.get(file_url, headers=headers, timeout=10, stream=True)
-        response.raise_for_status()
-
-        # 检查内容类型
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type:
-            logger.warning(f"URL返回的不是图片: {content_type}")
-
-        # 检查文件大小
-        content_length = response.headers.get('content-length')
-        if content_length and int(content_length) > app.config['MAX_CONTENT_LENGTH']:
+        # 流式下载图片，超过大小上限时立即中断
+        headers = {'Accept': 'image/webp,image/apng,image/*,*/*;q=0.8'}
+        try:
+            with fetch(file_url, app.config['MAX_CONTENT_LENGTH'], headers=headers, in_memory=True) as download:
+                content = download.read()
+                digest = download.digest
+        except DownloadTooLarge as e:
             return json_response(
                 success=False,
                 error="图片太大",
-                message=f"图片大小超过限制: {content_length}字节",
-                status_code=400,
-                client_id=getattr(request, 'client_id', 'unknown')
-            )
-
-        # 读取图片数据
-        image_data = io.BytesIO(response.content)
-        image = Image.open(image_data)
-
-        # 验证图片尺寸
-        if max(image.size) > app.config['MAX_IMAGE_SIZE']:
-            return json_response(
-                success=False,
-                error="图片尺寸过大",
-                message=f"图片尺寸超过限制: {image.size}",
+                message=str(e),
                 status_code=400,
                 client_id=getattr(request, 'client_id', 'unknown')
             )
 
-        # 转换格式
-        if image.mode not in ['1', 'L', 'RGB', 'RGBA']:
-            image = image.convert('RGB')
-
-        # 预处理图片
-        if image.mode != 'L':
-            processed_image = image.convert('L')
-        else:
-            processed_image = image
-
-        # 执行OCR
-        config = f'--psm {psm} --oem {oem}'
-        text = pytesseract.image_to_string(processed_image, lang=lang, config=config)
-
-        # 获取置信度
-        ocr_data = pytesseract.image_to_data(
-            processed_image,
-            lang=lang,
-            config=config,
-            output_type=pytesseract.Output.DATAFRAME
-        )
-
-        confidence = ocr_data['conf'].mean() if not ocr_data.empty else 0
-
-        return json_response(
-            success=True,
-            message="OCR识别完成",
-            data={
-                'ocr_result': {
-                    'text': text.strip(),
-                    'confidence': float(confidence),
-                    'character_count': len(text.strip()),
-                    'word_count': len(text.strip().split())
-                },
-                'image_info': {
-                    'size': image.size,
-                    'mode': image.mode,
-                    'format': image.format
-                },
-                'parameters': {
-                    'file_url': file_url,
-                    'language': lang,
-                    'psm': psm,
-                    'oem': oem
-                }
-            },
-            client_id=getattr(request, 'client_id', 'unknown')
-        )
+        return ocr_content_response(content, digest, params, {'file_url': file_url})
 
     except requests.exceptions.Timeout:
         return json_response(
@@ -1139,6 +1365,14 @@ def ocr_from_url():
             status_code=408,
             client_id=getattr(request, 'client_id', 'unknown')
         )
+    except EnginePoolTimeout as e:
+        return json_response(
+            success=False,
+            error="服务繁忙",
+            message=str(e),
+            status_code=503,
+            client_id=getattr(request, 'client_id', 'unknown')
+        )
     except requests.exceptions.RequestException as e:
         return json_response(
             success=False,
@@ -1157,6 +1391,59 @@ def ocr_from_url():
             client_id=getattr(request, 'client_id', 'unknown')
         )
 
+def recognize_batch_item(content: bytes, digest: str, lang: str, preprocess_options: dict,
+                         deadline: float) -> dict:
+    """识别批量请求中的一个文件（使用默认的psm/oem），URL批量和上传批量共用"""
+    cache_key = ocr_cache.make_key(
+        digest,
+        'tesseract',
+        get_tesseract_version_str(),
+        lang=lang,
+        psm=3,
+        oem=3,
+        preprocess=preprocess_cache_param(preprocess_options)
+    )
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        result = cached['result']
+    else:
+        pool = get_ocr_process_pool()
+        try:
+            future = pool.submit(
+                recognize_image_bytes, content, lang, 3, 3, preprocess_options
+            )
+            result = wait_result(future, deadline)
+        except BrokenProcessPool:
+            reset_ocr_process_pool(pool)
+            raise Exception("OCR进程异常退出")
+        image_size = result.pop('image_size')
+        ocr_cache.set(cache_key, {
+            'result': result,
+            'image_info': {'size': image_size}
+        })
+
+    text = result['text'].strip()
+    return {
+        'success': True,
+        'text': text,
+        'character_count': len(text),
+        'word_count': len(text.split())
+    }
+
+def batch_response(results: list):
+    successful = len([r for r in results if r['success']])
+    return json_response(
+        success=True,
+        message=f"批量处理完成，成功 {successful}/{len(results)}",
+        data={
+            'total': len(results),
+            'successful': successful,
+            'failed': len(results) - successful,
+            'results': results
+        },
+        client_id=getattr(request, 'client_id', 'unknown')
+    )
+
 # 批量OCR端点
 @app.route('/api/v1/ocr/batch', methods=['POST'])
 @requires_auth
@@ -1170,10 +1457,12 @@ def ocr_batch_urls():
       - Bearer: []
     summary: 批量处理多个图片URL
     description: |
-      同时处理最多10个图片URL的OCR识别，支持统一语言设置。
+      并发处理多个图片URL的OCR识别，支持统一语言设置。
+      下载并发执行，识别在有界进程池中并行执行，结果顺序与输入一致。
 
       **限制**：
-      - 单次请求最多10个URL
+      - 单次请求最多10个URL（可通过OCR_BATCH_MAX_ITEMS配置）
+      - 每个URL的处理时间上限为60秒（可通过OCR_BATCH_ITEM_TIMEOUT配置），超时的项单独返回失败
       - 每个URL需要符合图片格式要求
       - 所有图片使用相同的语言设置
     parameters:
@@ -1215,6 +1504,9 @@ def ocr_batch_urls():
               default: "eng"
               example: "chi_sim"
               description: 识别语言代码
+            preprocess:
+              description: 图片预处理，预设名（none/default/scan/photo）或参数对象，所有图片共用
+              example: "scan"
     responses:
       200:
         description: 批量处理完成
@@ -1267,9 +1559,11 @@ def ocr_batch_urls():
         description: |
           - 缺少urls参数
           - urls不是数组
-          - urls超过10个
+          - urls超过数量上限
       401:
         description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
       500:
         description: 服务器内部错误
     """
@@ -1286,60 +1580,360 @@ def ocr_batch_urls():
             )
 
         urls = data['urls']
-        if not isinstance(urls, list) or len(urls) > 10:
+        max_items = app.config['BATCH_MAX_ITEMS']
+        if not isinstance(urls, list) or len(urls) > max_items:
             return json_response(
                 success=False,
                 error="参数错误",
-                message="urls必须为数组且最多10个URL",
+                message=f"urls必须为数组且最多{max_items}个URL",
                 status_code=400,
                 client_id=getattr(request, 'client_id', 'unknown')
             )
 
         lang = data.get('language', 'eng')
-        results = []
-
-        for url in urls:
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
+        try:
+            preprocess_options = parse_preprocess_options(data.get('preprocess'))
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="预处理参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=getattr(request, 'client_id', 'unknown')
+            )
 
-                image_data = io.BytesIO(response.content)
-                image = Image.open(image_data)
+        def process_item(url, deadline):
+            with fetch(
+                url,
+                app.config['MAX_CONTENT_LENGTH'],
+                timeout=remaining_seconds(deadline, app.config['TIMEOUT']),
+                deadline=deadline,
+                in_memory=True
+            ) as download:
+                content = download.read()
+                digest = download.digest
 
-                text = pytesseract.image_to_string(image, lang=lang)
+            return {'url': url, **recognize_batch_item(content, digest, lang, preprocess_options, deadline)}
 
-                results.append({
-                    'url': url,
-                    'success': True,
-                    'text': text.strip(),
-                    'character_count': len(text.strip()),
-                    'word_count': len(text.strip().split())
-                })
-            except Exception as e:
+        results = []
+        item_results = batch_executor.run(
+            urls, process_item, timeout=app.config['BATCH_ITEM_TIMEOUT']
+        )
+        for url, (ok, value) in zip(urls, item_results):
+            if ok:
+                results.append(value)
+            else:
                 results.append({
                     'url': url,
                     'success': False,
-                    'error': str(e)
+                    'error': value
                 })
 
-        successful = len([r for r in results if r['success']])
+        return batch_response(results)
 
+    except Exception as e:
+        logger.error(f"批量OCR处理错误: {str(e)}")
         return json_response(
-            success=True,
-            message=f"批量处理完成，成功 {successful}/{len(urls)}",
-            data={
-                'total': len(urls),
-                'successful': successful,
-                'failed': len(urls) - successful,
-                'results': results
-            },
+            success=False,
+            error="批量处理失败",
+            message=str(e),
+            status_code=500,
             client_id=getattr(request, 'client_id', 'unknown')
         )
 
+# 上传参数中的布尔值和JSON对象（表单/查询参数都是字符串）
+UPLOAD_BOOL_FIELDS = ('include_words', 'tiling', 'stream')
+UPLOAD_JSON_FIELDS = ('preprocess', 'adaptive')
+
+def upload_parameters() -> dict:
+    """读取上传接口的参数：查询参数，multipart请求再合并表单字段"""
+    data = form_parameters(request.args, UPLOAD_BOOL_FIELDS, UPLOAD_JSON_FIELDS)
+    if request.mimetype == 'multipart/form-data':
+        data.update(form_parameters(request.form, UPLOAD_BOOL_FIELDS, UPLOAD_JSON_FIELDS))
+    return data
+
+# 上传文件OCR端点
+@app.route('/api/v1/ocr/upload', methods=['POST'])
+@requires_auth
+def ocr_from_upload():
+    """
+    上传图片/文档进行OCR文字识别
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 直接上传文件识别，省去先上传对象存储再由服务下载的往返
+    description: |
+      两种上传方式：
+      - multipart/form-data：文件放在 file 字段，其余参数作为表单字段
+      - 原始请求体：请求体即文件内容（Content-Type 如 image/png、application/pdf），参数放在查询字符串
+
+      参数与 /api/v1/ocr/url 相同（language、psm、oem、include_words、preprocess、tiling、adaptive、stream），
+      preprocess 可为预设名或JSON字符串，adaptive 可为 true 或JSON字符串。校验、缓存和多页文档处理与URL接口一致，响应格式相同，
+      parameters 中以 filename 代替 file_url。
+    consumes:
+      - multipart/form-data
+      - application/octet-stream
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        description: |
+          Bearer令牌认证头
+
+          **格式**：`Bearer <your_access_token>`
+        default: "Bearer "
+      - in: formData
+        name: file
+        type: file
+        required: false
+        description: 待识别的图片、PDF或TIFF（multipart方式）
+      - in: formData
+        name: language
+        type: string
+        default: "eng"
+        description: 识别语言代码
+      - in: formData
+        name: psm
+        type: string
+        default: "6"
+        description: 页面分割模式
+      - in: formData
+        name: oem
+        type: string
+        default: "3"
+        description: OCR引擎模式
+      - in: formData
+        name: include_words
+        type: boolean
+        default: false
+        description: 是否返回单词框和置信度
+      - in: formData
+        name: preprocess
+        type: string
+        description: 预处理预设名或JSON参数对象
+      - in: formData
+        name: tiling
+        type: boolean
+        description: 是否分块识别，不传时按尺寸自动判断
+      - in: formData
+        name: adaptive
+        type: string
+        description: 置信度自适应重试，true 或JSON参数对象，见 /api/v1/ocr/url
+      - in: formData
+        name: stream
+        type: boolean
+        default: false
+        description: 多页文档时以NDJSON逐页返回
+    responses:
+      200:
+        description: 识别成功，格式同 /api/v1/ocr/url
+      400:
+        description: |
+          - 参数错误
+          - 没有上传文件
+          - 文件超过大小限制
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
+      503:
+        description: 服务繁忙
+      500:
+        description: 服务器内部错误
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    try:
+        try:
+            data = upload_parameters()
+        except RequestEntityTooLarge:
+            return json_response(
+                success=False,
+                error="图片太大",
+                message=f"请求大小超过限制: {app.config['MAX_CONTENT_LENGTH']}字节",
+                status_code=400,
+                client_id=client_id
+            )
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+
+        params, error_response = parse_ocr_parameters(data)
+        if error_response is not None:
+            return error_response
+
+        try:
+            uploads = read_uploads(request, app.config['MAX_CONTENT_LENGTH'], in_memory=True)
+        except DownloadTooLarge as e:
+            return json_response(
+                success=False,
+                error="图片太大",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="缺少文件",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+
+        filename, upload = uploads[0]
+        with upload:
+            content = upload.read()
+            digest = upload.digest
+
+        logger.info(f"客户端 {client_id} 上传OCR: {filename or '请求体'} ({len(content)}字节)")
+        return ocr_content_response(content, digest, params, {'filename': filename})
+
+    except EnginePoolTimeout as e:
+        return json_response(
+            success=False,
+            error="服务繁忙",
+            message=str(e),
+            status_code=503,
+            client_id=client_id
+        )
+    except Exception as e:
+        logger.error(f"OCR处理错误: {str(e)}")
+        return json_response(
+            success=False,
+            error="处理失败",
+            message=str(e) if app.debug else "服务器内部错误",
+            status_code=500,
+            client_id=client_id
+        )
+
+# 批量上传OCR端点
+@app.route('/api/v1/ocr/batch/upload', methods=['POST'])
+@requires_auth
+def batch_ocr_upload():
+    """
+    批量上传图片进行OCR文字识别
+    ---
+    tags:
+      - OCR核心功能
+    security:
+      - Bearer: []
+    summary: 一次上传多张图片识别
+    description: |
+      multipart/form-data 请求，图片放在重复的 files 字段中，最多 OCR_BATCH_MAX_ITEMS 个
+      （默认10）。language 和 preprocess 作为表单字段，对所有图片生效；缓存与
+      /api/v1/ocr/batch 共用。整个请求的大小受 MAX_CONTENT_LENGTH 限制。
+    consumes:
+      - multipart/form-data
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        required: true
+        description: |
+          Bearer令牌认证头
+
+          **格式**：`Bearer <your_access_token>`
+        default: "Bearer "
+      - in: formData
+        name: files
+        type: file
+        required: true
+        description: 待识别的图片（可重复）
+      - in: formData
+        name: language
+        type: string
+        default: "eng"
+        description: 识别语言代码
+      - in: formData
+        name: preprocess
+        type: string
+        description: 预处理预设名或JSON参数对象
+    responses:
+      200:
+        description: 批量处理完成，格式同 /api/v1/ocr/batch，results 中以 filename 代替 url
+      400:
+        description: |
+          - 参数错误
+          - 没有上传文件或文件数超过上限
+      401:
+        description: 认证失败
+      429:
+        description: 超过客户端的请求速率或并发数上限，见 Retry-After 和 X-RateLimit-* 响应头
+      500:
+        description: 服务器内部错误
+    """
+    client_id = getattr(request, 'client_id', 'unknown')
+    try:
+        try:
+            data = upload_parameters()
+            preprocess_options = parse_preprocess_options(data.get('preprocess'))
+        except RequestEntityTooLarge:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=f"请求大小超过限制: {app.config['MAX_CONTENT_LENGTH']}字节",
+                status_code=400,
+                client_id=client_id
+            )
+        except ValueError as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+        lang = data.get('language', 'eng')
+
+        try:
+            uploads = read_uploads(
+                request,
+                app.config['MAX_CONTENT_LENGTH'],
+                field='files',
+                max_files=app.config['BATCH_MAX_ITEMS'],
+                in_memory=True
+            )
+        except (DownloadTooLarge, ValueError) as e:
+            return json_response(
+                success=False,
+                error="参数错误",
+                message=str(e),
+                status_code=400,
+                client_id=client_id
+            )
+
+        def process_upload(item, deadline):
+            filename, upload = item
+            return {
+                'filename': filename,
+                **recognize_batch_item(upload.read(), upload.digest, lang, preprocess_options, deadline)
+            }
+
+        try:
+            item_results = batch_executor.run(
+                uploads, process_upload, timeout=app.config['BATCH_ITEM_TIMEOUT']
+            )
+        finally:
+            for _, upload in uploads:
+                upload.close()
+
+        results = []
+        for (filename, _), (ok, value) in zip(uploads, item_results):
+            results.append(value if ok else {
+                'filename': filename,
+                'success': False,
+                'error': value
+            })
+        return batch_response(results)
+
     except Exception as e:
         logger.error(f"批量OCR处理错误: {str(e)}")
         return json_response(
@@ -1347,7 +1941,7 @@ def ocr_batch_urls():
             error="批量处理失败",
             message=str(e),
             status_code=500,
-            client_id=getattr(request, 'client_id', 'unknown')
+            client_id=client_id
         )
 
 # 首页
@@ -1420,11 +2014,16 @@ def index():
             'authentication_required': app.config['AUTH_ENABLED'],
             'endpoints': {
                 'health': {'path': '/api/v1/health', 'method': 'GET', 'auth': False},
+                'liveness': {'path': '/api/v1/health/live', 'method': 'GET', 'auth': False},
+                'readiness': {'path': '/api/v1/health/ready', 'method': 'GET', 'auth': False},
                 'get_token': {'path': '/api/v1/auth/token', 'method': 'POST', 'auth': False},
                 'languages': {'path': '/api/v1/languages', 'method': 'GET', 'auth': True},
+                'refresh_capabilities': {'path': '/api/v1/capabilities/refresh', 'method': 'POST', 'auth': True},
                 'test_ocr': {'path': '/api/v1/test/ocr', 'method': 'POST', 'auth': False},
                 'ocr': {'path': '/api/v1/ocr/url', 'method': 'POST', 'auth': True},
-                'batch_ocr': {'path': '/api/v1/ocr/batch', 'method': 'POST', 'auth': True}
+                'batch_ocr': {'path': '/api/v1/ocr/batch', 'method': 'POST', 'auth': True},
+                'upload_ocr': {'path': '/api/v1/ocr/upload', 'method': 'POST', 'auth': True},
+                'batch_upload_ocr': {'path': '/api/v1/ocr/batch/upload', 'method': 'POST', 'auth': True}
             },
             'authentication': {
                 'method': 'client_id / client_secret',
@@ -1453,6 +2052,10 @@ def method_not_allowed(error):
     )
 
 if __name__ == '__main__':
+    # 直接运行脚本时，子进程默认会把本脚本作为 __mp_main__ 重新执行一遍；
+    # 识别函数都在 ocr_tesseract_engine 中，去掉脚本路径后子进程不再导入本脚本
+    del sys.modules['__main__'].__file__
+
     # 启动信息
     logger.info("=" * 50)
     logger.info("OCR API 服务启动")
@@ -1460,6 +2063,7 @@ if __name__ == '__main__':
 
     logger.info(f"认证状态: {'启用' if app.config['AUTH_ENABLED'] else '禁用'}")
     logger.info(f"Tesseract版本: {get_tesseract_version_str()}")
+    logger.info(f"Tesseract引擎池: {engine_pool.backend}, 容量 {engine_pool.size}")
     logger.info(f"客户端数量: {len(client_store.clients)}")
 
     default_client = client_store.get_client_info("default_client")
@@ -1470,11 +2074,16 @@ if __name__ == '__main__':
     logger.info("API端点:")
     logger.info("  GET  /              - 首页")
     logger.info("  GET  /api/v1/health - 健康检查")
+    logger.info("  GET  /api/v1/health/live - 存活探测")
+    logger.info("  GET  /api/v1/health/ready - 就绪探测")
     logger.info("  POST /api/v1/auth/token - 获取令牌")
     logger.info("  GET  /api/v1/languages - 语言列表（需认证）")
+    logger.info("  POST /api/v1/capabilities/refresh - 刷新引擎能力信息（需认证）")
     logger.info("  POST /api/v1/test/ocr - 测试OCR（无需认证）")
     logger.info("  POST /api/v1/ocr/url - OCR识别（需认证）")
     logger.info("  POST /api/v1/ocr/batch - 批量OCR（需认证）")
+    logger.info("  POST /api/v1/ocr/upload - 上传文件OCR（需认证）")
+    logger.info("  POST /api/v1/ocr/batch/upload - 批量上传OCR（需认证）")
     logger.info("")
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 5000))
@@ -1483,4 +2092,6 @@ if __name__ == '__main__':
     logger.info(f"OpenAPI规范文件: http://{host}:{port}/api/v1/apispec.json")
     logger.info(f"服务器地址: http://{host}:{port}")
     logger.info(f"调试模式: {debug}")
+    logger.info("生产环境请使用多进程模式: python ocr_serve.py tesseract")
+    lifecycle.install_signal_handler()
     app.run(host=host, port=port, debug=debug, threaded=True)
@@ -0,0 +1,458 @@
+# -*- coding: utf-8 -*-
+"""
+Tesseract 引擎池
+
+每个引擎是一个常驻的 Tesseract API 句柄（tesserocr.PyTessBaseAPI），按
+(lang, psm, oem) 分组复用，traineddata 只在创建句柄时加载一次。一次识别
+同时得到文本、单词框和置信度。
+
+池的总容量默认等于 CPU 核数（环境变量 TESSERACT_POOL_SIZE 可覆盖）。
+某个参数组合没有空闲句柄且池已满时，会回收其他组合中最久未用的空闲句柄；
+全部句柄都在使用中时等待归还。
+
+超大图片由 recognize_page 切成相互重叠的分块，用池中多个句柄并发识别，
+见 ocr_tiling。是否分块按原图尺寸判断，分块识别的图片预处理时不受 max_side
+限制，保留原有分辨率。
+
+recognize_image 可以开启置信度自适应重试：平均置信度低于阈值时换用其他
+psm 和预处理预设重试，保留置信度最高的结果，见 ocr_adaptive。
+
+未安装 tesserocr 时退回 pytesseract：每次识别仍会启动一个 tesseract
+进程，但只调用一次 image_to_data，由单词数据拼出文本。
+"""
+import io
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pytesseract
+from PIL import Image
+
+import ocr_adaptive
+from ocr_preprocess import preprocess, parse_options as parse_preprocess_options
+from ocr_tiling import TILE_WORKERS, should_tile, recognize_tiled
+
+try:
+    import tesserocr
+except ImportError:  # 可选依赖
+    tesserocr = None
+
+try:
+    import pypdfium2 as pdfium  # 可选依赖，用于PDF光栅化
+except ImportError:
+    pdfium = None
+
+logger = logging.getLogger(__name__)
+
+
+class EnginePoolTimeout(Exception):
+    """等待空闲引擎超时"""
+
+
+def _parse_int(value, name: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}必须为整数: {value}")
+
+
+class TesseractEngine:
+    """单个常驻的 Tesseract 句柄，同一时间只能被一个线程使用"""
+
+    def __init__(self, lang: str, psm: int, oem: int):
+        self.key = (lang, psm, oem)
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+        self.broken = False
+        self.uses = 0
+        self.api = None
+        if tesserocr is not None:
+            kwargs = {'lang': lang, 'psm': psm, 'oem': oem}
+            tessdata = os.environ.get('TESSDATA_PREFIX')
+            if tessdata:
+                kwargs['path'] = tessdata
+            self.api = tesserocr.PyTessBaseAPI(**kwargs)
+
+    def recognize(self, image) -> dict:
+        """
+        识别一张图片
+        :return: {'text', 'confidence', 'words': [{'text', 'confidence', 'bbox', 'block', 'line'}]}
+        """
+        self.uses += 1
+        if self.api is None:
+            return self._recognize_pytesseract(image)
+        try:
+            return self._recognize_tesserocr(image)
+        except Exception:
+            # 句柄状态未知，归还时丢弃
+            self.broken = True
+            raise
+
+    def _recognize_tesserocr(self, image) -> dict:
+        api = self.api
+        api.SetImage(image)
+        api.Recognize()
+        text = api.GetUTF8Text()
+
+        words = []
+        level = tesserocr.RIL.WORD
+        iterator = api.GetIterator()
+        block = line = 0
+        if iterator is not None:
+            for item in tesserocr.iterate_level(iterator, level):
+                if item.IsAtBeginningOf(tesserocr.RIL.BLOCK):
+                    block += 1
+                if item.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                word = item.GetUTF8Text(level)
+                if not word or not word.strip():
+                    continue
+                box = item.BoundingBox(level)
+                words.append({
+                    'text': word,
+                    'confidence': float(item.Confidence(level)),
+                    'bbox': list(box) if box else None,
+                    'block': block,
+                    'line': line
+                })
+        api.Clear()
+        return {
+            'text': text,
+            'confidence': _mean_confidence(words),
+            'words': words
+        }
+
+    def _recognize_pytesseract(self, image) -> dict:
+        data = pytesseract.image_to_data(
+            image,
+            lang=self.lang,
+            config=f'--psm {self.psm} --oem {self.oem}',
+            output_type=pytesseract.Output.DICT
+        )
+
+        words = []
+        lines = []
+        last_line_key = None
+        last_par_key = None
+        line_numbers = {}
+        for i, word in enumerate(data['text']):
+            if not word or not word.strip():
+                continue
+            par_key = (data['block_num'][i], data['par_num'][i])
+            line_key = par_key + (data['line_num'][i],)
+            if line_key != last_line_key:
+                if last_par_key is not None and par_key != last_par_key:
+                    lines.append('')
+                lines.append(word)
+                line_numbers[line_key] = len(line_numbers) + 1
+            else:
+                lines[-1] += ' ' + word
+            last_line_key, last_par_key = line_key, par_key
+
+            left, top = data['left'][i], data['top'][i]
+            words.append({
+                'text': word,
+                'confidence': float(data['conf'][i]),
+                'bbox': [left, top, left + data['width'][i], top + data['height'][i]],
+                'block': data['block_num'][i],
+                'line': line_numbers[line_key]
+            })
+
+        return {
+            'text': '\n'.join(lines),
+            'confidence': _mean_confidence(words),
+            'words': words
+        }
+
+    def close(self):
+        if self.api is not None:
+            try:
+                self.api.End()
+            except Exception as e:
+                logger.warning(f"关闭Tesseract句柄失败: {str(e)}")
+            self.api = None
+
+
+def _mean_confidence(words) -> float:
+    confidences = [w['confidence'] for w in words if w['confidence'] >= 0]
+    if not confidences:
+        return 0.0
+    return sum(confidences) / len(confidences)
+
+
+class TesseractEnginePool:
+    """按 (lang, psm, oem) 复用 Tesseract 句柄的引擎池，线程安全"""
+
+    def __init__(self, size: int = None, checkout_timeout: float = None):
+        if size is None:
+            size = int(os.environ.get('TESSERACT_POOL_SIZE', 0)) or os.cpu_count() or 1
+        if checkout_timeout is None:
+            checkout_timeout = float(os.environ.get('TESSERACT_POOL_TIMEOUT', 60))
+        self.size = max(1, size)
+        self.checkout_timeout = checkout_timeout
+        self._cond = threading.Condition()
+        # key -> 空闲句柄列表；OrderedDict 记录最近使用顺序，便于回收
+        self._idle = OrderedDict()
+        self._total = 0
+        self._in_use = 0
+        self._created = 0
+        self._evicted = 0
+
+    @property
+    def backend(self) -> str:
+        return 'tesserocr' if tesserocr is not None else 'pytesseract'
+
+    def checkout(self, lang: str = 'eng', psm=3, oem=3, timeout: float = None) -> TesseractEngine:
+        """取出一个空闲句柄，没有时创建或等待"""
+        key = (lang, _parse_int(psm, 'psm'), _parse_int(oem, 'oem'))
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        victim = None
+        with self._cond:
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    engine = idle.pop()
+                    self._idle.move_to_end(key)
+                    self._in_use += 1
+                    return engine
+                if self._total < self.size:
+                    break
+                victim = self._pop_lru_idle()
+                if victim is not None:
+                    self._evicted += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise EnginePoolTimeout(f"等待Tesseract引擎超时: {key}")
+                self._cond.wait(remaining)
+            if victim is None:
+                self._total += 1
+            self._in_use += 1
+
+        if victim is not None:
+            victim.close()
+        try:
+            engine = TesseractEngine(*key)
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created += 1
+        logger.info(f"创建Tesseract引擎: lang={key[0]}, psm={key[1]}, oem={key[2]}")
+        return engine
+
+    def _pop_lru_idle(self):
+        for key, idle in self._idle.items():
+            if idle:
+                engine = idle.pop(0)
+                if not idle:
+                    del self._idle[key]
+                return engine
+        return None
+
+    def checkin(self, engine: TesseractEngine):
+        """归还句柄；损坏的句柄直接关闭"""
+        with self._cond:
+            self._in_use -= 1
+            if engine.broken:
+                self._total -= 1
+            else:
+                self._idle.setdefault(engine.key, []).append(engine)
+                self._idle.move_to_end(engine.key)
+            self._cond.notify()
+        if engine.broken:
+            engine.close()
+
+    @contextmanager
+    def engine(self, lang: str = 'eng', psm=3, oem=3, timeout: float = None):
+        engine = self.checkout(lang, psm, oem, timeout)
+        try:
+            yield engine
+        finally:
+            self.checkin(engine)
+
+    def recognize(self, image, lang: str = 'eng', psm=3, oem=3) -> dict:
+        """用池中的句柄识别一张图片，一次得到文本、单词框和置信度"""
+        with self.engine(lang, psm, oem) as engine:
+            return engine.recognize(image)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'backend': self.backend,
+                'size': self.size,
+                'engines': self._total,
+                'in_use': self._in_use,
+                'idle': {'+'.join(map(str, key)): len(idle) for key, idle in self._idle.items()},
+                'created': self._created,
+                'evicted': self._evicted
+            }
+
+    def close(self):
+        with self._cond:
+            engines = [engine for idle in self._idle.values() for engine in idle]
+            self._total -= len(engines)
+            self._idle.clear()
+        for engine in engines:
+            engine.close()
+
+
+engine_pool = TesseractEnginePool()
+
+
+def init_worker_process(pool_size: int = 2):
+    """进程池 worker 的初始化函数：worker 同一时间只处理一张图片，只需少量句柄"""
+    engine_pool.size = max(1, pool_size)
+
+
+def recognize_page(image, lang: str = 'eng', psm=3, oem=3, tiling=None) -> dict:
+    """
+    识别一页图片，超大图片分块并发识别
+    :param tiling: True 强制分块，False 禁用，None 按尺寸自动判断
+    """
+    if should_tile(image.size, tiling):
+        return recognize_tiled(
+            image,
+            lambda tile: engine_pool.recognize(tile, lang=lang, psm=psm, oem=oem),
+            workers=min(TILE_WORKERS, engine_pool.size)
+        )
+    return engine_pool.recognize(image, lang=lang, psm=psm, oem=oem)
+
+
+def recognize_image(image, lang: str = 'eng', psm=3, oem=3, preprocess_options: dict = None,
+                    tiling=None, adaptive: dict = None) -> dict:
+    """
+    预处理并识别一张图片，结果中 image_size 为预处理后的尺寸
+    :param tiling: True 强制分块，False 禁用，None 按原图尺寸自动判断
+    :param adaptive: ocr_adaptive.parse_options 的结果；平均置信度低于阈值时换用其他
+                     psm/预处理预设重试，保留置信度最高的结果，重试报告记在 adaptive 中
+    """
+    # 预处理默认把最长边缩到 max_side 以内，先于缩小按原图判断是否分块；
+    # 分块的图片不按 max_side 缩小，否则分块要保留的细节在预处理时已经丢失
+    tiled = should_tile(image.size, tiling)
+
+    def attempt(candidate):
+        options = preprocess_options
+        if candidate['preprocess'] is not None:
+            options = parse_preprocess_options(candidate['preprocess'])
+        if tiled:
+            options = dict(options or parse_preprocess_options(None), max_side=max(image.size))
+        processed, report = preprocess(image, options)
+        result = recognize_page(processed, lang=lang, psm=candidate['psm'], oem=oem, tiling=tiled)
+        result['image_size'] = processed.size
+        result['preprocess'] = report
+        return result
+
+    psm = _parse_int(psm, 'psm')
+    if adaptive is None:
+        return attempt({'psm': psm, 'preprocess': None})
+    result, report = ocr_adaptive.run(attempt, psm, adaptive)
+    result['adaptive'] = report
+    return result
+
+
+def recognize_image_bytes(image_bytes: bytes, lang: str = 'eng', psm=3, oem=3,
+                          preprocess_options: dict = None, tiling=None, adaptive: dict = None) -> dict:
+    """在进程池 worker 中预处理并识别图片数据，返回可序列化的识别结果"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        if image.mode not in ['1', 'L', 'RGB', 'RGBA']:
+            image = image.convert('RGB')
+        size = image.size
+        result = recognize_image(image, lang, psm, oem, preprocess_options, tiling, adaptive)
+    result['image_size'] = size
+    return result
+
+
+def detect_document_kind(content: bytes):
+    """
+    判断是否为多页文档
+    :return: 'pdf'、'tiff'（多帧），单页图片返回 None
+    """
+    if content[:5] == b'%PDF-':
+        return 'pdf'
+    if content[:4] in (b'II*\x00', b'MM\x00*'):
+        with Image.open(io.BytesIO(content)) as image:
+            if getattr(image, 'n_frames', 1) > 1:
+                return 'tiff'
+    return None
+
+
+def document_page_count(content: bytes, kind: str) -> int:
+    if kind == 'pdf':
+        if pdfium is None:
+            raise RuntimeError("未安装pypdfium2，无法处理PDF")
+        pdf = pdfium.PdfDocument(content)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with Image.open(io.BytesIO(content)) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def split_document(content: bytes, kind: str) -> list:
+    """
+    在内存中把多页文档拆成逐页的数据，交给识别进程，不写临时文件
+    PDF 每页为一个单页 PDF（光栅化留在识别进程中），TIFF 每帧重新压缩为单帧 TIFF
+    :return: [页数据 bytes]
+    """
+    pages = []
+    if kind == 'pdf':
+        pdf = pdfium.PdfDocument(content)
+        try:
+            for index in range(len(pdf)):
+                single = pdfium.PdfDocument.new()
+                try:
+                    single.import_pages(pdf, [index])
+                    buffer = io.BytesIO()
+                    single.save(buffer)
+                    pages.append(buffer.getvalue())
+                finally:
+                    single.close()
+        finally:
+            pdf.close()
+        return pages
+    with Image.open(io.BytesIO(content)) as image:
+        for index in range(getattr(image, 'n_frames', 1)):
+            image.seek(index)
+            buffer = io.BytesIO()
+            compression = 'group4' if image.mode == '1' else 'tiff_deflate'
+            image.save(buffer, format='TIFF', compression=compression)
+            pages.append(buffer.getvalue())
+    return pages
+
+
+def render_document_page(page: bytes, kind: str, dpi: int = 300):
+    """把 split_document 拆出的一页转换为图片：PDF按dpi光栅化，TIFF直接解码"""
+    if kind == 'pdf':
+        pdf = pdfium.PdfDocument(page)
+        try:
+            pdf_page = pdf[0]
+            try:
+                bitmap = pdf_page.render(scale=dpi / 72, grayscale=True)
+                return bitmap.to_pil()
+            finally:
+                pdf_page.close()
+        finally:
+            pdf.close()
+    with Image.open(io.BytesIO(page)) as image:
+        image.load()
+        return image.copy()
+
+
+def recognize_document_page(page: bytes, kind: str, dpi: int = 300,
+                            lang: str = 'eng', psm=3, oem=3, preprocess_options: dict = None,
+                            tiling=None, adaptive: dict = None) -> dict:
+    """在进程池 worker 中识别多页文档的一页，光栅化和预处理也在 worker 中完成"""
+    image = render_document_page(page, kind, dpi)
+    if image.mode not in ['1', 'L', 'RGB', 'RGBA']:
+        image = image.convert('RGB')
+    return recognize_image(image, lang, psm, oem, preprocess_options, tiling, adaptive)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+大图分块识别
+
+超大图片整张交给 Tesseract 时，耗时和内存随图片尺寸急剧增长，而且只能用
+一个核。分块模式把页面切成相互重叠的方块，并发识别后再拼回整页：
+
+- 每个分块只保留中心落在其"核心区"内的单词。核心区是分块去掉与相邻分块
+  各一半重叠后的区域，相邻核心区恰好拼满整页，所以重叠区内的单词只会被
+  保留一次；重叠宽度大于最长单词时，被分块边缘截断的单词总会在另一个分块
+  中完整出现
+- 拼接后按行重新排序，得到一份阅读顺序的文本
+- 分块在识别线程中才裁剪，同一时间最多只有 workers 个分块在内存中
+
+环境变量：
+- OCR_TILE_THRESHOLD：原图最长边超过该值（像素）时自动分块，默认 4000；
+  分块的图片预处理时不再按 max_side 缩小
+- OCR_TILE_SIZE：分块边长，默认 2048
+- OCR_TILE_OVERLAP：相邻分块的重叠宽度，默认 200
+- OCR_TILE_WORKERS：每张图片并发识别的分块数，默认 CPU 核数
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TILE_THRESHOLD = int(os.environ.get('OCR_TILE_THRESHOLD', 4000))
+TILE_SIZE = int(os.environ.get('OCR_TILE_SIZE', 2048))
+TILE_OVERLAP = int(os.environ.get('OCR_TILE_OVERLAP', 200))
+TILE_WORKERS = int(os.environ.get('OCR_TILE_WORKERS', 0)) or os.cpu_count() or 1
+
+
+def should_tile(size, tiling=None) -> bool:
+    """
+    :param size: (宽, 高)
+    :param tiling: True 强制分块，False 禁用，None 按 OCR_TILE_THRESHOLD 自动判断
+    """
+    if tiling is False:
+        return False
+    if max(size) <= TILE_SIZE:
+        return False
+    return tiling is True or max(size) > TILE_THRESHOLD
+
+
+def _axis_spans(length: int, tile_size: int, overlap: int):
+    """一个方向上的分块区间 [(start, end, core_start, core_end)]"""
+    if length <= tile_size:
+        return [(0, length, 0, length)]
+    step = tile_size - overlap
+    starts = list(range(0, length - tile_size, step)) + [length - tile_size]
+    spans = []
+    for i, start in enumerate(starts):
+        end = start + tile_size
+        # 核心区边界取在与相邻分块重叠部分的中点
+        core_start = 0 if i == 0 else (start + starts[i - 1] + tile_size) // 2
+        core_end = length if i == len(starts) - 1 else (end + starts[i + 1]) // 2
+        spans.append((start, end, core_start, core_end))
+    return spans
+
+
+def plan_tiles(width: int, height: int, tile_size: int = None, overlap: int = None):
+    """
+    计算分块
+    :return: [{'box': (左, 上, 右, 下), 'core': (左, 上, 右, 下)}]，按行优先排列
+    """
+    tile_size = tile_size or TILE_SIZE
+    overlap = TILE_OVERLAP if overlap is None else overlap
+    overlap = min(max(0, overlap), tile_size // 2)
+    tiles = []
+    for top, bottom, core_top, core_bottom in _axis_spans(height, tile_size, overlap):
+        for left, right, core_left, core_right in _axis_spans(width, tile_size, overlap):
+            tiles.append({
+                'box': (left, top, right, bottom),
+                'core': (core_left, core_top, core_right, core_bottom)
+            })
+    return tiles
+
+
+def _offset_words(words, tile: dict):
+    """把分块内的单词坐标换算到整页，并丢掉中心不在核心区的单词"""
+    left, top = tile['box'][:2]
+    core_left, core_top, core_right, core_bottom = tile['core']
+    kept = []
+    for word in words:
+        if not word.get('bbox'):
+            continue
+        x0, y0, x1, y1 = word['bbox']
+        bbox = [x0 + left, y0 + top, x1 + left, y1 + top]
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        if core_left <= cx < core_right and core_top <= cy < core_bottom:
+            kept.append(dict(word, bbox=bbox))
+    return kept
+
+
+def reading_order(words):
+    """
+    按阅读顺序重排单词并重建文本
+    纵向中心落在当前行范围内的单词归为同一行，行间距明显大于行高时分段
+    :return: (文本, 单词列表)，单词的 block/line 按整页重新编号
+    """
+    if not words:
+        return '', []
+    words = sorted(words, key=lambda w: ((w['bbox'][1] + w['bbox'][3]) / 2, w['bbox'][0]))
+    lines = []
+    for word in words:
+        cy = (word['bbox'][1] + word['bbox'][3]) / 2
+        if lines:
+            line = lines[-1]
+            if line['top'] <= cy <= line['bottom']:
+                line['words'].append(word)
+                line['top'] = min(line['top'], word['bbox'][1])
+                line['bottom'] = max(line['bottom'], word['bbox'][3])
+                continue
+        lines.append({'top': word['bbox'][1], 'bottom': word['bbox'][3], 'words': [word]})
+
+    heights = sorted(line['bottom'] - line['top'] for line in lines)
+    line_height = max(1, heights[len(heights) // 2])
+
+    text_lines = []
+    ordered = []
+    block = 1
+    previous_bottom = None
+    for number, line in enumerate(lines, 1):
+        if previous_bottom is not None and line['top'] - previous_bottom > line_height:
+            block += 1
+            text_lines.append('')
+        previous_bottom = line['bottom']
+        line_words = sorted(line['words'], key=lambda w: w['bbox'][0])
+        text_lines.append(' '.join(w['text'].strip() for w in line_words))
+        for word in line_words:
+            ordered.append(dict(word, block=block, line=number))
+    return '\n'.join(text_lines), ordered
+
+
+def recognize_tiled(image, recognize, tile_size: int = None, overlap: int = None, workers: int = None) -> dict:
+    """
+    分块识别一张大图
+    :param image: PIL 图片
+    :param recognize: recognize(分块图片) -> {'text', 'confidence', 'words'}
+    :return: 与 recognize 相同结构的整页结果，附加 'tiling' 信息
+    """
+    tiles = plan_tiles(image.size[0], image.size[1], tile_size, overlap)
+    workers = max(1, min(workers or TILE_WORKERS, len(tiles)))
+
+    def run(tile):
+        # 在识别线程中才裁剪，限制同时存在的分块数
+        return _offset_words(recognize(image.crop(tile['box']))['words'], tile)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-tile') as executor:
+        tile_words = list(executor.map(run, tiles))
+
+    text, words = reading_order([word for chunk in tile_words for word in chunk])
+    confidences = [w['confidence'] for w in words if w['confidence'] >= 0]
+    logger.info(f"分块识别完成: 尺寸 {image.size}, 分块 {len(tiles)}, 单词 {len(words)}")
+    return {
+        'text': text,
+        'confidence': sum(confidences) / len(confidences) if confidences else 0.0,
+        'words': words,
+        'tiling': {
+            'tiles': len(tiles),
+            'tile_size': tile_size or TILE_SIZE,
+            'overlap': TILE_OVERLAP if overlap is None else overlap,
+            'workers': workers
+        }
+    }
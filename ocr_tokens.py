@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+令牌存储与客户端凭证缓存（两个 OCR 服务共用）
+
+- TokenStore：有上限的令牌记录，按令牌自身的过期时间失效。写入时顺带清理
+  队首已过期的记录，并每隔 OCR_TOKEN_SWEEP_INTERVAL 秒全量清扫一次；达到
+  上限时淘汰最早签发的记录。令牌由 HMAC 签名校验，被淘汰的记录不影响令牌
+  本身的有效性，只是不再参与与存储记录的比对
+- CredentialCache：校验通过的 client_id/密钥 在短时间内免去 PBKDF2 计算。
+  缓存键是进程内随机密钥对 (client_id, 密钥, 存储的哈希) 的 HMAC，内存中不
+  保存明文密钥；客户端密钥更换后存储的哈希改变，旧缓存自然失效。只缓存校验
+  成功的结果，错误密钥每次都走完整的 PBKDF2，不降低暴力破解的成本
+
+两者都只存在于当前进程内，多进程部署时每个 Web worker 各有一份。
+
+环境变量：
+- OCR_TOKEN_STORE_MAX：令牌记录上限，默认 10000
+- OCR_TOKEN_SWEEP_INTERVAL：全量清扫过期令牌的间隔（秒），默认 60
+- OCR_CREDENTIAL_CACHE_TTL：凭证缓存有效期（秒），默认 300，0 表示不缓存
+- OCR_CREDENTIAL_CACHE_MAX：凭证缓存条数上限，默认 1024
+"""
+import os
+import hmac
+import time
+import hashlib
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TokenStore:
+    """令牌 -> 令牌信息（含 expires_at），按签发顺序保存"""
+
+    def __init__(self, max_size: int = None, sweep_interval: float = None):
+        self.max_size = max_size or int(os.environ.get('OCR_TOKEN_STORE_MAX', 10000))
+        self.sweep_interval = sweep_interval or float(os.environ.get('OCR_TOKEN_SWEEP_INTERVAL', 60))
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.expired = 0
+        self.evicted = 0
+
+    def set(self, token: str, info: dict):
+        """保存令牌信息，info['expires_at'] 为过期时间戳（秒）"""
+        with self._lock:
+            now = time.time()
+            self._tokens[token] = info
+            self._tokens.move_to_end(token)
+            self._drop_expired_head(now)
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+                self.evicted += 1
+
+    def get(self, token: str):
+        """
+        :return: 令牌信息，不存在或已过期时返回 None
+        """
+        with self._lock:
+            info = self._tokens.get(token)
+            if info is None:
+                return None
+            if time.time() > info['expires_at']:
+                del self._tokens[token]
+                self.expired += 1
+                return None
+            return info
+
+    def _drop_expired_head(self, now: float):
+        # 有效期相同时签发顺序即过期顺序，队首过期的记录可以直接弹出
+        while self._tokens:
+            token, info = next(iter(self._tokens.items()))
+            if now <= info['expires_at']:
+                break
+            self._tokens.popitem(last=False)
+            self.expired += 1
+
+    def _sweep(self, now: float):
+        expired = [token for token, info in self._tokens.items() if now > info['expires_at']]
+        for token in expired:
+            del self._tokens[token]
+        self.expired += len(expired)
+        self._last_sweep = now
+        if expired:
+            logger.info(f"已清理过期令牌 {len(expired)} 个，剩余 {len(self._tokens)} 个")
+
+    def sweep(self):
+        """立即清扫过期令牌"""
+        with self._lock:
+            self._sweep(time.time())
+
+    def __len__(self) -> int:
+        # 不加锁也不清扫，可能包含尚未清扫的过期记录
+        return len(self._tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return self.get(token) is not None
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._tokens),
+            'max_size': self.max_size,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+class CredentialCache:
+    """校验通过的客户端凭证的短期缓存"""
+
+    def __init__(self, ttl: float = None, max_size: int = None):
+        if ttl is None:
+            ttl = float(os.environ.get('OCR_CREDENTIAL_CACHE_TTL', 300))
+        self.ttl = ttl
+        self.max_size = max_size or int(os.environ.get('OCR_CREDENTIAL_CACHE_MAX', 1024))
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, client_id: str, secret: str, stored_hash: str) -> bytes:
+        message = '\0'.join((client_id, secret, stored_hash)).encode('utf-8')
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def check(self, client_id: str, secret: str, stored_hash: str) -> bool:
+        """凭证在缓存有效期内校验通过过时返回 True"""
+        if self.ttl <= 0:
+            return False
+        key = self._cache_key(client_id, secret, stored_hash)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and time.monotonic() < expires_at:
+                self.hits += 1
+                return True
+            if expires_at is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def add(self, client_id: str, secret: str, stored_hash: str):
+        """记录一次校验通过的凭证"""
+        if self.ttl <= 0:
+            return
+        key = self._cache_key(client_id, secret, stored_hash)
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'ttl': self.ttl,
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
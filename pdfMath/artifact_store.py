@@ -0,0 +1,153 @@
+"""Artifact stores used by the REST API to hand off downloads.
+
+A store publishes a finished job artifact (mono/dual PDF, glossary CSV) and
+returns short-lived download URLs for it. ``LocalArtifactStore`` signs URLs
+that are served back by the API itself, which makes it a drop-in stand-in for
+an object store in tests and single-node deployments. ``S3ArtifactStore``
+uploads to any S3-compatible bucket and returns presigned GET URLs.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """Base class for artifact stores."""
+
+    name = "base"
+
+    def publish(self, path: Path, key: str) -> str:
+        """
+        Make a local artifact available under ``key``.
+        :param path: local file path of the artifact
+        :param key: store key, e.g. ``<job_id>/<file name>``
+        :return: the key to pass to ``presign``
+        """
+        raise NotImplementedError
+
+    def presign(self, key: str, filename: str, expires_in: int) -> str:
+        """
+        Create a time-limited download URL for a published artifact.
+        :param key: key returned by ``publish``
+        :param filename: file name suggested to the client
+        :param expires_in: validity of the URL in seconds
+        :return: absolute URL, or a path relative to the API root
+        """
+        raise NotImplementedError
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Signs URLs for files that stay on local disk.
+
+    The signed token embeds the key and its expiry and is verified by
+    ``resolve``; the API serves the file from ``/v1/artifacts/{token}``.
+    """
+
+    name = "local"
+
+    def __init__(self, base_dir: Path, secret: bytes | None = None):
+        self.base_dir = base_dir.resolve()
+        self.secret = secret or secrets.token_bytes(32)
+
+    def _sign(self, payload: bytes) -> str:
+        digest = hmac.new(self.secret, payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def publish(self, path: Path, key: str) -> str:
+        path = path.resolve()
+        if not path.is_relative_to(self.base_dir):
+            raise ValueError(f"{path} is outside of {self.base_dir}")
+        return path.relative_to(self.base_dir).as_posix()
+
+    def presign(self, key: str, filename: str, expires_in: int) -> str:
+        expires_at = int(time.time()) + expires_in
+        payload = f"{key}:{expires_at}".encode()
+        encoded = base64.urlsafe_b64encode(payload).decode().rstrip("=")
+        return f"/v1/artifacts/{encoded}.{self._sign(payload)}"
+
+    def resolve(self, token: str) -> Path | None:
+        """Return the file path for a valid, unexpired token, else None."""
+        try:
+            encoded, signature = token.rsplit(".", 1)
+            payload = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        except ValueError:
+            return None
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        key, _, expires_at = payload.decode().rpartition(":")
+        if not expires_at.isdigit() or time.time() > int(expires_at):
+            return None
+        path = (self.base_dir / key).resolve()
+        if not path.is_relative_to(self.base_dir):
+            return None
+        return path
+
+
+class S3ArtifactStore(ArtifactStore):
+    """Uploads artifacts to an S3-compatible bucket and presigns GET URLs."""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: str | None = None,
+    ):
+        # boto3 is optional and only needed when this store is configured
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def publish(self, path: Path, key: str) -> str:
+        if self.prefix:
+            key = f"{self.prefix}/{key}"
+        self.client.upload_file(path.as_posix(), self.bucket, key)
+        return key
+
+    def presign(self, key: str, filename: str, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=expires_in,
+        )
+
+
+def get_artifact_store(base_dir: Path) -> ArtifactStore | None:
+    """
+    Build the artifact store selected by ``PDF2ZH_ARTIFACT_STORE``.
+    :param base_dir: root directory of local job outputs
+    :return: configured store, or None to serve files directly
+    """
+    store_type = os.environ.get("PDF2ZH_ARTIFACT_STORE", "").strip().lower()
+    if not store_type:
+        return None
+    if store_type == "local":
+        secret = os.environ.get("PDF2ZH_ARTIFACT_SECRET")
+        return LocalArtifactStore(base_dir, secret.encode() if secret else None)
+    if store_type == "s3":
+        bucket = os.environ.get("PDF2ZH_ARTIFACT_S3_BUCKET")
+        if not bucket:
+            raise ValueError("PDF2ZH_ARTIFACT_S3_BUCKET is required for the s3 store")
+        return S3ArtifactStore(
+            bucket,
+            prefix=os.environ.get("PDF2ZH_ARTIFACT_S3_PREFIX", ""),
+            endpoint_url=os.environ.get("PDF2ZH_ARTIFACT_S3_ENDPOINT") or None,
+        )
+    raise ValueError(f"Unknown artifact store: {store_type}")
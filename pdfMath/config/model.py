@@ -111,6 +111,10 @@ class TranslationSettings(BaseModel):
         default=False,
         description="Disable auto extract glossary",
     )
+    shared_glossary_prepass: bool = Field(
+        default=False,
+        description="Extract recurring terms from all input files in one pre-pass and share the resulting glossary between all files and shards instead of extracting terms in every run",
+    )
     primary_font_family: str | None = Field(
         default=None,
         description="Override primary font family for translated text. Choices: 'serif' for serif fonts, 'sans-serif' for sans-serif fonts, 'script' for script/italic fonts. If not specified, uses automatic font selection based on original text properties.",
@@ -199,6 +203,18 @@ class PDFSettings(BaseModel):
         default=False,
         description="Skip formula offset calculation during processing",
     )
+    shards: int | None = Field(
+        default=None,
+        description="Split the document into this many page ranges and translate them in parallel worker processes",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Reuse unchanged pages from the previous run of the same file in the output directory and only translate changed pages",
+    )
+    incremental_state_dir: str | None = Field(
+        default=None,
+        description="Keep incremental manifests and a copy of the previous outputs in this directory instead of the output directory",
+    )
 
 
 class SettingsModel(BaseModel):
@@ -294,6 +310,18 @@ class SettingsModel(BaseModel):
             self.pdf.skip_clean = True
             self.pdf.disable_rich_text_translate = True
 
+        if self.pdf.incremental and self.pdf.pages:
+            raise ValueError("incremental cannot be combined with pages")
+
+        if self.pdf.incremental and self.pdf.watermark_output_mode.lower() == "both":
+            raise ValueError("incremental does not support watermark output mode 'both'")
+
+        if self.pdf.shards is not None and self.pdf.shards < 1:
+            raise ValueError("shards must be greater than 0")
+
+        if self.pdf.shards and self.pdf.shards > 1 and self.pdf.incremental:
+            raise ValueError("shards cannot be combined with incremental")
+
         if self.pdf.max_pages_per_part and self.pdf.max_pages_per_part < 0:
             raise ValueError("max_pages_per_part must be greater than 0")
 
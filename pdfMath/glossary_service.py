@@ -0,0 +1,316 @@
+"""Process-wide glossary service.
+
+Glossary CSV files are parsed once and kept with an Aho–Corasick matcher over
+their source terms, keyed by file path and target language and invalidated by
+file mtime/size (and content digest when only the mtime moved). The service is
+warmed in the parent process before translation subprocesses are forked, so
+every job and shard reuses the compiled glossaries instead of re-parsing them.
+
+The optional shared-glossary pre-pass scans all input documents for recurring
+terms once, translates them once and hands the result to every file and shard
+as an ordinary glossary, replacing per-run automatic extraction.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import logging
+import re
+import threading
+from collections import Counter
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import pymupdf
+from babeldoc.glossary import Glossary
+
+from pdf2zh_next.config.model import SettingsModel
+from pdf2zh_next.config.translate_engine_model import TRANSLATION_ENGINE_METADATA
+from pdf2zh_next.translator import get_translator
+
+logger = logging.getLogger(__name__)
+
+
+def _fold(text: str) -> tuple[str, list[int]]:
+    """
+    Lowercase ``text`` character by character.
+    Some characters change length when lowercased (``"İ".lower()`` is two
+    characters), so the position in ``text`` of every folded character is
+    returned alongside.
+    """
+    folded = []
+    origin = []
+    for position, char in enumerate(text):
+        lowered = char.lower()
+        folded.append(lowered)
+        origin.extend([position] * len(lowered))
+    return "".join(folded), origin
+
+
+class AhoCorasickMatcher:
+    """Case-insensitive multi-pattern matcher over a fixed set of terms."""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = [term for term in terms if term]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        # Length of every term after folding, matches are found in folded text
+        self._folded_lengths: list[int] = []
+        for index, term in enumerate(self.terms):
+            folded, _ = _fold(term)
+            self._folded_lengths.append(len(folded))
+            self._add(folded, index)
+        self._build()
+
+    def _add(self, term: str, index: int) -> None:
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(index)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def finditer(self, text: str):
+        """Yield ``(start, end, term index)`` in ``text`` for every term occurrence."""
+        folded, origin = _fold(text)
+        state = 0
+        for position, char in enumerate(folded):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._output[state]:
+                folded_end = position + 1
+                folded_start = folded_end - self._folded_lengths[index]
+                # Skip matches that begin or end inside the fold of one character
+                if folded_start > 0 and origin[folded_start - 1] == origin[folded_start]:
+                    continue
+                if folded_end < len(folded) and origin[folded_end] == origin[position]:
+                    continue
+                start, end = origin[folded_start], origin[position] + 1
+                if self._is_word_match(text, start, end):
+                    yield start, end, index
+
+    @staticmethod
+    def _is_word_match(text: str, start: int, end: int) -> bool:
+        # Latin terms must not match inside longer words; CJK has no boundaries
+        if text[start].isascii() and text[start].isalnum():
+            if start > 0 and text[start - 1].isalnum():
+                return False
+        if text[end - 1].isascii() and text[end - 1].isalnum():
+            if end < len(text) and text[end].isalnum():
+                return False
+        return True
+
+    def find(self, text: str) -> set[int]:
+        return {index for _, _, index in self.finditer(text)}
+
+
+@dataclass
+class CompiledGlossary:
+    glossary: Glossary
+    matcher: AhoCorasickMatcher
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class GlossaryService:
+    """Cache of parsed and compiled glossaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: dict[tuple[str, str], CompiledGlossary] = {}
+
+    def load(self, path: Path, lang_out: str) -> CompiledGlossary:
+        """Return the compiled glossary for ``path``, parsing it only when it changed."""
+        key = (path.resolve().as_posix(), lang_out)
+        stat = path.stat()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+                return cached
+        digest = _file_digest(path)
+        if cached and cached.digest == digest:
+            # Touched but not modified
+            cached.mtime_ns, cached.size = stat.st_mtime_ns, stat.st_size
+            return cached
+        logger.info(f"Loading glossary {path}")
+        glossary = Glossary.from_csv(path, target_lang_out=lang_out)
+        compiled = CompiledGlossary(
+            glossary=glossary,
+            matcher=AhoCorasickMatcher(entry.source for entry in glossary.entries),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+        )
+        with self._lock:
+            self._cache[key] = compiled
+        return compiled
+
+    def load_all(self, settings: SettingsModel) -> list[CompiledGlossary]:
+        if not settings.translation.glossaries:
+            return []
+        return [
+            self.load(Path(file.strip()), settings.translation.lang_out)
+            for file in settings.translation.glossaries.split(",")
+            if file.strip()
+        ]
+
+    def get_glossaries(self, settings: SettingsModel) -> list[Glossary] | None:
+        compiled = self.load_all(settings)
+        if not compiled:
+            return None
+        return [item.glossary for item in compiled]
+
+    def warm(self, settings: SettingsModel) -> None:
+        """Parse the configured glossaries so forked subprocesses inherit them."""
+        try:
+            self.load_all(settings)
+        except Exception as e:
+            # Leave the error to be reported by the translation itself
+            logger.debug(f"Failed to warm glossaries: {e}")
+
+    def known_terms(self, settings: SettingsModel, text: str) -> set[str]:
+        """Source terms of the configured glossaries that occur in ``text``."""
+        found = set()
+        for compiled in self.load_all(settings):
+            found.update(compiled.matcher.terms[i] for i in compiled.matcher.find(text))
+        return found
+
+
+glossary_service = GlossaryService()
+
+# Acronyms (e.g. "HTTP", "GPT4") and Title Case phrases of 2-4 words
+_TERM_PATTERN = re.compile(
+    r"\b(?:[A-Z][A-Z0-9]{1,9}s?|[A-Z][a-z]+(?:[ -][A-Z][a-z]+){1,3})\b"
+)
+_STOP_PREFIXES = {"The", "This", "That", "These", "Those", "In", "On", "For", "And", "A", "An"}
+
+
+def _candidate_terms(texts: Iterable[str], min_count: int, max_terms: int) -> list[str]:
+    counter: Counter[str] = Counter()
+    for text in texts:
+        for match in _TERM_PATTERN.finditer(text):
+            term = match.group(0)
+            first_word = term.split(" ", 1)[0]
+            if " " in term and first_word in _STOP_PREFIXES:
+                term = term.split(" ", 1)[1]
+                if " " not in term:
+                    continue
+            counter[term] += 1
+    frequent = [(term, count) for term, count in counter.items() if count >= min_count]
+    # Deterministic order: most frequent first, then alphabetical
+    frequent.sort(key=lambda item: (-item[1], item[0]))
+    return [term for term, _ in frequent[:max_terms]]
+
+
+def _document_texts(files: Iterable[Path]) -> Iterable[str]:
+    for file in files:
+        with pymupdf.open(file) as doc:
+            for page in doc:
+                yield page.get_text()
+
+
+def supports_glossary(settings: SettingsModel) -> bool:
+    for metadata in TRANSLATION_ENGINE_METADATA:
+        if isinstance(settings.translate_engine_settings, metadata.setting_model_type):
+            return metadata.support_llm
+    return False
+
+
+def prepare_shared_glossary(
+    settings: SettingsModel,
+    files: list[Path],
+    min_count: int = 3,
+    max_terms: int = 200,
+) -> SettingsModel:
+    """
+    Run the shared-glossary pre-pass over ``files``.
+    Recurring terms that are not in the configured glossaries are translated
+    once, concurrently within the job's ``qps`` limit, and written to
+    ``shared-glossary.<lang_out>.csv`` in the output directory. The returned
+    settings use that file as an extra glossary and disable per-run automatic
+    extraction, so every file and shard translated with them uses the same
+    terms.
+    :param settings: settings of the job
+    :param files: all PDFs of the job
+    :return: settings to translate the files with
+    """
+    if not supports_glossary(settings):
+        logger.warning(
+            "Shared glossary pre-pass skipped: the translation engine does not support glossaries"
+        )
+        return settings
+    texts = list(_document_texts(files))
+    known = {
+        term.lower()
+        for term in glossary_service.known_terms(settings, "\n".join(texts))
+    }
+    candidates = [
+        term
+        for term in _candidate_terms(texts, min_count, max_terms)
+        if term.lower() not in known
+    ]
+    logger.info(f"Shared glossary pre-pass found {len(candidates)} terms")
+
+    prepared = settings.clone()
+    prepared.translation.shared_glossary_prepass = False
+    prepared.translation.no_auto_extract_glossary = True
+    if not candidates:
+        return prepared
+
+    translator = get_translator(settings)
+    # The translator's rate limiter keeps the requests within qps
+    workers = settings.translation.pool_max_workers or settings.translation.qps
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        targets = list(executor.map(translator.translate, candidates))
+    output_path = (
+        settings.get_output_dir() / f"shared-glossary.{settings.translation.lang_out}.csv"
+    )
+    with output_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["source", "target", "tgt_lng"])
+        for term, target in zip(candidates, targets):
+            target = target.strip()
+            if target:
+                writer.writerow([term, target, settings.translation.lang_out])
+
+    glossaries = [
+        file for file in (settings.translation.glossaries or "").split(",") if file
+    ]
+    glossaries.append(output_path.as_posix())
+    prepared.translation.glossaries = ",".join(glossaries)
+    glossary_service.warm(prepared)
+    return prepared
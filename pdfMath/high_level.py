@@ -1,18 +1,23 @@
 import asyncio
+import contextlib
 import logging
 import logging.handlers
 import multiprocessing
 import multiprocessing.connection
 import multiprocessing.queues
 import queue
+import shutil
 import threading
+import time
 import traceback
+import uuid
 from collections.abc import AsyncGenerator
 from functools import partial
 from logging.handlers import QueueHandler
 from pathlib import Path
 
 from babeldoc.format.pdf.high_level import async_translate as babeldoc_translate
+from babeldoc.format.pdf.translation_config import TranslateResult
 from babeldoc.format.pdf.translation_config import TranslationConfig as BabelDOCConfig
 from babeldoc.format.pdf.translation_config import (
     WatermarkOutputMode as BabelDOCWatermarkMode,
@@ -22,8 +27,19 @@ from babeldoc.main import create_progress_handler
 from rich.logging import RichHandler
 
 from pdf2zh_next.config.model import SettingsModel
+from pdf2zh_next.glossary_service import glossary_service
+from pdf2zh_next.glossary_service import prepare_shared_glossary
+from pdf2zh_next.incremental import document_lock
+from pdf2zh_next.incremental import finish_incremental
+from pdf2zh_next.incremental import partial_settings
+from pdf2zh_next.incremental import plan_incremental
 from pdf2zh_next.translator import get_translator
 from pdf2zh_next.utils import asynchronize
+from pdf2zh_next.utils.outputs import concat_pdfs
+from pdf2zh_next.utils.outputs import merge_glossary_csvs
+from pdf2zh_next.utils.outputs import page_count
+from pdf2zh_next.utils.outputs import pages_to_ranges
+from pdf2zh_next.utils.outputs import splice_pages
 
 
 # Custom exception classes for structured error handling
@@ -157,6 +173,7 @@ def _translate_wrapper(
                     # Send normal progress events as before
                     pipe_progress_send.send(event)
                     if event["type"] == "finish":
+                        config.translator.log_repeat_stats()
                         break
             except Exception as e:
                 # Capture non-babeldoc errors during translation
@@ -404,15 +421,265 @@ async def _translate_in_subprocess(
                 raise cb.error
 
 
-def _get_glossaries(settings: SettingsModel) -> list[Glossary] | None:
-    glossaries = []
-    if not settings.translation.glossaries:
-        return None
-    for file in settings.translation.glossaries.split(","):
-        glossaries.append(
-            Glossary.from_csv(Path(file), target_lang_out=settings.translation.lang_out)
+# Output attributes of babeldoc's TranslateResult that hold one PDF each
+_RESULT_PDF_FIELDS = (
+    "mono_pdf_path",
+    "dual_pdf_path",
+    "no_watermark_mono_pdf_path",
+    "no_watermark_dual_pdf_path",
+)
+
+
+def _selected_pages(settings: SettingsModel, total_pages: int) -> list[int]:
+    """1-based pages selected by ``settings.pdf.pages``, in document order."""
+    ranges = settings.parse_pages()
+    if ranges is None:
+        return list(range(1, total_pages + 1))
+    selected = set()
+    for start, end in ranges:
+        if end == -1 or end > total_pages:
+            end = total_pages
+        selected.update(range(start, end + 1))
+    return sorted(selected)
+
+
+def _plan_shards(settings: SettingsModel, file: Path) -> tuple[int, list[list[int]]]:
+    """Split the selected pages into contiguous, near-equal page ranges.
+
+    Every shard needs at least one request per second and one pool worker of
+    the configured totals, so there are never more shards than qps (or
+    pool_max_workers).
+    """
+    total_pages = page_count(file)
+    pages = _selected_pages(settings, total_pages)
+    if not pages:
+        raise ValueError(f"No pages selected in {file}")
+    shard_count = min(settings.pdf.shards, len(pages), settings.translation.qps)
+    if settings.translation.pool_max_workers:
+        shard_count = min(shard_count, settings.translation.pool_max_workers)
+    if shard_count < settings.pdf.shards:
+        logger.info(f"Using {shard_count} of {settings.pdf.shards} shards")
+    size, extra = divmod(len(pages), shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(pages[start:end])
+        start = end
+    return total_pages, shards
+
+
+def _split_evenly(total: int, index: int, count: int) -> int:
+    """Share of ``total`` for part ``index`` of ``count``; the shares sum to ``total``."""
+    size, extra = divmod(total, count)
+    return size + (1 if index < extra else 0)
+
+
+def _shard_settings(
+    settings: SettingsModel,
+    pages: list[int],
+    output_dir: Path,
+    shard_index: int,
+    shard_count: int,
+) -> SettingsModel:
+    shard = settings.clone()
+    shard.pdf.shards = None
+    shard.pdf.pages = pages_to_ranges(pages)
+    shard.pdf.only_include_translated_page = True
+    shard.translation.output = output_dir.as_posix()
+    # Shards share the translation service, so they share its rate limit too
+    shard.translation.qps = _split_evenly(
+        settings.translation.qps, shard_index, shard_count
+    )
+    if settings.translation.pool_max_workers:
+        shard.translation.pool_max_workers = _split_evenly(
+            settings.translation.pool_max_workers, shard_index, shard_count
+        )
+    return shard
+
+
+class _ShardProgress:
+    """Aggregate babeldoc progress events of several shards into one stream."""
+
+    def __init__(self, shard_weights: list[float]):
+        self.weights = shard_weights
+        self.overall = [0.0] * len(shard_weights)
+        # stage -> shard index -> (current, total)
+        self.stages: dict[str, dict[int, tuple[int, int]]] = {}
+        self.ended: dict[str, set[int]] = {}
+
+    def update(self, shard_index: int, event: dict) -> dict | None:
+        stage = event.get("stage")
+        if event.get("overall_progress") is not None:
+            self.overall[shard_index] = event["overall_progress"]
+        per_shard = self.stages.setdefault(stage, {})
+        first_start = event["type"] == "progress_start" and not per_shard
+        per_shard[shard_index] = (
+            event.get("stage_current", 0) or 0,
+            event.get("stage_total", 0) or 0,
+        )
+        if event["type"] == "progress_start" and not first_start:
+            event_type = "progress_update"
+        elif event["type"] == "progress_end":
+            ended = self.ended.setdefault(stage, set())
+            ended.add(shard_index)
+            event_type = (
+                "progress_end" if len(ended) == len(self.weights) else "progress_update"
+            )
+        else:
+            event_type = event["type"]
+        return {
+            **event,
+            "type": event_type,
+            "overall_progress": sum(
+                p * w for p, w in zip(self.overall, self.weights, strict=True)
+            ),
+            "stage_current": sum(current for current, _ in per_shard.values()),
+            "stage_total": sum(total for _, total in per_shard.values()),
+            "part_index": shard_index + 1,
+            "total_parts": len(self.weights),
+        }
+
+
+def _merge_shard_results(
+    settings: SettingsModel,
+    file: Path,
+    total_pages: int,
+    shards: list[list[int]],
+    results: list[TranslateResult],
+    start_time: float,
+) -> TranslateResult:
+    """Merge shard outputs, in shard order, into the output directory."""
+    output_dir = settings.get_output_dir()
+    merged = {}
+    dual_per_page = 2 if settings.pdf.use_alternating_pages_dual else 1
+    keep_untranslated = bool(settings.pdf.pages) and not (
+        settings.pdf.only_include_translated_page
+    )
+    for field_name in _RESULT_PDF_FIELDS:
+        paths = [getattr(result, field_name, None) for result in results]
+        if not all(paths):
+            merged[field_name] = None
+            continue
+        paths = [Path(path) for path in paths]
+        final_path = output_dir / paths[0].name
+        if keep_untranslated:
+            per_page = dual_per_page if "dual" in field_name else 1
+            translated = {}
+            for shard_path, pages in zip(paths, shards, strict=True):
+                for index, page in enumerate(pages):
+                    translated[page] = (shard_path, index)
+            sources = []
+            for page in range(1, total_pages + 1):
+                if page in translated:
+                    shard_path, index = translated[page]
+                    sources.extend(
+                        (shard_path, index * per_page + offset)
+                        for offset in range(per_page)
+                    )
+                else:
+                    sources.extend((file, page - 1) for _ in range(per_page))
+            splice_pages(final_path, sources)
+        else:
+            concat_pdfs(final_path, paths)
+        merged[field_name] = final_path
+
+    glossary_path = None
+    glossaries = [
+        Path(result.auto_extracted_glossary_path)
+        for result in results
+        if getattr(result, "auto_extracted_glossary_path", None)
+    ]
+    if glossaries:
+        glossary_path = output_dir / glossaries[0].name
+        merge_glossary_csvs(glossary_path, glossaries)
+
+    final = TranslateResult(
+        merged["mono_pdf_path"], merged["dual_pdf_path"], glossary_path
+    )
+    for field_name, path in merged.items():
+        setattr(final, field_name, path)
+    final.auto_extracted_glossary_path = glossary_path
+    final.original_pdf_path = file.as_posix()
+    final.total_seconds = time.time() - start_time
+    return final
+
+
+async def _translate_sharded(settings: SettingsModel, file: Path):
+    """
+    Translate page-range shards of ``file`` in parallel subprocesses.
+    Yields aggregated progress events and a single finish event whose result
+    points at the merged outputs.
+    """
+    start_time = time.time()
+    total_pages, shards = _plan_shards(settings, file)
+    work_dir = settings.get_output_dir() / f".shards-{uuid.uuid4().hex[:8]}"
+    logger.info(
+        f"translate {len(shards)} shards in parallel: "
+        + ", ".join(pages_to_ranges(pages) for pages in shards)
+    )
+    selected = sum(len(pages) for pages in shards)
+    progress = _ShardProgress([len(pages) / selected for pages in shards])
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def run_shard(index: int, pages: list[int]):
+        shard_dir = work_dir / f"shard-{index:03d}"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        shard_settings = _shard_settings(
+            settings, pages, shard_dir, index, len(shards)
+        )
+        try:
+            async with contextlib.aclosing(
+                _translate_in_subprocess(shard_settings, file)
+            ) as shard_events:
+                async for event in shard_events:
+                    await events.put((index, event))
+                    if event["type"] == "finish":
+                        return
+            raise IPCError(f"Shard {index} ended without a result")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await events.put((index, e))
+
+    tasks = [
+        asyncio.create_task(run_shard(index, pages))
+        for index, pages in enumerate(shards)
+    ]
+    results: list[TranslateResult | None] = [None] * len(shards)
+    try:
+        while any(result is None for result in results):
+            index, event = await events.get()
+            if isinstance(event, Exception):
+                raise event
+            if event["type"] == "finish":
+                results[index] = event["translate_result"]
+            elif event["type"] == "error":
+                raise BabeldocError(
+                    f"Shard {index} failed: {event.get('error')}",
+                    original_error=event.get("error"),
+                )
+            elif event["type"].startswith("progress_"):
+                yield progress.update(index, event)
+        result = await asyncio.to_thread(
+            _merge_shard_results,
+            settings,
+            file,
+            total_pages,
+            shards,
+            results,
+            start_time,
         )
-    return glossaries
+        yield {"type": "finish", "translate_result": result}
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _get_glossaries(settings: SettingsModel) -> list[Glossary] | None:
+    return glossary_service.get_glossaries(settings)
 
 
 def create_babeldoc_config(settings: SettingsModel, file: Path) -> BabelDOCConfig:
@@ -514,22 +781,56 @@ async def do_translate_async_stream(
     if not file.exists():
         raise FileNotFoundError(f"file {file} not found")
 
-    # 开始翻译
-    translate_func = partial(_translate_in_subprocess, settings, file)
-
-    if settings.basic.debug:
-        babeldoc_config = create_babeldoc_config(settings, file)
-        logger.debug("debug mode, translate in main process")
-        translate_func = partial(babeldoc_translate, translation_config=babeldoc_config)
-    else:
-        logger.info("translate in subprocess")
+    if settings.translation.shared_glossary_prepass:
+        settings = await asyncio.to_thread(prepare_shared_glossary, settings, [file])
+    # Parse glossaries once here so forked translation subprocesses reuse them
+    glossary_service.warm(settings)
 
+    incremental_plan = None
+    incremental_lock = None
+    run_settings = settings
     try:
+        if settings.pdf.incremental:
+            incremental_lock = document_lock(settings, file)
+            if not incremental_lock.try_acquire():
+                logger.info(f"Waiting for another incremental run of {file.name}")
+                while not incremental_lock.try_acquire():
+                    await asyncio.sleep(1)
+            incremental_plan = await asyncio.to_thread(plan_incremental, settings, file)
+            if not incremental_plan.is_full_run:
+                if not incremental_plan.changed_pages:
+                    logger.info("No page changed since the previous run")
+                    result = await asyncio.to_thread(
+                        finish_incremental, incremental_plan, None
+                    )
+                    yield {"type": "finish", "translate_result": result}
+                    return
+                run_settings = partial_settings(settings, incremental_plan)
+
+        # 开始翻译
+        translate_func = partial(_translate_in_subprocess, run_settings, file)
+
+        if settings.pdf.shards and settings.pdf.shards > 1 and not settings.basic.debug:
+            logger.info("translate in sharded subprocesses")
+            translate_func = partial(_translate_sharded, run_settings, file)
+        elif settings.basic.debug:
+            babeldoc_config = create_babeldoc_config(run_settings, file)
+            logger.debug("debug mode, translate in main process")
+            translate_func = partial(babeldoc_translate, translation_config=babeldoc_config)
+        else:
+            logger.info("translate in subprocess")
+
         async for event in translate_func():
+            if event["type"] == "finish" and incremental_plan is not None:
+                event["translate_result"] = await asyncio.to_thread(
+                    finish_incremental, incremental_plan, event["translate_result"]
+                )
             yield event
             if settings.basic.debug:
                 logger.debug(event)
             if event["type"] == "finish":
+                if settings.basic.debug:
+                    babeldoc_config.translator.log_repeat_stats()
                 break
     except TranslationError as e:
         # Log and re-raise structured errors
@@ -549,6 +850,11 @@ async def do_translate_async_stream(
         }
         yield error_event
         raise  # Re-raise the exception so that the caller can handle it if needed
+    finally:
+        if incremental_plan is not None and incremental_plan.work_dir is not None:
+            shutil.rmtree(incremental_plan.work_dir, ignore_errors=True)
+        if incremental_lock is not None:
+            incremental_lock.release()
 
 
 async def do_translate_file_async(
@@ -570,6 +876,13 @@ async def do_translate_file_async(
     assert len(input_files) >= 1, "At least one input file is required"
     settings.basic.input_files = set()
 
+    if settings.translation.shared_glossary_prepass:
+        # One pre-pass over all files so every file uses the same glossary
+        settings.validate_settings()
+        settings = await asyncio.to_thread(
+            prepare_shared_glossary, settings, [Path(file) for file in sorted(input_files)]
+        )
+
     error_count = 0
 
     for file in input_files:
@@ -1,18 +1,26 @@
 from __future__ import annotations
 
 import asyncio
+import gzip
+import hashlib
 import json
 import logging
+import os
+import re
 import shutil
 import tempfile
+import threading
 import uuid
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+import anyio
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
 from pydantic import BaseModel
 
+from pdf2zh_next.artifact_store import LocalArtifactStore, get_artifact_store
 from pdf2zh_next.config import ConfigManager
 from pdf2zh_next.config.cli_env_model import CLIEnvSettingsModel
 from pdf2zh_next.config.model import SettingsModel
@@ -42,6 +50,196 @@ _jobs: dict[str, JobState] = {}
 _job_tasks: dict[str, asyncio.Task] = {}
 _base_output = Path("pdf2zh_jobs").resolve()
 _base_output.mkdir(parents=True, exist_ok=True)
+# Incremental manifests and previous outputs, one directory per document
+_documents_dir = _base_output / "documents"
+
+# Download handling
+_artifact_store = get_artifact_store(_base_output)
+_artifact_url_ttl = int(os.environ.get("PDF2ZH_ARTIFACT_URL_TTL", 900))
+_precompress_glossary = os.environ.get("PDF2ZH_PRECOMPRESS_GLOSSARY", "true").lower() == "true"
+_cache_control = "private, max-age=86400, immutable"
+# (job_id, kind) -> key returned by the artifact store
+_artifact_keys: dict[tuple[str, str], str] = {}
+# path -> (mtime_ns, size, strong etag), least recently used first
+_etag_cache: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+_etag_cache_size = int(os.environ.get("PDF2ZH_ETAG_CACHE_SIZE", 4096))
+_etag_cache_lock = threading.Lock()  # ETags are computed in worker threads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _FileRangeResponse(Response):
+    """Serve one byte range of a file, zero-copy when the server supports it."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: Path, start: int, end: int, headers: dict[str, str], media_type: str):
+        # Like FileResponse, skip Response.__init__ so no empty body is rendered
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = 206
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with self.path.open("rb") as f:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": self.start,
+                        "count": remaining,
+                        "more_body": False,
+                    }
+                )
+            return
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank underneath us; terminate the body instead of hanging
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _compute_etag(path: Path) -> str:
+    """Strong ETag from the SHA-256 of the file content, cached by mtime/size."""
+    stat = path.stat()
+    key = path.as_posix()
+    with _etag_cache_lock:
+        cached = _etag_cache.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            _etag_cache.move_to_end(key)
+            return cached[2]
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()[:32]}"'
+    with _etag_cache_lock:
+        _etag_cache[key] = (stat.st_mtime_ns, stat.st_size, etag)
+        _etag_cache.move_to_end(key)
+        while len(_etag_cache) > _etag_cache_size:
+            _etag_cache.popitem(last=False)
+    return etag
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single ``bytes=`` range.
+    Returns None when the header should be ignored (multi-range, unknown unit or
+    syntactically invalid, e.g. ``bytes=5-3``), raises HTTPException(416) when a
+    valid range cannot be satisfied (e.g. ``bytes=-0`` or a start past the end).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+            if start < 0 or (end_str and end < start):
+                return None
+        else:
+            # Suffix range: the last N bytes
+            length = int(end_str)
+            if length < 0:
+                return None
+            start = max(size - length, 0) if length else size
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def _precompressed_variants(path: Path) -> dict[str, Path]:
+    return {
+        "zstd": path.with_name(path.name + ".zst"),
+        "gzip": path.with_name(path.name + ".gz"),
+    }
+
+
+def _write_precompressed(path: Path) -> None:
+    """Write gzip (and zstd when available) variants next to ``path``."""
+    variants = _precompressed_variants(path)
+    data = path.read_bytes()
+    # mtime=0 keeps the gzip output, and therefore its ETag, deterministic
+    variants["gzip"].write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if zstandard is not None:
+        variants["zstd"].write_bytes(zstandard.ZstdCompressor(level=19).compress(data))
+
+
+def _negotiate_encoding(request: Request, path: Path) -> tuple[Path, str | None]:
+    """Pick a precompressed variant accepted by the client, if one exists."""
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    for coding, variant in _precompressed_variants(path).items():
+        if accepted.get(coding, 0) > 0 and variant.exists():
+            return variant, coding
+    return path, None
+
+
+def _finalize_artifacts(job_id: str, state: JobState) -> None:
+    """Precompress, hash and publish the outputs of a finished job."""
+    artifacts = {
+        "mono": state.mono_pdf_path,
+        "dual": state.dual_pdf_path,
+        "glossary": state.glossary_path,
+    }
+    for kind, path_str in artifacts.items():
+        if not path_str:
+            continue
+        path = Path(path_str)
+        try:
+            if kind == "glossary" and _precompress_glossary:
+                _write_precompressed(path)
+            _compute_etag(path)
+            if _artifact_store is not None:
+                key = _artifact_store.publish(path, f"{job_id}/{path.name}")
+                _artifact_keys[(job_id, kind)] = key
+        except Exception:
+            logger.exception(f"Failed to finalize {kind} artifact of job {job_id}")
 
 
 async def _build_settings(tmp_pdf_path: Path, data: dict[str, Any] | None) -> SettingsModel:
@@ -66,9 +264,16 @@ async def _build_settings(tmp_pdf_path: Path, data: dict[str, Any] | None) -> Se
                 flat_data[root][child] = value
             else:
                 flat_data[key] = value
+        merged = base_cli.model_dump(mode="json")
+        for key, value in flat_data.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                # Dotted keys only override their own field of the section
+                merged[key] = {**merged[key], **value}
+            else:
+                merged[key] = value
         try:
             # Merge dict into model by creating new instance
-            base_cli = CLIEnvSettingsModel(**{**base_cli.model_dump(mode="json"), **flat_data})
+            base_cli = CLIEnvSettingsModel(**merged)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid parameters: {e}") from e
     settings = base_cli.to_settings_model()
@@ -84,6 +289,13 @@ async def _build_settings(tmp_pdf_path: Path, data: dict[str, Any] | None) -> Se
     return settings
 
 
+def _document_state_dir(document_id: str) -> Path:
+    """Stable directory for the incremental state of one document."""
+    readable = re.sub(r"[^A-Za-z0-9._-]+", "_", document_id).strip("._")[:64]
+    digest = hashlib.sha256(document_id.encode("utf-8")).hexdigest()[:12]
+    return _documents_dir / f"{readable}-{digest}" if readable else _documents_dir / digest
+
+
 async def _run_job(job_id: str, settings: SettingsModel, input_pdf_path: Path) -> None:
     state = _jobs[job_id]
     state.state = "PROGRESS"
@@ -115,6 +327,7 @@ async def _run_job(job_id: str, settings: SettingsModel, input_pdf_path: Path) -
         state.mono_pdf_path = mono_path.as_posix() if mono_path and mono_path.exists() else None
         state.dual_pdf_path = dual_path.as_posix() if dual_path and dual_path.exists() else None
         state.glossary_path = glossary_path.as_posix() if glossary_path and glossary_path.exists() else None
+        await asyncio.to_thread(_finalize_artifacts, job_id, state)
         _jobs[job_id] = state
     except asyncio.CancelledError:
         state.state = "CANCELLED"
@@ -135,12 +348,18 @@ async def _run_job(job_id: str, settings: SettingsModel, input_pdf_path: Path) -
 async def submit_translate(
     file: UploadFile = File(...),
     data: str | None = Form(default=None, description="JSON string of parameters"),
+    incremental: bool = Form(default=False, description="Only translate pages changed since the previous upload"),
+    document_id: str | None = Form(default=None, description="Identifies re-uploads of the same document"),
 ):
     """
     Submit a translation job.
     - file: PDF file to translate (multipart/form-data)
     - data: JSON string for parameters (optional). Examples:
       {"translation.lang_in":"en","translation.lang_out":"zh","google":true, "google_settings.api_key":"..."}
+    - incremental: reuse the unchanged pages of the previous upload of the same
+      document (same as "pdf.incremental" in data)
+    - document_id: key of the document across uploads, required for incremental
+      jobs so that different callers never share state through a file name
     """
     if file.content_type not in ("application/pdf", "application/octet-stream"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
@@ -156,8 +375,15 @@ async def submit_translate(
             parsed = json.loads(data)
         except json.JSONDecodeError as e:
             raise HTTPException(status_code=400, detail=f"Invalid data JSON: {e}") from e
+    if incremental:
+        parsed = {**(parsed or {}), "pdf.incremental": True}
     # Build settings
     settings = await _build_settings(tmp_pdf_path, parsed)
+    if settings.pdf.incremental and not document_id:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise HTTPException(
+            status_code=400, detail="document_id is required for incremental translation"
+        )
     # Create job
     job_id = str(uuid.uuid4())
     # Move input into job dir (named by job id)
@@ -168,6 +394,9 @@ async def submit_translate(
     # Update input file path in settings
     settings.basic.input_files = {job_pdf_path.as_posix()}
     settings.translation.output = job_dir.as_posix()
+    if settings.pdf.incremental:
+        # Every job writes into its own directory, keep the manifest per document
+        settings.pdf.incremental_state_dir = _document_state_dir(document_id).as_posix()
     _jobs[job_id] = JobState(id=job_id, state="PENDING")
     # Launch background task
     task = asyncio.create_task(_run_job(job_id, settings, job_pdf_path))
@@ -201,43 +430,103 @@ async def cancel_job(job_id: str):
     return JSONResponse({"ok": True})
 
 
-@app.get("/v1/translate/{job_id}/mono")
-async def download_mono(job_id: str):
+async def _serve_file(
+    request: Request,
+    path: Path,
+    media_type: str,
+    encoding: str | None = None,
+    filename: str | None = None,
+) -> Response:
+    """Serve a file with a strong ETag, conditional GET and single-range support."""
+    etag = await asyncio.to_thread(_compute_etag, path)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": _cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if media_type.startswith("text/"):
+        headers["Vary"] = "Accept-Encoding"
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = path.stat().st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return _FileRangeResponse(path, start, end, headers, media_type)
+    # FileResponse uses the ASGI pathsend extension for zero-copy when available
+    return FileResponse(path, media_type=media_type, filename=filename or path.name, headers=headers)
+
+
+async def _download(request: Request, job_id: str, kind: str, media_type: str, redirect: bool) -> Response:
     state = _jobs.get(job_id)
     if not state:
         raise HTTPException(status_code=404, detail="Job not found")
-    if state.state != "SUCCESS" or not state.mono_pdf_path:
-        raise HTTPException(status_code=409, detail="Mono output not ready")
-    path = Path(state.mono_pdf_path)
+    path_str = {
+        "mono": state.mono_pdf_path,
+        "dual": state.dual_pdf_path,
+        "glossary": state.glossary_path,
+    }[kind]
+    if state.state != "SUCCESS" or not path_str:
+        raise HTTPException(status_code=409, detail=f"{kind.capitalize()} output not ready")
+    path = Path(path_str)
     if not path.exists():
         raise HTTPException(status_code=410, detail="File not found")
-    return FileResponse(path, media_type="application/pdf", filename=path.name)
+
+    key = _artifact_keys.get((job_id, kind))
+    if redirect and key is not None:
+        # Conditional requests are still answered locally to save the round trip
+        etag = await asyncio.to_thread(_compute_etag, path)
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _cache_control})
+        url = await asyncio.to_thread(_artifact_store.presign, key, path.name, _artifact_url_ttl)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+
+    filename = path.name
+    encoding = None
+    if kind == "glossary":
+        path, encoding = _negotiate_encoding(request, path)
+    return await _serve_file(request, path, media_type, encoding, filename)
+
+
+@app.get("/v1/translate/{job_id}/mono")
+async def download_mono(request: Request, job_id: str, redirect: bool = True):
+    return await _download(request, job_id, "mono", "application/pdf", redirect)
 
 
 @app.get("/v1/translate/{job_id}/dual")
-async def download_dual(job_id: str):
-    state = _jobs.get(job_id)
-    if not state:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if state.state != "SUCCESS" or not state.dual_pdf_path:
-        raise HTTPException(status_code=409, detail="Dual output not ready")
-    path = Path(state.dual_pdf_path)
-    if not path.exists():
-        raise HTTPException(status_code=410, detail="File not found")
-    return FileResponse(path, media_type="application/pdf", filename=path.name)
+async def download_dual(request: Request, job_id: str, redirect: bool = True):
+    return await _download(request, job_id, "dual", "application/pdf", redirect)
 
 
 @app.get("/v1/translate/{job_id}/glossary")
-async def download_glossary(job_id: str):
-    state = _jobs.get(job_id)
-    if not state:
-        raise HTTPException(status_code=404, detail="Job not found")
-    if state.state != "SUCCESS" or not state.glossary_path:
-        raise HTTPException(status_code=409, detail="Glossary output not ready")
-    path = Path(state.glossary_path)
+async def download_glossary(request: Request, job_id: str, redirect: bool = True):
+    return await _download(request, job_id, "glossary", "text/csv", redirect)
+
+
+@app.get("/v1/artifacts/{token}")
+async def download_artifact(request: Request, token: str):
+    """Serve artifacts handed out by the local artifact store."""
+    if not isinstance(_artifact_store, LocalArtifactStore):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = _artifact_store.resolve(token)
+    if path is None:
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
     if not path.exists():
         raise HTTPException(status_code=410, detail="File not found")
-    return FileResponse(path, media_type="text/csv", filename=path.name)
+    filename = path.name
+    media_type = "text/csv" if path.suffix == ".csv" else "application/pdf"
+    encoding = None
+    if media_type == "text/csv":
+        path, encoding = _negotiate_encoding(request, path)
+    return await _serve_file(request, path, media_type, encoding, filename)
 
 
 def cli():
@@ -0,0 +1,345 @@
+"""Incremental translation of re-uploaded PDFs.
+
+A full run in incremental mode writes a manifest next to its outputs with one
+fingerprint per source page. When an edited version of the same file is
+translated into the same output directory, pages whose fingerprint is already
+known are copied from the previous mono/dual outputs and only the remaining
+pages go through babeldoc. The partial outputs are then spliced with the
+previous ones into complete mono/dual PDFs.
+
+With ``pdf.incremental_state_dir`` set, the manifest lives in that directory
+instead, together with a copy of the outputs it describes, so a run that writes
+into a fresh output directory (one per API job) still finds the previous run.
+
+Runs on the same document are serialised with :class:`DocumentLock`, held from
+planning until the new manifest is saved, so one run never deletes the snapshot
+another run is splicing from.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+
+from babeldoc.format.pdf.translation_config import TranslateResult
+
+from pdf2zh_next.config.model import SettingsModel
+from pdf2zh_next.utils.outputs import merge_glossary_csvs
+from pdf2zh_next.utils.outputs import page_count
+from pdf2zh_next.utils.outputs import page_fingerprints
+from pdf2zh_next.utils.outputs import pages_to_ranges
+from pdf2zh_next.utils.outputs import splice_pages
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Settings that do not change how a single page is translated or rendered
+_IGNORED_SETTINGS = {
+    "config_file": None,
+    "report_interval": None,
+    "basic": None,
+    "gui_settings": None,
+    "translation": {"output", "qps", "pool_max_workers", "ignore_cache"},
+    "pdf": {"incremental", "incremental_state_dir", "shards", "max_pages_per_part"},
+}
+
+
+def settings_fingerprint(settings: SettingsModel) -> str:
+    """Digest of every setting that affects the translated pages."""
+    dumped = settings.model_dump(mode="json")
+    for key, sub_keys in _IGNORED_SETTINGS.items():
+        if sub_keys is None:
+            dumped.pop(key, None)
+        else:
+            for sub_key in sub_keys:
+                dumped.get(key, {}).pop(sub_key, None)
+    return hashlib.sha256(json.dumps(dumped, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class IncrementalPlan:
+    """What to reuse from the previous run and what to translate again."""
+
+    file: Path
+    output_dir: Path
+    # Holds the manifest and the previous outputs it refers to
+    state_dir: Path
+    manifest_path: Path
+    settings_digest: str
+    fingerprints: list[str]
+    dual_pages_per_page: int
+    # 0-based source pages to translate in this run
+    changed_pages: list[int] = field(default_factory=list)
+    previous: dict | None = None
+    work_dir: Path | None = None
+
+    @property
+    def is_full_run(self) -> bool:
+        return self.previous is None
+
+    @property
+    def keeps_snapshots(self) -> bool:
+        """Whether outputs are copied into a state directory separate from the output."""
+        return self.state_dir.resolve() != self.output_dir.resolve()
+
+
+def _state_dir(settings: SettingsModel) -> Path:
+    if not settings.pdf.incremental_state_dir:
+        return settings.get_output_dir()
+    state_dir = Path(settings.pdf.incremental_state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    return state_dir
+
+
+def _manifest_path(state_dir: Path, file: Path) -> Path:
+    return state_dir / f"{file.stem}.incremental.json"
+
+
+class DocumentLock:
+    """Exclusive inter-process lock on one document's incremental state."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._handle = None
+
+    def try_acquire(self) -> bool:
+        """Take the lock without blocking; return whether it is now held."""
+        if self._handle is not None:
+            return True
+        handle = self.path.open("a+b")
+        try:
+            if os.name == "nt":
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._handle = handle
+        return True
+
+    def release(self) -> None:
+        if self._handle is None:
+            return
+        try:
+            if os.name == "nt":
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._handle.close()
+            self._handle = None
+
+
+def document_lock(settings: SettingsModel, file: Path) -> DocumentLock:
+    return DocumentLock(_state_dir(settings) / f"{file.stem}.incremental.lock")
+
+
+def _load_manifest(path: Path) -> dict | None:
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable incremental manifest {path}: {e}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _previous_outputs_usable(manifest: dict, state_dir: Path, dual_pages_per_page: int) -> bool:
+    pages = len(manifest["pages"])
+    expected = {"mono": pages, "dual": pages * dual_pages_per_page}
+    for kind, count in expected.items():
+        name = manifest.get(kind)
+        if name is None:
+            continue
+        path = state_dir / name
+        if not path.exists():
+            logger.info(f"Previous {kind} output {path} is missing")
+            return False
+        if page_count(path) != count:
+            logger.info(f"Previous {kind} output {path} does not match its manifest")
+            return False
+    return True
+
+
+def plan_incremental(settings: SettingsModel, file: Path) -> IncrementalPlan:
+    """Compare ``file`` with the manifest of the previous run and plan this run."""
+    output_dir = settings.get_output_dir()
+    state_dir = _state_dir(settings)
+    fingerprints = page_fingerprints(file)
+    plan = IncrementalPlan(
+        file=file,
+        output_dir=output_dir,
+        state_dir=state_dir,
+        manifest_path=_manifest_path(state_dir, file),
+        settings_digest=settings_fingerprint(settings),
+        fingerprints=fingerprints,
+        dual_pages_per_page=2 if settings.pdf.use_alternating_pages_dual else 1,
+        changed_pages=list(range(len(fingerprints))),
+    )
+
+    manifest = _load_manifest(plan.manifest_path)
+    if manifest is None:
+        logger.info("No previous incremental run found, translating all pages")
+        return plan
+    if manifest["settings"] != plan.settings_digest:
+        logger.info("Translation settings changed, translating all pages")
+        return plan
+    if (settings.pdf.no_mono != (manifest.get("mono") is None)) or (
+        settings.pdf.no_dual != (manifest.get("dual") is None)
+    ):
+        logger.info("Requested outputs changed, translating all pages")
+        return plan
+    if not _previous_outputs_usable(manifest, state_dir, plan.dual_pages_per_page):
+        return plan
+
+    known = set(manifest["pages"])
+    plan.previous = manifest
+    plan.changed_pages = [i for i, fp in enumerate(fingerprints) if fp not in known]
+    logger.info(
+        f"Incremental translation: {len(plan.changed_pages)} of "
+        f"{len(fingerprints)} pages changed"
+    )
+    return plan
+
+
+def partial_settings(settings: SettingsModel, plan: IncrementalPlan) -> SettingsModel:
+    """Settings for translating only the changed pages into a scratch directory."""
+    partial = settings.clone()
+    plan.work_dir = plan.output_dir / f".incremental-{uuid.uuid4().hex[:8]}"
+    plan.work_dir.mkdir(parents=True, exist_ok=True)
+    partial.translation.output = plan.work_dir.as_posix()
+    partial.pdf.pages = pages_to_ranges([i + 1 for i in plan.changed_pages])
+    partial.pdf.only_include_translated_page = True
+    return partial
+
+
+def _splice(plan: IncrementalPlan, kind: str, partial_path: Path | None, final_path: Path) -> None:
+    per_page = plan.dual_pages_per_page if kind == "dual" else 1
+    previous_path = plan.state_dir / plan.previous[kind]
+    previous_index = {fp: i for i, fp in enumerate(plan.previous["pages"])}
+    changed_index = {page: i for i, page in enumerate(plan.changed_pages)}
+    sources = []
+    for page, fp in enumerate(plan.fingerprints):
+        if page in changed_index:
+            source, index = partial_path, changed_index[page]
+        else:
+            source, index = previous_path, previous_index[fp]
+        sources.extend((source, index * per_page + offset) for offset in range(per_page))
+    splice_pages(final_path, sources)
+
+
+def _snapshot_dir(manifest: dict | None) -> str | None:
+    """Directory (relative to the state dir) holding the outputs of a manifest."""
+    for kind in ("mono", "dual", "glossary"):
+        name = (manifest or {}).get(kind)
+        if name and Path(name).parent != Path("."):
+            return Path(name).parent.as_posix()
+    return None
+
+
+def _save_manifest(plan: IncrementalPlan, result: TranslateResult) -> None:
+    outputs = {
+        "mono": result.mono_pdf_path,
+        "dual": result.dual_pdf_path,
+        "glossary": getattr(result, "auto_extracted_glossary_path", None),
+    }
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": plan.settings_digest,
+        "pages": plan.fingerprints,
+    }
+    snapshot = None
+    if plan.keeps_snapshots:
+        # Copy the outputs next to the manifest, the output dir belongs to this run only
+        snapshot = plan.state_dir / f"{plan.file.stem}.{uuid.uuid4().hex[:8]}"
+        snapshot.mkdir(parents=True, exist_ok=True)
+    for kind, path in outputs.items():
+        if not path:
+            manifest[kind] = None
+            continue
+        path = Path(path)
+        if snapshot is None:
+            manifest[kind] = path.name
+        else:
+            shutil.copy2(path, snapshot / path.name)
+            manifest[kind] = f"{snapshot.name}/{path.name}"
+
+    replaced = _snapshot_dir(_load_manifest(plan.manifest_path)) if snapshot is not None else None
+    tmp_path = plan.manifest_path.with_name(f"{plan.manifest_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    tmp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    tmp_path.replace(plan.manifest_path)
+    if replaced and replaced != snapshot.name:
+        shutil.rmtree(plan.state_dir / replaced, ignore_errors=True)
+
+
+def finish_incremental(
+    plan: IncrementalPlan, result: TranslateResult | None
+) -> TranslateResult:
+    """
+    Assemble the final outputs of an incremental run and record its manifest.
+    :param plan: the plan returned by ``plan_incremental``
+    :param result: babeldoc result of the partial run, None if nothing changed
+    :return: result pointing at the complete outputs
+    """
+    start = time.time()
+    if plan.is_full_run:
+        _save_manifest(plan, result)
+        return result
+
+    try:
+        outputs = {}
+        for kind in ("mono", "dual"):
+            if plan.previous.get(kind) is None:
+                outputs[kind] = None
+                continue
+            partial_path = getattr(result, f"{kind}_pdf_path", None) if result else None
+            if plan.changed_pages and partial_path is None:
+                raise ValueError(f"Partial run produced no {kind} output")
+            final_path = plan.output_dir / Path(plan.previous[kind]).name
+            _splice(plan, kind, Path(partial_path) if partial_path else None, final_path)
+            outputs[kind] = final_path
+
+        glossary_path = None
+        glossaries = []
+        if plan.previous.get("glossary"):
+            glossaries.append(plan.state_dir / plan.previous["glossary"])
+        if result is not None and getattr(result, "auto_extracted_glossary_path", None):
+            glossaries.append(Path(result.auto_extracted_glossary_path))
+        glossaries = [path for path in glossaries if path.exists()]
+        if glossaries:
+            glossary_path = plan.output_dir / glossaries[0].name
+            merge_glossary_csvs(glossary_path, glossaries)
+    finally:
+        if plan.work_dir is not None:
+            shutil.rmtree(plan.work_dir, ignore_errors=True)
+
+    final = TranslateResult(outputs["mono"], outputs["dual"], glossary_path)
+    final.original_pdf_path = plan.file.as_posix()
+    final.total_seconds = (result.total_seconds if result else 0) + time.time() - start
+    final.mono_pdf_path = outputs["mono"]
+    final.dual_pdf_path = outputs["dual"]
+    final.no_watermark_mono_pdf_path = None
+    final.no_watermark_dual_pdf_path = None
+    final.auto_extracted_glossary_path = glossary_path
+    _save_manifest(plan, final)
+    return final
@@ -7,9 +7,13 @@ from abc import abstractmethod
 from pdf2zh_next.config.model import SettingsModel
 from pdf2zh_next.translator.base_rate_limiter import BaseRateLimiter
 from pdf2zh_next.translator.cache import TranslationCache
+from pdf2zh_next.translator.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Shared by all translators of the process, the key includes the cache identity
+_single_flight = SingleFlight()
+
 
 class BaseTranslator(ABC):
     # Due to cache limitations, name should be within 20 characters.
@@ -51,6 +55,10 @@ class BaseTranslator(ABC):
 
         self.translate_call_count = 0
         self.translate_cache_call_count = 0
+        self.translate_single_flight_count = 0
+        # Cache hits on entries written by this translator, i.e. repeated text
+        self.translate_repeat_hit_count = 0
+        self._translated_texts: set[str] = set()
 
     def __del__(self):
         with contextlib.suppress(Exception):
@@ -60,6 +68,17 @@ class BaseTranslator(ABC):
             logger.info(
                 f"{self.name} translate cache call count: {self.translate_cache_call_count}",
             )
+            logger.info(
+                f"{self.name} translate single-flight shared count: {self.translate_single_flight_count}",
+            )
+
+    def log_repeat_stats(self):
+        """Log how many requests for repeated text did not reach the translation service."""
+        logger.info(
+            f"{self.name} repeated text: {self.translate_repeat_hit_count} served from "
+            f"translations of this run, {self.translate_single_flight_count} shared "
+            f"an in-flight request, {len(self._translated_texts)} distinct texts translated"
+        )
 
     def add_cache_impact_parameters(self, k: str, v):
         """
@@ -75,20 +94,9 @@ class BaseTranslator(ABC):
         :param text: text to translate
         :return: translated text
         """
-        self.translate_call_count += 1
-        if not (self.ignore_cache or ignore_cache):
-            try:
-                cache = self.cache.get(text)
-                if cache is not None:
-                    self.translate_cache_call_count += 1
-                    return cache
-            except Exception as e:
-                logger.debug(f"try get cache failed, ignore it: {e}")
-        self.rate_limiter.wait(rate_limit_params)
-        translation = self.do_translate(text)
-        if not (self.ignore_cache or ignore_cache):
-            self.cache.set(text, translation)
-        return translation
+        return self._cached_translate(
+            "translate", self.do_translate, text, ignore_cache, rate_limit_params
+        )
 
     def llm_translate(self, text, ignore_cache=False, rate_limit_params: dict = None):
         """
@@ -96,19 +104,58 @@ class BaseTranslator(ABC):
         :param text: text to translate
         :return: translated text
         """
+        return self._cached_translate(
+            "llm_translate", self.do_llm_translate, text, ignore_cache, rate_limit_params
+        )
+
+    def _get_cache(self, text):
+        try:
+            return self.cache.get(text)
+        except Exception as e:
+            logger.debug(f"try get cache failed, ignore it: {e}")
+            return None
+
+    def _cached_translate(self, kind, do_func, text, ignore_cache, rate_limit_params):
+        """
+        Serve from cache, otherwise translate once per concurrent identical request.
+        Concurrent misses on the same (cache params, text) share one in-flight call
+        instead of racing to the translation service before the first cache.set.
+        :param kind: translate or llm_translate, both share the cache but not calls
+        :param do_func: the actual translate function
+        :return: translated text
+        """
         self.translate_call_count += 1
-        if not (self.ignore_cache or ignore_cache):
-            try:
-                cache = self.cache.get(text)
-                if cache is not None:
-                    self.translate_cache_call_count += 1
-                    return cache
-            except Exception as e:
-                logger.debug(f"try get cache failed, ignore it: {e}")
-        self.rate_limiter.wait(rate_limit_params)
-        translation = self.do_llm_translate(text)
-        if not (self.ignore_cache or ignore_cache):
+        if self.ignore_cache or ignore_cache:
+            self.rate_limiter.wait(rate_limit_params)
+            return do_func(text)
+
+        cache = self._get_cache(text)
+        if cache is not None:
+            self.translate_cache_call_count += 1
+            if text in self._translated_texts:
+                self.translate_repeat_hit_count += 1
+            return cache
+
+        def call():
+            # A previous in-flight call may have filled the cache in the meantime
+            cached = self._get_cache(text)
+            if cached is not None:
+                return cached
+            self.rate_limiter.wait(rate_limit_params)
+            translation = do_func(text)
             self.cache.set(text, translation)
+            self._translated_texts.add(text)
+            return translation
+
+        key = (
+            self.cache.translate_engine,
+            self.cache.translate_engine_params,
+            kind,
+            text,
+        )
+        translation, shared = _single_flight.do(key, call)
+        if shared:
+            self.translate_single_flight_count += 1
         return translation
 
     def do_llm_translate(self, text, rate_limit_params: dict = None):
@@ -0,0 +1,59 @@
+import threading
+from collections.abc import Callable
+from collections.abc import Hashable
+from typing import Any
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into a single in-flight call.
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait for it and receive the same result or exception.
+    This implementation is thread-safe.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Run ``fn`` unless a call for ``key`` is already in flight.
+        :param key: identity of the call
+        :param fn: function to run
+        :return: the result and whether it was shared from another caller
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.calls)
@@ -0,0 +1,129 @@
+"""Helpers to fingerprint, splice and merge translation outputs."""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+
+def page_count(pdf_path: Path) -> int:
+    with pymupdf.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def page_fingerprints(pdf_path: Path) -> list[str]:
+    """
+    Fingerprint every page of a PDF.
+    The fingerprint covers the page geometry, its content stream and the raw
+    streams of the images and form XObjects it draws, so any visible edit on a
+    page changes its fingerprint while untouched pages keep theirs.
+    :param pdf_path: PDF file
+    :return: one hex digest per page, in page order
+    """
+    fingerprints = []
+    with pymupdf.open(pdf_path) as doc:
+        stream_digests: dict[int, bytes] = {}
+
+        def stream_digest(xref: int) -> bytes:
+            if xref not in stream_digests:
+                stream_digests[xref] = hashlib.sha256(
+                    doc.xref_stream_raw(xref) or b""
+                ).digest()
+            return stream_digests[xref]
+
+        for page in doc:
+            digest = hashlib.sha256()
+            digest.update(repr((tuple(page.rect), page.rotation)).encode())
+            digest.update(page.read_contents())
+            for image in page.get_images(full=True):
+                digest.update(stream_digest(image[0]))
+            for xobject in page.get_xobjects():
+                digest.update(stream_digest(xobject[0]))
+            for font in page.get_fonts(full=True):
+                digest.update(font[3].encode())
+            fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def splice_pages(output_path: Path, sources: list[tuple[Path, int]]) -> None:
+    """
+    Build a PDF from single pages of other PDFs.
+    The result is written next to ``output_path`` first and moved into place,
+    so ``output_path`` may itself be one of the sources.
+    :param output_path: PDF to write
+    :param sources: ``(pdf path, 0-based page index)`` in output order
+    """
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    opened: dict[Path, pymupdf.Document] = {}
+    try:
+        with pymupdf.open() as result:
+            for path, index in sources:
+                if path not in opened:
+                    opened[path] = pymupdf.open(path)
+                result.insert_pdf(opened[path], from_page=index, to_page=index)
+            result.save(tmp_path, garbage=3, deflate=True)
+    finally:
+        for doc in opened.values():
+            doc.close()
+    os.replace(tmp_path, output_path)
+
+
+def concat_pdfs(output_path: Path, inputs: list[Path]) -> None:
+    """Concatenate whole PDFs in the given order."""
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with pymupdf.open() as result:
+        for path in inputs:
+            with pymupdf.open(path) as doc:
+                result.insert_pdf(doc)
+        result.save(tmp_path, garbage=3, deflate=True)
+    os.replace(tmp_path, output_path)
+
+
+def merge_glossary_csvs(output_path: Path, inputs: list[Path]) -> None:
+    """
+    Merge glossary CSV files, keeping the first entry seen for each source term.
+    Inputs are read in order, so the merge is deterministic for a fixed order.
+    """
+    fieldnames: list[str] | None = None
+    rows: dict[str, dict[str, str]] = {}
+    for path in inputs:
+        with path.open(encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            if fieldnames is None:
+                fieldnames = reader.fieldnames
+            for row in reader:
+                source = (row.get("source") or "").strip()
+                if source and source not in rows:
+                    rows[source] = row
+    if fieldnames is None:
+        fieldnames = ["source", "target"]
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows.values())
+    os.replace(tmp_path, output_path)
+
+
+def pages_to_ranges(pages: list[int]) -> str:
+    """Format 1-based page numbers as a ``pages`` setting, e.g. ``1-3,7``."""
+    parts = []
+    start = prev = None
+    for page in sorted(set(pages)):
+        if start is None:
+            start = prev = page
+        elif page == prev + 1:
+            prev = page
+        else:
+            parts.append(f"{start}-{prev}" if start != prev else str(start))
+            start = prev = page
+    if start is not None:
+        parts.append(f"{start}-{prev}" if start != prev else str(start))
+    return ",".join(parts)